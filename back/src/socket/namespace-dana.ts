@@ -72,6 +72,19 @@ export const setupDanaNamespace = (io: Server) => {
       io.of("/general").to(room).emit("job_completed", data);
     });
 
+    socket.on("job_cancelled", (data: JobBaseData & { result: any }) => {
+      const room = getJobRoom(data);
+      io.of("/general").to(room).emit("job_cancelled", data);
+    });
+
+    socket.on(
+      "job_progress",
+      (data: JobBaseData & { chunks: { sequence: number; stream: string; content: string }[] }) => {
+        const room = getJobRoom(data);
+        io.of("/general").to(room).emit("job_progress", data);
+      }
+    );
+
     socket.on("job_scheduled", (data: JobBaseData) => {
       const room = getJobRoom(data);
       danaNamespace.to(room).emit("job_scheduled", data);
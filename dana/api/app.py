@@ -2,11 +2,14 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
 from api.socket_client import socket_client
+from api.commands import history_cli
 from api.config import Config
 from api.db import db
 from api.controllers import register_blueprints
 from api.hooks.before import authenticate
 from api.models import *
+from api.services.embedding_backfill import EmbeddingBackfill
+from api.services.history_retention_service import HistoryRetentionService
 import os
 import logging
 
@@ -28,6 +31,21 @@ def create_app():
     # Initialize database and migration
     db.init_app(app)
     Migrate(app, db, directory="api/migrations")
+    app.cli.add_command(history_cli)
+
+    # the monthly partitions of the history are also created daily by `flask history maintain`
+    with app.app_context():
+        try:
+            HistoryRetentionService().ensure_partitions()
+        except Exception as e:
+            logger.warning(f"Could not create the partitions of the interaction history: {e}")
+
+    # the interactions are saved without their embeddings, which are computed in the background
+    EmbeddingBackfill(
+        app,
+        interval=float(os.getenv("EMBEDDING_BACKFILL_INTERVAL_SECONDS", 5)),
+        batch_size=int(os.getenv("EMBEDDING_BACKFILL_BATCH_SIZE", 100)),
+    ).start()
 
     @app.before_request
     def require_authentication():
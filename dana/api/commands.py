@@ -0,0 +1,55 @@
+import json
+import click
+from flask.cli import AppGroup
+from api.services.history_retention_service import HistoryRetentionService
+from api.services.interaction_history_service import InteractionHistoryService
+
+history_cli = AppGroup("history", help="Maintenance of the partitioned interaction history.")
+
+
+@history_cli.command("maintain")
+@click.option("--dry-run", is_flag=True, help="Only print the partitions the retention policies would change.")
+def maintain(dry_run):
+    """
+    Create the partitions of the coming months, then archive and delete the expired interactions.
+    Meant to run daily, e.g. from cron: FLASK_APP=api.app:create_app flask history maintain
+    """
+    service = HistoryRetentionService()
+    if not dry_run:
+        created = service.ensure_partitions()
+        click.echo(f"Created partitions: {', '.join(created) or 'none'}")
+    report = service.apply_retention(dry_run=dry_run)
+    for entry in report:
+        click.echo(json.dumps(entry))
+    if not report:
+        click.echo("No expired interactions")
+
+
+@history_cli.command("partitions")
+def partitions():
+    """
+    List the monthly partitions of the history.
+    """
+    for partition in HistoryRetentionService().list_partitions():
+        click.echo(f"{partition['name']}\t{partition['start']}\t{partition['end']}")
+
+
+@history_cli.command("embed")
+@click.option("--all", "whole_history", is_flag=True, help="Embed the whole history, not only the recent partitions.")
+@click.option("--batch-size", default=100, show_default=True, help="Interactions embedded per request to the model.")
+def embed(whole_history, batch_size):
+    """
+    Compute the missing embeddings of the interactions, e.g. after enabling EMBEDDINGS_ENABLED.
+    """
+    service = InteractionHistoryService()
+    if not service.embeddings.enabled:
+        raise click.ClickException("Embeddings are disabled, see EMBEDDINGS_ENABLED")
+    progress = {"after_id": 0, "embedded": 0}
+    total = 0
+    while True:
+        progress = service.embed_missing(progress["after_id"], limit=batch_size, recent_only=not whole_history)
+        if not progress["embedded"]:
+            break
+        total += progress["embedded"]
+        click.echo(f"Embedded {total} interactions, up to ID {progress['after_id']}")
+    click.echo(f"Done: {total} interactions embedded")
@@ -37,7 +37,7 @@ def list_history(agent_id, session_id):
         account_id=account_id,
         agent_id=agent_id,
         session_id=session_id,
-    )
+    )["interactions"]
     return jsonify(history), 200
 
 
@@ -50,6 +50,36 @@ def list_generated_codes(agent_id):
     return jsonify(codes), 200
 
 
+@agents_bp.route("/<agent_id>/generated-code/<reference_id>", methods=["PATCH"])
+def update_generated_code_settings(agent_id, reference_id):
+    """
+    Update the execution settings of a generated code, e.g. mark it as idempotent or set its timeout.
+    Input: JSON payload with idempotent and/or timeout_seconds.
+    """
+    account_id = g.get("account_id")
+    data = request.json or {}
+
+    if not any(setting in data for setting in ("idempotent", "timeout_seconds")):
+        return jsonify({"error": "At least one of idempotent or timeout_seconds is required."}), 400
+    if "idempotent" in data and not isinstance(data["idempotent"], bool):
+        return jsonify({"error": "idempotent must be a boolean."}), 400
+    if "timeout_seconds" in data and not (
+        data["timeout_seconds"] is None
+        or (isinstance(data["timeout_seconds"], int) and data["timeout_seconds"] > 0)
+    ):
+        return jsonify({"error": "timeout_seconds must be a positive integer."}), 400
+
+    updated = _agent_service.update_generated_code_settings(
+        account_id=account_id,
+        agent_id=agent_id,
+        reference_id=reference_id,
+        settings=data,
+    )
+    if not updated:
+        return jsonify({"error": "Generated code not found."}), 404
+    return jsonify({"updated": updated}), 200
+
+
 @agents_bp.route("/<agent_id>/interact", methods=["POST"])
 def interact_agent(agent_id):
     """
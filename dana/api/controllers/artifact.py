@@ -0,0 +1,78 @@
+from flask import Blueprint, jsonify, g, request, send_file
+from api.services.artifact_service import (
+    ArtifactService,
+    ArtifactNotFound,
+    InvalidArtifact,
+)
+
+from logging import getLogger
+import json
+import traceback
+
+logger = getLogger(__name__)
+
+artifact_bp = Blueprint("artifact", __name__)
+_artifact_service = ArtifactService()
+
+
+@artifact_bp.route("/", methods=["POST"])
+def upload_artifact():
+    """
+    Store a columnar artifact.
+    Input: multipart form with the file, its name and format (npy or arrow), and optionally schema and summary as JSON.
+    """
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "The file is missing."}), 400
+
+    try:
+        artifact = _artifact_service.store(
+            account_id=account_id,
+            agent_id=agent_id,
+            name=request.form.get("name") or file.filename,
+            format=request.form.get("format"),
+            content=file.stream,
+            schema=json.loads(request.form.get("schema") or "null"),
+            summary=json.loads(request.form.get("summary") or "null"),
+        )
+    except (InvalidArtifact, json.JSONDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        logger.error(f"Failed to store artifact: {traceback.format_exc()}")
+        return jsonify({"error": "Failed to store artifact."}), 500
+
+    return jsonify(artifact.to_dict()), 201
+
+
+@artifact_bp.route("/<artifact_id>", methods=["GET"])
+def get_artifact(artifact_id):
+    """
+    Get the metadata (schema and summary) of an artifact.
+    """
+    account_id = g.get("account_id")
+    try:
+        artifact = _artifact_service.get(account_id=account_id, artifact_id=artifact_id)
+    except ArtifactNotFound:
+        return jsonify({"error": "Artifact not found."}), 404
+    return jsonify(artifact.to_dict()), 200
+
+
+@artifact_bp.route("/<artifact_id>/content", methods=["GET"])
+def download_artifact(artifact_id):
+    """
+    Download the file of an artifact.
+    """
+    account_id = g.get("account_id")
+    try:
+        artifact = _artifact_service.get(account_id=account_id, artifact_id=artifact_id)
+    except ArtifactNotFound:
+        return jsonify({"error": "Artifact not found."}), 404
+    return send_file(
+        artifact.storage_path,
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=f"{artifact.name}.{artifact.format}",
+        conditional=True,
+    )
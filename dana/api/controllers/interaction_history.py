@@ -1,5 +1,10 @@
 from flask import Blueprint, jsonify, g, request
-from api.services.interaction_history_service import InteractionHistoryService
+from api.services.interaction_history_service import (
+    HISTORY_FIELDS,
+    InteractionHistoryService,
+    OverlappingChunk,
+)
+from api.services.history_retention_service import HistoryRetentionService, InvalidRetention
 from api.socket_client import socket_client
 
 from logging import getLogger
@@ -7,23 +12,153 @@ import traceback
 logger = getLogger(__name__)
 
 interaction_history_bp = Blueprint("interaction_history", __name__)
+MAX_HISTORY_LIMIT = 100
 _interaction_history_service = InteractionHistoryService()
+_history_retention_service = HistoryRetentionService()
+
+
+def _recent_only() -> bool:
+    # ?all=true reads the whole history, not only its recent partitions
+    return request.args.get("all", "false").lower() != "true"
 
 
 @interaction_history_bp.route("/session/<session_id>", methods=["GET"])
 def get_interaction_history(session_id):
     """
-    Get the interaction history for a specific session.
+    Get one page of the interaction history of a session, newest first.
+    Query parameters:
+    - limit: the maximum number of interactions (default 10, at most 100);
+    - before_id, after_id or since_id: the cursor, see InteractionHistoryService.get_history;
+    - fields: comma-separated fields to return, e.g. id,timestamp,interaction.type;
+    - exclude: comma-separated fields to leave out, e.g. summary,interaction.content.code;
+    - type: comma-separated interaction types to return, e.g. job;
+    - all: true to read the whole history, by default only the last HISTORY_HOT_MONTHS months.
     """
 
     account_id = g.get("account_id")
     agent_id = g.get("agent_id")
+    limit = request.args.get("limit", 10, type=int)
+    cursors = {
+        cursor: request.args.get(cursor, type=int)
+        for cursor in ("before_id", "after_id", "since_id")
+        if request.args.get(cursor) is not None
+    }
+    fields = [field for field in request.args.get("fields", "").split(",") if field]
+    exclude = [field for field in request.args.get("exclude", "").split(",") if field]
+    types = [interaction_type for interaction_type in request.args.get("type", "").split(",") if interaction_type]
+
+    if not 0 < limit <= MAX_HISTORY_LIMIT:
+        return jsonify({"error": f"The limit must be between 1 and {MAX_HISTORY_LIMIT}."}), 400
+    if len(cursors) > 1 or None in cursors.values():
+        return jsonify({"error": "Give at most one of before_id, after_id and since_id, as an integer."}), 400
+    unknown = {field.split(".")[0] for field in fields + exclude} - HISTORY_FIELDS
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown))}."}), 400
+
     history = _interaction_history_service.get_history(
         account_id=account_id,
         agent_id=agent_id,
         session_id=session_id,
+        n=limit,
+        fields=fields,
+        exclude=exclude,
+        types=types,
+        recent_only=_recent_only(),
+        **cursors,
+    )
+    return jsonify(history), 200
+
+
+@interaction_history_bp.route("/session/<session_id>/latest/<interaction_type>", methods=["GET"])
+def get_latest_interaction(session_id, interaction_type):
+    """
+    Get the latest interaction of a type in a session, e.g. the latest plan or confirmation.
+    Query parameter: all (true to read the whole history).
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    interaction = _interaction_history_service.get_latest(
+        account_id=account_id,
+        agent_id=agent_id,
+        session_id=session_id,
+        interaction_type=interaction_type,
+        recent_only=_recent_only(),
+    )
+    if not interaction:
+        return jsonify({"error": f"No {interaction_type} in this session."}), 404
+    return jsonify(interaction), 200
+
+
+@interaction_history_bp.route("/job/<job_id>", methods=["GET"])
+def get_job_interactions(job_id):
+    """
+    Get the interactions about a job, from its creation to its result.
+    Query parameter: all (true to read the whole history).
+    """
+
+    account_id = g.get("account_id")
+    interactions = _interaction_history_service.get_job_events(
+        account_id=account_id, job_id=job_id, recent_only=_recent_only()
+    )
+    return jsonify({"interactions": interactions}), 200
+
+
+@interaction_history_bp.route("/reference/<reference_id>", methods=["GET"])
+def get_reference_interactions(reference_id):
+    """
+    Get the latest plans and confirmations of a generated code.
+    Query parameters: limit (default 10, at most 100), all (true to read the whole history).
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    limit = request.args.get("limit", 10, type=int)
+    if not 0 < limit <= MAX_HISTORY_LIMIT:
+        return jsonify({"error": f"The limit must be between 1 and {MAX_HISTORY_LIMIT}."}), 400
+    interactions = _interaction_history_service.get_reference_interactions(
+        account_id=account_id,
+        agent_id=agent_id,
+        reference_id=reference_id,
+        n=limit,
+        recent_only=_recent_only(),
     )
-    return jsonify({"interactions": history}), 200
+    return jsonify({"interactions": interactions}), 200
+
+
+@interaction_history_bp.route("/session/<session_id>/relevant", methods=["POST"])
+def get_relevant_interactions(session_id):
+    """
+    Get the past interactions of a session most similar to a text, by the embeddings of the interactions.
+    Body: query (the text), k (default 5, at most 100) and before_id (only older interactions).
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    query = request.json.get("query")
+    k = request.json.get("k", 5)
+    before_id = request.json.get("before_id")
+    if not isinstance(query, str) or not query:
+        return jsonify({"error": "The query must be a non-empty string."}), 400
+    if not isinstance(k, int) or not 0 < k <= MAX_HISTORY_LIMIT:
+        return jsonify({"error": f"k must be between 1 and {MAX_HISTORY_LIMIT}."}), 400
+    if before_id is not None and not isinstance(before_id, int):
+        return jsonify({"error": "before_id must be an interaction ID."}), 400
+
+    try:
+        interactions = _interaction_history_service.get_relevant(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            query=query,
+            k=k,
+            before_id=before_id,
+        )
+    except Exception as e:
+        logger.error(f"Error getting relevant interactions: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"interactions": interactions}), 200
 
 
 @interaction_history_bp.route("/session/<session_id>/summary", methods=["GET"])
@@ -48,6 +183,85 @@ def get_interaction_summary(session_id):
         return jsonify({"error": str(e)}), 500
 
 
+@interaction_history_bp.route("/session/<session_id>/memory", methods=["GET"])
+def get_interaction_memory(session_id):
+    """
+    Get the summarized memory of a session: the session summary and the chunk summaries not folded into it yet.
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    memory = _interaction_history_service.get_memory(
+        account_id=account_id,
+        agent_id=agent_id,
+        session_id=session_id,
+    )
+    return jsonify(memory), 200
+
+
+@interaction_history_bp.route("/session/<session_id>/chunks", methods=["POST"])
+def add_interaction_chunk(session_id):
+    """
+    Store the summary of a chunk of consecutive interactions that left the verbatim part of the context.
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    from_id = request.json.get("from_id")
+    to_id = request.json.get("to_id")
+    summary = request.json.get("summary")
+    if not isinstance(from_id, int) or not isinstance(to_id, int) or from_id > to_id:
+        return jsonify({"error": "from_id and to_id must be interaction IDs, in order."}), 400
+    if not isinstance(summary, str):
+        return jsonify({"error": "The summary must be a string."}), 400
+
+    try:
+        chunk = _interaction_history_service.add_chunk_summary(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            from_id=from_id,
+            to_id=to_id,
+            summary=summary,
+        )
+    except OverlappingChunk as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(chunk), 201
+
+
+@interaction_history_bp.route("/session/<session_id>/summary", methods=["PUT"])
+def update_interaction_summary(session_id):
+    """
+    Update the moving summary of a session. Called by the agent once it has folded chunk summaries into it,
+    with the to_id of the last of them as folded_through.
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    summary = request.json.get("summary")
+    folded_through = request.json.get("folded_through")
+    if not isinstance(summary, str):
+        return jsonify({"error": "The summary must be a string."}), 400
+    if folded_through is not None and not isinstance(folded_through, int):
+        return jsonify({"error": "folded_through must be an interaction ID."}), 400
+
+    try:
+        updated = _interaction_history_service.update_summary(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            summary=summary,
+            folded_through=folded_through,
+        )
+    except Exception as e:
+        logger.error(f"Error updating interaction summary: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    if not updated:
+        return jsonify({"error": "Session not found."}), 404
+    return jsonify({"summary": summary}), 200
+
+
 @interaction_history_bp.route("/session/<session_id>/interaction", methods=["POST"])
 def update_interaction(session_id):
     """
@@ -60,7 +274,7 @@ def update_interaction(session_id):
     agent_id = g.get("agent_id")
     interaction = request.json.get("interaction")
     summary = request.json.get("summary")
-    _interaction_history_service.save_interaction(
+    saved = _interaction_history_service.save_interaction(
         account_id=account_id,
         agent_id=agent_id,
         session_id=session_id,
@@ -79,4 +293,89 @@ def update_interaction(session_id):
     if interaction.get("type") != "user_input":
         socket_client.emit_event("new_interaction", payload)
 
-    return jsonify(interaction), 200
+    return jsonify(saved), 200
+
+
+@interaction_history_bp.route("/session/<session_id>/interactions", methods=["POST"])
+def save_interactions(session_id):
+    """
+    Save an ordered batch of interactions of a session in one transaction.
+    """
+
+    account_id = g.get("account_id")
+    agent_id = g.get("agent_id")
+    interactions = request.json.get("interactions")
+    if not isinstance(interactions, list) or not all(isinstance(i, dict) for i in interactions):
+        return jsonify({"error": "The interactions must be a list of objects."}), 400
+
+    try:
+        saved = _interaction_history_service.save_interactions(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            interactions=interactions,
+        )
+    except Exception as e:
+        logger.error(f"Error saving interactions: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+    for interaction in interactions:
+        if interaction.get("type") != "user_input":
+            socket_client.emit_event(
+                "new_interaction",
+                {
+                    "account_id": account_id,
+                    "agent_id": agent_id,
+                    "session_id": session_id,
+                    "interaction": interaction,
+                },
+            )
+
+    return jsonify({"interactions": saved}), 200
+
+
+@interaction_history_bp.route("/retention", methods=["GET"])
+def get_history_retention():
+    """
+    Get the retention policy of the interaction history of the account.
+    """
+
+    account_id = g.get("account_id")
+    return jsonify(_history_retention_service.get_policy(account_id)), 200
+
+
+@interaction_history_bp.route("/retention", methods=["PUT"])
+def set_history_retention():
+    """
+    Set the retention policy of the interaction history of the account.
+    Body: retention_months (months kept after the current one, null to keep everything) and archive (default true,
+    whether the expired interactions are archived before they are deleted).
+    """
+
+    account_id = g.get("account_id")
+    archive = request.json.get("archive", True)
+    if "retention_months" not in request.json:
+        return jsonify({"error": "retention_months is required."}), 400
+    if not isinstance(archive, bool):
+        return jsonify({"error": "archive must be a boolean."}), 400
+
+    try:
+        policy = _history_retention_service.set_policy(
+            account_id=account_id,
+            retention_months=request.json.get("retention_months"),
+            archive=archive,
+        )
+    except InvalidRetention as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(policy), 200
+
+
+@interaction_history_bp.route("/retention", methods=["DELETE"])
+def reset_history_retention():
+    """
+    Make the account follow the default retention policy again.
+    """
+
+    account_id = g.get("account_id")
+    return jsonify(_history_retention_service.reset_policy(account_id)), 200
@@ -19,7 +19,7 @@ _job_service = JobService()
 def create_job():
     """
     Create a new job.
-    Input: JSON payload with account_id, agent_id, and session_id.
+    Input: JSON payload with account_id, agent_id, and session_id, and parent_job_id for the child jobs of a batch.
     """
     data = request.json
     account_id = g.get("account_id")
@@ -27,6 +27,7 @@ def create_job():
     session_id = data.get("session_id")
     name = data.get("name")
     description = data.get("description")
+    parent_job_id = data.get("parent_job_id")
 
     logger.debug(f"Creating job for session {session_id}")
 
@@ -37,6 +38,7 @@ def create_job():
             session_id=session_id,
             name=name,
             description=description,
+            parent_job_id=parent_job_id,
         )
     except Exception as e:
         logger.error(f"Failed to create job: {str(e)}")
@@ -52,10 +54,12 @@ def create_job():
         "description": job.description,
     }
 
-    socket_client.emit_event(
-        "job_created",
-        payload,
-    )
+    # only the batch job is streamed to the clients, its children are listed by GET /job/<id>/children
+    if not job.parent_job_id:
+        socket_client.emit_event(
+            "job_created",
+            payload,
+        )
 
     return (
         jsonify(
@@ -86,6 +90,7 @@ def update_status():
         JobType.COMPLETED.value,
         JobType.IN_PROGRESS.value,
         JobType.FAILED.value,
+        JobType.CANCELLED.value,
     ]:
         logger.debug(f"Invalid status: {status}")
         return jsonify({"error": "Invalid status."}), 400
@@ -106,6 +111,8 @@ def update_status():
         event = "job_completed"
     elif status == JobType.IN_PROGRESS.value:
         event = "job_in_progress"
+    elif status == JobType.CANCELLED.value:
+        event = "job_cancelled"
     else:
         event = "job_failed"
 
@@ -120,8 +127,113 @@ def update_status():
         "result": job.payload,
     }
 
+    if not job.parent_job_id:
+        socket_client.emit_event(
+            event,
+            payload,
+        )
+    return jsonify({"message": "Status update sent."}), 200
+
+
+@job_bp.route("/<job_id>/children", methods=["GET"])
+def get_child_jobs(job_id):
+    """
+    Get the child jobs of a batch job with their status and result.
+    """
+    account_id = g.get("account_id")
+
+    try:
+        children = _job_service.get_child_jobs(job_id=job_id, account_id=account_id)
+    except JobNotFound:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify({"children": children}), 200
+
+
+@job_bp.route("/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job. The request is forwarded to the agent running the job,
+    which kills the job and reports it as cancelled.
+    """
+    account_id = g.get("account_id")
+
+    try:
+        job = _job_service.cancel_job(job_id=job_id, account_id=account_id)
+    except JobAlreadyCompleted:
+        return jsonify({"error": "Job already completed."}), 400
+    except JobNotFound:
+        return jsonify({"error": "Job not found."}), 404
+    except Exception:
+        logger.error(f"Failed to cancel job: {traceback.format_exc()}")
+        return jsonify({"error": "Failed to cancel job."}), 500
+
+    if job:
+        # the agent didn't know the job, so it won't report the cancellation itself
+        socket_client.emit_event(
+            "job_cancelled",
+            {
+                "job_id": job.job_id,
+                "session_id": job.session_id,
+                "agent_id": job.agent_id,
+                "account_id": job.account_id,
+                "name": job.name,
+                "description": job.description,
+                "status": job.status.value,
+                "result": job.payload,
+            },
+        )
+    return jsonify({"message": "Job is being cancelled."}), 202
+
+
+# called by agent
+@job_bp.route("/<job_id>/logs", methods=["POST"])
+def append_logs(job_id):
+    """
+    Store chunks of the stdout/stderr of a running job and stream them to the client.
+    Input: JSON payload with chunks, a list of {sequence, stream, content}.
+    """
+    account_id = g.get("account_id")
+    chunks = request.json.get("chunks", [])
+
+    try:
+        job = _job_service.append_logs(
+            job_id=job_id, account_id=account_id, chunks=chunks
+        )
+    except JobNotFound:
+        return jsonify({"error": "Job not found."}), 404
+    except Exception:
+        logger.error(f"Failed to store job logs: {traceback.format_exc()}")
+        return jsonify({"error": "Failed to store job logs."}), 500
+
+    payload = {
+        "job_id": job.job_id,
+        "session_id": job.session_id,
+        "agent_id": job.agent_id,
+        "account_id": job.account_id,
+        "chunks": chunks,
+    }
+
     socket_client.emit_event(
-        event,
+        "job_progress",
         payload,
     )
-    return jsonify({"message": "Status update sent."}), 200
+    return jsonify({"message": "Logs stored."}), 201
+
+
+@job_bp.route("/<job_id>/logs", methods=["GET"])
+def get_logs(job_id):
+    """
+    Get the stored output of a job, one page of chunks at a time.
+    Query parameters: after (sequence number of the last chunk already read) and limit.
+    """
+    account_id = g.get("account_id")
+    after_sequence = request.args.get("after", -1, type=int)
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+
+    chunks = _job_service.get_logs(
+        job_id=job_id,
+        account_id=account_id,
+        after_sequence=after_sequence,
+        limit=limit,
+    )
+    return jsonify({"chunks": chunks}), 200
@@ -0,0 +1,49 @@
+"""Add agent_jobs.parent_job_id, the batch job of a child job
+
+Revision ID: 0c4e9b2a7d16
+Revises: f1a7c3e5b820
+Create Date: 2026-10-20 09:41:05.772193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c4e9b2a7d16'
+down_revision = 'f1a7c3e5b820'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_agent_jobs_parent_job_id'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('agent_jobs'):
+        return
+    if 'parent_job_id' not in {column['name'] for column in inspector.get_columns('agent_jobs')}:
+        with op.batch_alter_table('agent_jobs', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('parent_job_id', sa.String(), nullable=True))
+            batch_op.create_foreign_key(
+                'agent_jobs_parent_job_id_fkey', 'agent_jobs', ['parent_job_id'], ['job_id'], ondelete='CASCADE'
+            )
+
+    # built without locking the jobs for writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            'agent_jobs',
+            ['parent_job_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX_NAME, table_name='agent_jobs', postgresql_concurrently=True, if_exists=True)
+    with op.batch_alter_table('agent_jobs', schema=None) as batch_op:
+        batch_op.drop_constraint('agent_jobs_parent_job_id_fkey', type_='foreignkey')
+        batch_op.drop_column('parent_job_id')
@@ -0,0 +1,41 @@
+"""Add agent_job_log_chunks, the streamed stdout and stderr of the jobs
+
+Revision ID: 3e8d51f0c2a9
+Revises: 0c4e9b2a7d16
+Create Date: 2026-10-20 10:03:48.129574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8d51f0c2a9'
+down_revision = '0c4e9b2a7d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('agent_job_log_chunks'):
+        return
+    op.create_table(
+        'agent_job_log_chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('account_id', sa.String(), nullable=False),
+        sa.Column('sequence', sa.Integer(), nullable=False),
+        sa.Column('stream', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['agent_jobs.job_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('agent_job_log_chunks', schema=None) as batch_op:
+        batch_op.create_index('ix_job_log_chunks_job_sequence', ['job_id', 'sequence'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('agent_job_log_chunks', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_log_chunks_job_sequence')
+    op.drop_table('agent_job_log_chunks')
@@ -0,0 +1,41 @@
+"""Add agent_artifacts, the metadata of the columnar artifacts of the jobs
+
+Revision ID: 5b2f8e7a4c03
+Revises: 3e8d51f0c2a9
+Create Date: 2026-10-20 10:37:12.604418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f8e7a4c03'
+down_revision = '3e8d51f0c2a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('agent_artifacts'):
+        return
+    op.create_table(
+        'agent_artifacts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('artifact_id', sa.String(), nullable=False),
+        sa.Column('account_id', sa.String(), nullable=False),
+        sa.Column('agent_id', sa.String(), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('schema', sa.JSON(), nullable=True),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('storage_path', sa.String(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'artifact_id', name='unique_account_artifact'),
+    )
+
+
+def downgrade():
+    op.drop_table('agent_artifacts')
@@ -0,0 +1,100 @@
+"""Set agent_interaction_history.timestamp in the database and index the history by session
+
+The timestamp had a default computed once when the API process started, so every row written by a process got
+the same timestamp. It is now set by the database on insert. The original times of the existing rows are lost:
+they are backfilled so that they follow the order of the IDs within each session, using the creation time of the
+job a "job" interaction is about where there is one.
+
+Revision ID: 62bce8744b4c
+Revises:
+Create Date: 2026-10-19 13:02:41.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '62bce8744b4c'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_agent_interaction_history_session_id_desc'
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('agent_interaction_history'):
+        # the table is created as declared by the model
+        return
+
+    if inspector.has_table('agent_jobs'):
+        op.execute(
+            """
+            UPDATE agent_interaction_history AS history
+            SET timestamp = jobs.created_at
+            FROM agent_jobs AS jobs
+            WHERE history.interaction->>'type' = 'job'
+              AND history.interaction->'content'->>'status' = 'created'
+              AND jobs.job_id = history.interaction->'content'->>'job_id'
+              AND jobs.created_at IS NOT NULL
+            """
+        )
+    # no row of a session is older than a row saved before it
+    op.execute(
+        """
+        UPDATE agent_interaction_history AS history
+        SET timestamp = ordered.timestamp
+        FROM (
+            SELECT
+                id,
+                COALESCE(
+                    MAX(timestamp) OVER (
+                        PARTITION BY account_id, agent_id, session_id ORDER BY id ROWS UNBOUNDED PRECEDING
+                    ),
+                    MIN(timestamp) OVER (PARTITION BY account_id, agent_id, session_id),
+                    timezone('utc', now())
+                ) AS timestamp
+            FROM agent_interaction_history
+        ) AS ordered
+        WHERE history.id = ordered.id AND history.timestamp IS DISTINCT FROM ordered.timestamp
+        """
+    )
+
+    with op.batch_alter_table('agent_interaction_history', schema=None) as batch_op:
+        batch_op.alter_column(
+            'timestamp',
+            existing_type=sa.DateTime(),
+            server_default=sa.text("timezone('utc', now())"),
+            nullable=False,
+        )
+
+    # built without locking the table for writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            'agent_interaction_history',
+            ['account_id', 'agent_id', 'session_id', sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            INDEX_NAME,
+            table_name='agent_interaction_history',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    with op.batch_alter_table('agent_interaction_history', schema=None) as batch_op:
+        batch_op.alter_column(
+            'timestamp',
+            existing_type=sa.DateTime(),
+            server_default=None,
+            nullable=True,
+        )
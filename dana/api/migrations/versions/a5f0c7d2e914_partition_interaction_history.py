@@ -0,0 +1,142 @@
+"""Partition agent_interaction_history by month of timestamp and add agent_history_retention
+
+The history is copied into a table partitioned by range of timestamp, with one partition per month from the oldest
+interaction to two months ahead and a default partition; the primary key becomes (id, timestamp). The IDs and their
+sequence are kept. The copy locks the history for writes: run this revision in a maintenance window. The partitions
+of the following months are created by the API when it starts and by `flask history maintain`.
+
+Revision ID: a5f0c7d2e914
+Revises: e8c24a7f19d3
+Create Date: 2026-10-19 17:11:43.205871
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5f0c7d2e914'
+down_revision = 'e8c24a7f19d3'
+branch_labels = None
+depends_on = None
+
+TABLE = 'agent_interaction_history'
+SEQUENCE = 'agent_interaction_history_id_seq'
+PARTITIONS_AHEAD = 2
+COLUMNS = 'id, account_id, agent_id, session_id, timestamp, interaction, summary, embedding'
+SESSION_COLUMNS = ['account_id', 'agent_id', 'session_id', sa.text('id DESC')]
+INDEXES = {
+    'ix_agent_interaction_history_session_id_desc': (SESSION_COLUMNS, None),
+    'ix_agent_interaction_history_plans': (SESSION_COLUMNS, "type = 'plan'"),
+    'ix_agent_interaction_history_confirmations': (SESSION_COLUMNS, "type = 'confirmation'"),
+    'ix_agent_interaction_history_jobs': (SESSION_COLUMNS, "type = 'job'"),
+    'ix_agent_interaction_history_job_events': (['job_id', 'id'], 'job_id IS NOT NULL'),
+    'ix_agent_interaction_history_references': (
+        ['account_id', 'agent_id', 'reference_id', sa.text('id DESC')],
+        'reference_id IS NOT NULL',
+    ),
+}
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_table(name, partitioned):
+    op.create_table(
+        name,
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{SEQUENCE}'::regclass)"), nullable=False),
+        sa.Column('account_id', sa.String(), nullable=False),
+        sa.Column('agent_id', sa.String(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.Column('interaction', postgresql.JSONB(), nullable=False),
+        sa.Column('type', sa.String(), sa.Computed("interaction->>'type'", persisted=True)),
+        sa.Column('job_id', sa.String(), sa.Computed("interaction->'content'->>'job_id'", persisted=True)),
+        sa.Column(
+            'reference_id', sa.String(), sa.Computed("interaction->'content'->>'reference_id'", persisted=True)
+        ),
+        sa.Column('summary', sa.String(), nullable=True),
+        sa.Column('embedding', pgvector.sqlalchemy.Vector(1536), nullable=True),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.agent_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(*(['id', 'timestamp'] if partitioned else ['id']), name=f'{TABLE}_pkey'),
+        **({'postgresql_partition_by': 'RANGE (timestamp)'} if partitioned else {}),
+    )
+
+
+def _create_indexes():
+    for name, (columns, where) in INDEXES.items():
+        op.create_index(
+            name,
+            TABLE,
+            columns,
+            unique=False,
+            postgresql_where=sa.text(where) if where else None,
+        )
+
+
+def _replace_table(partitioned):
+    """
+    Copy the history into a new table, partitioned or not, with the same IDs, sequence and indexes.
+    """
+    old = f'{TABLE}_old'
+    op.execute(f'LOCK TABLE {TABLE} IN EXCLUSIVE MODE')
+    op.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+    for name in [f'{TABLE}_pkey', *INDEXES]:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_old')
+    _create_table(TABLE, partitioned)
+
+    if partitioned:
+        first = op.get_bind().execute(sa.text(f'SELECT min(timestamp) FROM {old}')).scalar()
+        now = datetime.now(timezone.utc)
+        month = date((first or now).year, (first or now).month, 1)
+        last = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+        while month <= last:
+            op.execute(
+                f"CREATE TABLE {TABLE}_p{month.year:04d}{month.month:02d} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+        op.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+    # the generated columns are computed again; the indexes are built once the rows are in
+    op.execute(f'INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {old}')
+    op.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+    op.drop_table(old)
+    _create_indexes()
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('agent_history_retention'):
+        op.create_table(
+            'agent_history_retention',
+            sa.Column('account_id', sa.String(), nullable=False),
+            sa.Column('retention_months', sa.Integer(), nullable=True),
+            sa.Column('archive', sa.Boolean(), nullable=False),
+            sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+            sa.PrimaryKeyConstraint('account_id'),
+        )
+
+    relkind = op.get_bind().execute(
+        sa.text('SELECT relkind FROM pg_class WHERE relname = :table'), {'table': TABLE}
+    ).scalar()
+    # missing, or created partitioned from the model
+    if relkind != 'r':
+        return
+    _replace_table(partitioned=True)
+
+
+def downgrade():
+    relkind = op.get_bind().execute(
+        sa.text('SELECT relkind FROM pg_class WHERE relname = :table'), {'table': TABLE}
+    ).scalar()
+    if relkind == 'p':
+        # the partitions are dropped with the partitioned table
+        _replace_table(partitioned=False)
+    op.drop_table('agent_history_retention')
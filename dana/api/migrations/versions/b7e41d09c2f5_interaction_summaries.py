@@ -0,0 +1,47 @@
+"""Add agent_interaction_summaries, the chunk summaries of the memory of a session
+
+Revision ID: b7e41d09c2f5
+Revises: 62bce8744b4c
+Create Date: 2026-10-19 14:21:07.552013
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41d09c2f5'
+down_revision = '62bce8744b4c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('agent_interaction_summaries'):
+        return
+    op.create_table(
+        'agent_interaction_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.String(), nullable=False),
+        sa.Column('agent_id', sa.String(), nullable=False),
+        sa.Column('session_id', sa.String(), nullable=False),
+        sa.Column('from_id', sa.Integer(), nullable=False),
+        sa.Column('to_id', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('folded', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['agent_id'], ['agents.agent_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('agent_interaction_summaries', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_interaction_summaries_session',
+            ['account_id', 'agent_id', 'session_id', 'to_id'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('agent_interaction_summaries', schema=None) as batch_op:
+        batch_op.drop_index('ix_interaction_summaries_session')
+    op.drop_table('agent_interaction_summaries')
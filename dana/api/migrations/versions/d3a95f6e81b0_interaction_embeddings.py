@@ -0,0 +1,38 @@
+"""Add agent_interaction_history.embedding for retrieving relevant interactions
+
+The interactions saved before this revision have no embedding and are never retrieved by similarity.
+
+Revision ID: d3a95f6e81b0
+Revises: b7e41d09c2f5
+Create Date: 2026-10-19 15:08:52.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a95f6e81b0'
+down_revision = 'b7e41d09c2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # also needed by a table created from the model
+    op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('agent_interaction_history'):
+        return
+    if 'embedding' in {column['name'] for column in inspector.get_columns('agent_interaction_history')}:
+        return
+    with op.batch_alter_table('agent_interaction_history', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('embedding', pgvector.sqlalchemy.Vector(1536), nullable=True)
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('agent_interaction_history', schema=None) as batch_op:
+        batch_op.drop_column('embedding')
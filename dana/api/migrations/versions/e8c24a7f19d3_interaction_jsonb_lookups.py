@@ -0,0 +1,96 @@
+"""Store agent_interaction_history.interaction as JSONB and index the lookups by type, job and reference
+
+The type, job_id and reference_id of the interactions are extracted into generated columns, with partial indexes
+for the latest plan or confirmation of a session, the job interactions of a session, the events of a job and the
+interactions about a generated code. Changing the type of the interaction column and adding stored generated
+columns both rewrite the table under an exclusive lock: run this revision in a maintenance window.
+
+Revision ID: e8c24a7f19d3
+Revises: d3a95f6e81b0
+Create Date: 2026-10-19 16:02:17.640385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c24a7f19d3'
+down_revision = 'd3a95f6e81b0'
+branch_labels = None
+depends_on = None
+
+GENERATED_COLUMNS = {
+    'type': "interaction->>'type'",
+    'job_id': "interaction->'content'->>'job_id'",
+    'reference_id': "interaction->'content'->>'reference_id'",
+}
+SESSION_COLUMNS = ['account_id', 'agent_id', 'session_id', sa.text('id DESC')]
+INDEXES = {
+    'ix_agent_interaction_history_plans': (SESSION_COLUMNS, "type = 'plan'"),
+    'ix_agent_interaction_history_confirmations': (SESSION_COLUMNS, "type = 'confirmation'"),
+    'ix_agent_interaction_history_jobs': (SESSION_COLUMNS, "type = 'job'"),
+    'ix_agent_interaction_history_job_events': (['job_id', 'id'], 'job_id IS NOT NULL'),
+    'ix_agent_interaction_history_references': (
+        ['account_id', 'agent_id', 'reference_id', sa.text('id DESC')],
+        'reference_id IS NOT NULL',
+    ),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('agent_interaction_history'):
+        return
+    columns = {column['name']: column for column in inspector.get_columns('agent_interaction_history')}
+
+    if not isinstance(columns['interaction']['type'], postgresql.JSONB):
+        op.alter_column(
+            'agent_interaction_history',
+            'interaction',
+            type_=postgresql.JSONB(),
+            existing_type=sa.JSON(),
+            existing_nullable=False,
+            postgresql_using='interaction::jsonb',
+        )
+    for name, expression in GENERATED_COLUMNS.items():
+        if name not in columns:
+            op.add_column(
+                'agent_interaction_history',
+                sa.Column(name, sa.String(), sa.Computed(expression, persisted=True), nullable=True),
+            )
+
+    # built without locking the table for writes
+    with op.get_context().autocommit_block():
+        for name, (index_columns, where) in INDEXES.items():
+            op.create_index(
+                name,
+                'agent_interaction_history',
+                index_columns,
+                unique=False,
+                postgresql_where=sa.text(where),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name,
+                table_name='agent_interaction_history',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+    for name in GENERATED_COLUMNS:
+        op.drop_column('agent_interaction_history', name)
+    op.alter_column(
+        'agent_interaction_history',
+        'interaction',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using='interaction::json',
+    )
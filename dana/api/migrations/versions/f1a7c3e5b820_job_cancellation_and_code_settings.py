@@ -0,0 +1,59 @@
+"""Add the cancelled job status and the execution settings of the generated codes
+
+The status of agent_jobs is a Postgres enum: the cancelled status needs a new value, added outside of a transaction.
+agent_generated_codes gets timeout_seconds (maximum run time of the jobs of a code, NULL for the executor default),
+idempotent (results may be served from the result cache) and action (trusted registry action executing the code).
+
+Revision ID: f1a7c3e5b820
+Revises: a5f0c7d2e914
+Create Date: 2026-10-20 09:12:30.418266
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a7c3e5b820'
+down_revision = 'a5f0c7d2e914'
+branch_labels = None
+depends_on = None
+
+ENUM_NAME = 'jobtype'
+
+
+def upgrade():
+    bind = op.get_bind()
+    labels = bind.execute(
+        sa.text(
+            'SELECT enumlabel FROM pg_enum JOIN pg_type ON pg_type.oid = pg_enum.enumtypid WHERE typname = :name'
+        ),
+        {'name': ENUM_NAME},
+    ).scalars().all()
+    if labels:
+        # the enum stores the names of the members of JobType, unless it was created with their values
+        label = 'CANCELLED' if 'CREATED' in labels else 'cancelled'
+        with op.get_context().autocommit_block():
+            op.execute(f"ALTER TYPE {ENUM_NAME} ADD VALUE IF NOT EXISTS '{label}'")
+
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('agent_generated_codes'):
+        return
+    columns = {column['name'] for column in inspector.get_columns('agent_generated_codes')}
+    with op.batch_alter_table('agent_generated_codes', schema=None) as batch_op:
+        if 'timeout_seconds' not in columns:
+            batch_op.add_column(sa.Column('timeout_seconds', sa.Integer(), nullable=True))
+        if 'idempotent' not in columns:
+            batch_op.add_column(
+                sa.Column('idempotent', sa.Boolean(), server_default=sa.false(), nullable=False)
+            )
+        if 'action' not in columns:
+            batch_op.add_column(sa.Column('action', sa.Text(), nullable=True))
+
+
+def downgrade():
+    # Postgres can't remove a value from an enum: the cancelled status stays
+    with op.batch_alter_table('agent_generated_codes', schema=None) as batch_op:
+        batch_op.drop_column('action')
+        batch_op.drop_column('idempotent')
+        batch_op.drop_column('timeout_seconds')
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, BigInteger, String, JSON, TIMESTAMP, UniqueConstraint
+from api.db import Base
+
+
+class Artifact(Base):
+    """
+    A columnar data file (a .npy array or an Arrow IPC file) exchanged with jobs by handle.
+    The handle is the SHA-256 of the content, so identical data is stored once per account.
+    Only the schema and the summary statistics are ever copied into the interaction history.
+    """
+
+    __tablename__ = "agent_artifacts"
+
+    id = Column(Integer, primary_key=True)
+    artifact_id = Column(String, nullable=False)
+    account_id = Column(String, nullable=False)
+    agent_id = Column(String, nullable=True)
+    name = Column(String, nullable=False)
+    format = Column(String, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    schema = Column(JSON, nullable=True)
+    summary = Column(JSON, nullable=True)
+    storage_path = Column(String, nullable=False)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "artifact_id", name="unique_account_artifact"),
+    )
+
+    def to_dict(self):
+        return {
+            "artifact_id": self.artifact_id,
+            "name": self.name,
+            "format": self.format,
+            "size_bytes": self.size_bytes,
+            "schema": self.schema,
+            "summary": self.summary,
+            "created_at": self.created_at,
+        }
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from sqlalchemy import Boolean, Column, Integer, String, TIMESTAMP
+from api.db import Base
+
+
+class HistoryRetention(Base):
+    """
+    The retention policy of the interaction history of an account, overriding the default of the deployment
+    (HISTORY_RETENTION_MONTHS, HISTORY_ARCHIVE_ENABLED).
+    """
+
+    __tablename__ = "agent_history_retention"
+
+    account_id = Column(String, primary_key=True)
+    # months of history kept after the current one, None to keep the history forever
+    retention_months = Column(Integer, nullable=True)
+    # whether the expired interactions are exported to the archive before they are deleted
+    archive = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(
+        TIMESTAMP,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def to_dict(self):
+        return {
+            "retention_months": self.retention_months,
+            "archive": self.archive,
+        }
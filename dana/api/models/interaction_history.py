@@ -1,11 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, Computed, Integer, String, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from api.db import Base
-from datetime import datetime, timezone
+
+# Size of the embeddings of the interactions (text-embedding-3-small, or a larger model shortened to it)
+EMBEDDING_DIMENSIONS = 1536
 
 class InteractionHistory(Base):
+    """
+    The interactions of the sessions, partitioned by month of their timestamp (see HistoryRetentionService): the
+    queries of the agents only read the recent partitions, and old partitions are archived and dropped as a whole.
+    """
+
     __tablename__ = "agent_interaction_history"
 
-    id = Column(Integer, primary_key=True)
+    # unique on its own, the primary key includes the timestamp because it is the partition key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     account_id = Column(String, nullable=False)
     agent_id = Column(
         String,
@@ -13,11 +24,78 @@ class InteractionHistory(Base):
         nullable=False
     )
     session_id = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
-    interaction = Column(JSON, nullable=False)
+    # set by the database when the row is inserted, in UTC
+    timestamp = Column(
+        DateTime, server_default=text("timezone('utc', now())"), primary_key=True
+    )
+    interaction = Column(JSONB, nullable=False)
+    # extracted from the interaction by the database, for the lookups by kind of interaction
+    type = Column(String, Computed("interaction->>'type'", persisted=True))
+    job_id = Column(String, Computed("interaction->'content'->>'job_id'", persisted=True))
+    reference_id = Column(String, Computed("interaction->'content'->>'reference_id'", persisted=True))
     summary = Column(String, nullable=True)
+    # for retrieving the interactions relevant to a new input, only loaded when asked for. Lookups are exact within
+    # one session, found by the session index, so the column has no approximate (HNSW) index
+    embedding = deferred(Column(Vector(EMBEDDING_DIMENSIONS), nullable=True))
+
+    __table_args__ = (
+        # the history of a session is read newest first by ID
+        Index(
+            "ix_agent_interaction_history_session_id_desc",
+            account_id,
+            agent_id,
+            session_id,
+            id.desc(),
+        ),
+        # the latest plan or confirmation of a session, the job interactions of a session
+        Index(
+            "ix_agent_interaction_history_plans",
+            account_id,
+            agent_id,
+            session_id,
+            id.desc(),
+            postgresql_where=text("type = 'plan'"),
+        ),
+        Index(
+            "ix_agent_interaction_history_confirmations",
+            account_id,
+            agent_id,
+            session_id,
+            id.desc(),
+            postgresql_where=text("type = 'confirmation'"),
+        ),
+        Index(
+            "ix_agent_interaction_history_jobs",
+            account_id,
+            agent_id,
+            session_id,
+            id.desc(),
+            postgresql_where=text("type = 'job'"),
+        ),
+        # the events of a job, the plans and confirmations of a generated code
+        Index(
+            "ix_agent_interaction_history_job_events",
+            job_id,
+            id,
+            postgresql_where=text("job_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_agent_interaction_history_references",
+            account_id,
+            agent_id,
+            reference_id,
+            id.desc(),
+            postgresql_where=text("reference_id IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+    # the timestamps set by the database are returned by the INSERT
+    __mapper_args__ = {"eager_defaults": True}
 
-    def to_dict(self):
+    def to_dict(self, columns: set = None):
+        if columns:
+            # only the columns the query loaded, reading the others would load them one by one
+            return {column: getattr(self, column) for column in columns}
         return {
             "id": self.id,
             "account_id": self.account_id,
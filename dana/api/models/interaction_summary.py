@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from sqlalchemy import Boolean, Column, Integer, String, Text, TIMESTAMP, ForeignKey, Index
+from api.db import Base
+
+
+class InteractionSummary(Base):
+    """
+    The summary of a chunk of consecutive interactions of a session, the middle level of the memory of a session.
+    Interactions leave the verbatim part of the context in chunks, and the oldest chunk summaries are in turn folded
+    into the session summary, after which they are marked as folded.
+    """
+
+    __tablename__ = "agent_interaction_summaries"
+
+    id = Column(Integer, primary_key=True)
+    account_id = Column(String, nullable=False)
+    agent_id = Column(
+        String, ForeignKey("agents.agent_id", ondelete="CASCADE"), nullable=False
+    )
+    session_id = Column(String, nullable=False)
+    # IDs of the first and last interactions of the chunk
+    from_id = Column(Integer, nullable=False)
+    to_id = Column(Integer, nullable=False)
+    summary = Column(Text, nullable=False)
+    folded = Column(Boolean, nullable=False, default=False)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_interaction_summaries_session", "account_id", "agent_id", "session_id", "to_id"),
+    )
+
+    def to_dict(self):
+        return {
+            "from_id": self.from_id,
+            "to_id": self.to_id,
+            "summary": self.summary,
+        }
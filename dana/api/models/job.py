@@ -9,6 +9,7 @@ class JobType(enum.Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class Job(Base):
@@ -24,6 +25,10 @@ class Job(Base):
     description = Column(String, nullable=True)
     status = Column(Enum(JobType), default=JobType.CREATED)
     payload = Column(String, nullable=True)
+    # set on the child jobs of a batch job, one per input set
+    parent_job_id = Column(
+        String, ForeignKey("agent_jobs.job_id", ondelete="CASCADE"), nullable=True, index=True
+    )
     created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
 
     __table_args__ = (UniqueConstraint("job_id", name="unique_job_id"),)
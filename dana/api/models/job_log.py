@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Index
+from api.db import Base
+
+
+class JobLogChunk(Base):
+    """
+    A bounded piece of the stdout or stderr of a job. The output of a job is stored as a sequence of chunks,
+    so a large output is never loaded or sent as a whole.
+    """
+
+    __tablename__ = "agent_job_log_chunks"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(
+        String, ForeignKey("agent_jobs.job_id", ondelete="CASCADE"), nullable=False
+    )
+    account_id = Column(String, nullable=False)
+    sequence = Column(Integer, nullable=False)
+    stream = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (Index("ix_job_log_chunks_job_sequence", "job_id", "sequence"),)
+
+    def to_dict(self):
+        return {
+            "sequence": self.sequence,
+            "stream": self.stream,
+            "content": self.content,
+            "created_at": self.created_at,
+        }
@@ -1,6 +1,7 @@
 from api.models.agent import Agent
 from api.models.session import AgentSession
 from api.db import db
+from sqlalchemy import text
 from embodiment.interactors.interactor_factory import InteractorFactory
 
 
@@ -36,6 +37,37 @@ class AgentService:
         # Placeholder logic - replace with DB fetch
         return [{"name": "example_code", "version": 1, "description": "Test code"}]
 
+    def update_generated_code_settings(
+        self,
+        account_id: str,
+        agent_id: str,
+        reference_id: str,
+        settings: dict,
+    ) -> int:
+        """
+        Update the execution settings of a generated code: `idempotent` (results may be served from the result cache)
+        and `timeout_seconds` (maximum run time of its jobs).
+        :param settings: The settings to change. Other keys are ignored.
+        :return: The number of updated codes, 0 if the reference ID is unknown.
+        """
+        columns = [column for column in ("idempotent", "timeout_seconds") if column in settings]
+        if not columns:
+            return 0
+        query = f"""
+            UPDATE agent_generated_codes
+            SET {", ".join(f"{column} = :{column}" for column in columns)}
+            WHERE account_id = :account_id AND agent_id = :agent_id AND reference_id = :reference_id
+        """
+        params = {
+            "account_id": account_id,
+            "agent_id": agent_id,
+            "reference_id": reference_id,
+            **{column: settings[column] for column in columns},
+        }
+        result = db.session.execute(text(query), params)
+        db.session.commit()
+        return result.rowcount
+
     def interact(
         self, account_id: str, agent_id: str, user_input: str, session_id: str = None
     ):
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional
+from sqlalchemy.exc import IntegrityError
+from api.models.artifact import Artifact
+from api.db import db
+
+ARTIFACT_FORMATS = ("npy", "arrow")
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class ArtifactNotFound(Exception):
+    pass
+
+
+class InvalidArtifact(Exception):
+    pass
+
+
+class ArtifactService:
+    """
+    Stores the columnar artifacts of the jobs on disk, content-addressed, with their metadata in the database.
+    """
+
+    def __init__(self, storage_root: Optional[str] = None):
+        self.storage_root = storage_root or os.getenv(
+            "ARTIFACT_STORAGE_ROOT", "/tmp/0dev/artifacts"
+        )
+
+    def store(
+        self,
+        account_id: str,
+        agent_id: Optional[str],
+        name: str,
+        format: str,
+        content: BinaryIO,
+        schema: Optional[dict] = None,
+        summary: Optional[dict] = None,
+    ) -> Artifact:
+        """
+        Store an artifact unless the account already has the same content.
+
+        :param format: "npy" or "arrow".
+        :param content: Stream of the file, copied to the storage in chunks.
+        :param schema: Column names and types, as computed by the agent.
+        :param summary: Row count and per-column statistics, as computed by the agent.
+        :return: The stored artifact. Its artifact_id is the handle jobs refer to it by.
+        """
+        if format not in ARTIFACT_FORMATS:
+            raise InvalidArtifact(f"Unsupported artifact format: {format}")
+
+        account_dir = os.path.join(self.storage_root, account_id)
+        os.makedirs(account_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=account_dir, delete=False) as temp_file:
+            try:
+                while chunk := content.read(COPY_CHUNK_BYTES):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.remove(temp_file.name)
+                raise
+        artifact_id = digest.hexdigest()
+
+        artifact = Artifact.query.filter_by(
+            account_id=account_id, artifact_id=artifact_id
+        ).first()
+        if artifact:
+            os.remove(temp_file.name)
+            return artifact
+
+        storage_path = os.path.join(account_dir, artifact_id[:2], f"{artifact_id}.{format}")
+        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+        os.replace(temp_file.name, storage_path)
+        artifact = Artifact(
+            artifact_id=artifact_id,
+            account_id=account_id,
+            agent_id=agent_id,
+            name=name,
+            format=format,
+            size_bytes=size,
+            schema=schema,
+            summary=summary,
+            storage_path=storage_path,
+        )
+        db.session.add(artifact)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # a concurrent upload of the same content stored it first; the file written is identical
+            db.session.rollback()
+            return Artifact.query.filter_by(
+                account_id=account_id, artifact_id=artifact_id
+            ).one()
+        return artifact
+
+    def get(self, account_id: str, artifact_id: str) -> Artifact:
+        artifact = Artifact.query.filter_by(
+            account_id=account_id, artifact_id=artifact_id
+        ).first()
+        if not artifact or not os.path.exists(artifact.storage_path):
+            raise ArtifactNotFound("Artifact not found")
+        return artifact
@@ -247,6 +247,7 @@ class ControllerService:
                 "facts": agent_details.get("facts", []),
                 "secrets": agent_details.get("secrets", []),
                 "integrations": agent_details.get("integrations", []),
+                "resource_limits": agent_details.get("resource_limits", {}),
             }
             package_path = self.deployment_strategy.package(agent_id, agent_config)
 
@@ -0,0 +1,59 @@
+import logging
+import threading
+import time
+
+from api.services.interaction_history_service import InteractionHistoryService
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackfill:
+    """
+    Embeds the saved interactions in the background, so that saving an interaction never waits for the embedding
+    model. It starts from the interactions of the recent partitions that have no embedding yet, then follows the
+    new ones; interactions that could not be embedded (e.g. while the model was unavailable) are retried.
+    Once it has caught up, it starts over from the oldest recent interaction every `rescan_interval` seconds, for the
+    interactions committed by other writers after it passed their ID.
+    The older history is embedded by `flask history embed --all`.
+    """
+
+    def __init__(self, app, interval: float = 5.0, batch_size: int = 100, rescan_interval: float = 60.0):
+        """
+        :param app: The Flask app, for the database session of the thread.
+        :param interval: Number of seconds between two lookups of new interactions, once every one is embedded.
+        :param batch_size: Number of interactions embedded in one request to the model.
+        :param rescan_interval: Minimum number of seconds between two lookups of the whole recent history.
+        """
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.rescan_interval = rescan_interval
+        self.service = InteractionHistoryService()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="embedding-backfill", daemon=True)
+
+    def start(self):
+        if self.service.embeddings.enabled:
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        after_id = 0
+        rescanned_at = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    progress = self.service.embed_missing(after_id, limit=self.batch_size)
+            except Exception:
+                # already logged; the same interactions are retried after the interval
+                progress = {"after_id": after_id, "embedded": 0, "failed": True}
+            after_id = progress["after_id"]
+            if not progress["embedded"] and not progress.get("failed"):
+                # caught up: the IDs passed over may belong to transactions that were still open
+                if time.monotonic() - rescanned_at >= self.rescan_interval:
+                    after_id = 0
+                    rescanned_at = time.monotonic()
+            if progress["embedded"] < self.batch_size:
+                self._stopped.wait(self.interval)
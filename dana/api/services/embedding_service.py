@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import func, or_
+
+from api.models.interaction_history import EMBEDDING_DIMENSIONS
+from core.llms.llm_factory import LLMFactory
+
+logger = logging.getLogger(__name__)
+
+# Interactions are embedded from their JSON, cut to stay within the input limit of the embedding model
+MAX_EMBEDDING_TEXT_CHARS = 8000
+# Job updates that only report progress, not worth retrieving
+SKIPPED_JOB_STATUSES = {"created", "in_progress"}
+
+
+class EmbeddingService:
+    """
+    Computes the embeddings of the interactions, for retrieving the past interactions relevant to a new input.
+    Disabled (every embedding is None) unless EMBEDDINGS_ENABLED is set and a provider with embeddings is configured.
+    """
+
+    def __init__(self):
+        self.model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self._client = None
+        if os.getenv("EMBEDDINGS_ENABLED", "false").lower() == "true":
+            self._client = LLMFactory.create(
+                provider=os.getenv("EMBEDDING_LLM_PROVIDER", "openai"),
+                api_key=os.getenv("EMBEDDING_LLM_API_KEY"),
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self._client is not None
+
+    def embed_interactions(self, interactions: list[dict], raise_errors: bool = False) -> list[Optional[list[float]]]:
+        """
+        Embed interactions in one request. Interactions that aren't worth retrieving get no embedding, and
+        neither do any if the embedding model fails.
+
+        :param interactions: The interactions.
+        :param raise_errors: Raise the error of the embedding model instead of returning no embeddings.
+        :return: One embedding or None per interaction, in the same order.
+        """
+        embeddings = [None] * len(interactions)
+        texts = {
+            index: _interaction_text(interaction)
+            for index, interaction in enumerate(interactions)
+            if self.enabled and _is_retrievable(interaction)
+        }
+        if not texts:
+            return embeddings
+        try:
+            for index, embedding in zip(texts, self._embed(list(texts.values()))):
+                embeddings[index] = embedding
+        except Exception as e:
+            logger.error(f"Error embedding {len(texts)} interactions: {e}")
+            if raise_errors:
+                raise
+        return embeddings
+
+    def embed_query(self, text: str) -> Optional[list[float]]:
+        """
+        Embed the text the relevant interactions are looked up for, None if embeddings are disabled.
+        """
+        if not self.enabled:
+            return None
+        return self._embed([text[:MAX_EMBEDDING_TEXT_CHARS]])[0]
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        return self._client.embed(texts, model=self.model, dimensions=EMBEDDING_DIMENSIONS)
+
+
+def retrievable_filter(model):
+    """
+    The SQL condition matching the interactions worth retrieving, the ones that get an embedding.
+    """
+    return or_(
+        model.type.is_(None),
+        model.type != "job",
+        func.coalesce(model.interaction["content"]["status"].astext, "").notin_(SKIPPED_JOB_STATUSES),
+    )
+
+
+def _is_retrievable(interaction: dict) -> bool:
+    content = interaction.get("content")
+    return not (
+        interaction.get("type") == "job"
+        and isinstance(content, dict)
+        and content.get("status") in SKIPPED_JOB_STATUSES
+    )
+
+
+def _interaction_text(interaction: dict) -> str:
+    content = interaction.get("content")
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    return f"{interaction.get('type')}: {content}"[:MAX_EMBEDDING_TEXT_CHARS]
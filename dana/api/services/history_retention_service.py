@@ -0,0 +1,328 @@
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import text
+from api.models.history_retention import HistoryRetention
+from api.models.interaction_history import InteractionHistory
+from api.db import db
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = InteractionHistory.__tablename__
+DEFAULT_PARTITION = f"{HISTORY_TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{HISTORY_TABLE}_p(\d{{4}})(\d{{2}})$")
+# Columns of the archived interactions; the embeddings are left out, they can be computed again
+ARCHIVED_COLUMNS = ["id", "account_id", "agent_id", "session_id", "timestamp", "interaction", "summary"]
+ARCHIVE_BATCH_ROWS = 1000
+# Dropping a partition locks the history table: give up rather than queue the writes behind a long query
+DROP_LOCK_TIMEOUT = "5s"
+
+
+class InvalidRetention(Exception):
+    pass
+
+
+def month_start(moment: datetime = None) -> date:
+    """
+    The first day of the month of a moment, in UTC, now by default.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{HISTORY_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+class HistoryRetentionService:
+    """
+    Maintains the monthly partitions of the interaction history: creates the partitions of the coming months and
+    applies the retention policies, exporting the expired interactions to gzipped JSON lines files, one per account
+    and month, before deleting them. A partition expired for every account is dropped as a whole; otherwise the
+    expired interactions of some accounts are deleted from it. Retention is counted in whole months: with a
+    retention of N months, the interactions of a month are removed once N more months have fully passed.
+    """
+
+    def __init__(self):
+        self.partitions_ahead = int(os.getenv("HISTORY_PARTITIONS_AHEAD", 2))
+        retention_months = os.getenv("HISTORY_RETENTION_MONTHS")
+        self.retention_months = int(retention_months) if retention_months else None
+        self.archive = os.getenv("HISTORY_ARCHIVE_ENABLED", "true").lower() == "true"
+        self.archive_dir = os.getenv("HISTORY_ARCHIVE_DIR", "/tmp/0dev/history-archive")
+
+    def get_policy(self, account_id: str) -> dict:
+        """
+        Return the retention policy of an account, its own or the default one.
+
+        :param account_id: The ID of the account.
+        :return: {"retention_months": months kept after the current one, None for ever, "archive": whether the
+            expired interactions are archived, "default": whether the account follows the default policy}
+        """
+        policy = db.session.get(HistoryRetention, account_id)
+        if policy:
+            return {**policy.to_dict(), "default": False}
+        return {"retention_months": self.retention_months, "archive": self.archive, "default": True}
+
+    def set_policy(self, account_id: str, retention_months: Optional[int], archive: bool = True) -> dict:
+        """
+        Set the retention policy of an account. It is applied by the next maintenance run.
+
+        :param account_id: The ID of the account.
+        :param retention_months: The months of history to keep after the current one, None to keep it forever.
+        :param archive: Whether to archive the expired interactions before deleting them.
+        :return: The policy, as returned by get_policy.
+        :raises InvalidRetention: If the retention is not a positive number of months.
+        """
+        if retention_months is not None and (
+            not isinstance(retention_months, int) or isinstance(retention_months, bool) or retention_months < 1
+        ):
+            raise InvalidRetention("The retention must be a positive number of months, or null to keep everything")
+        try:
+            policy = db.session.get(HistoryRetention, account_id) or HistoryRetention(account_id=account_id)
+            policy.retention_months = retention_months
+            policy.archive = bool(archive)
+            db.session.add(policy)
+            db.session.commit()
+            return self.get_policy(account_id)
+        except Exception as e:
+            logger.error(f"Error setting the retention policy of {account_id}: {e}")
+            db.session.rollback()
+            raise e
+
+    def reset_policy(self, account_id: str) -> dict:
+        """
+        Make an account follow the default retention policy again.
+        """
+        try:
+            HistoryRetention.query.filter_by(account_id=account_id).delete()
+            db.session.commit()
+            return self.get_policy(account_id)
+        except Exception as e:
+            logger.error(f"Error resetting the retention policy of {account_id}: {e}")
+            db.session.rollback()
+            raise e
+
+    def list_partitions(self) -> list[dict]:
+        """
+        List the monthly partitions of the history.
+
+        :return: [{"name", "start", "end"}], oldest first. Empty if the history table is not partitioned.
+        """
+        names = db.session.execute(
+            text(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table AND parent.relkind = 'p'
+                """
+            ),
+            {"table": HISTORY_TABLE},
+        ).scalars()
+        partitions = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match:
+                start = date(int(match.group(1)), int(match.group(2)), 1)
+                partitions.append({"name": name, "start": start, "end": add_months(start, 1)})
+        return sorted(partitions, key=lambda partition: partition["start"])
+
+    def ensure_partitions(self, now: datetime = None) -> list[str]:
+        """
+        Create the partitions of the current month and of the next HISTORY_PARTITIONS_AHEAD months, and the
+        default partition that receives the interactions no monthly partition covers.
+
+        :param now: The current time, in UTC.
+        :return: The names of the created partitions.
+        """
+        is_partitioned = db.session.execute(
+            text("SELECT 1 FROM pg_class WHERE relname = :table AND relkind = 'p'"), {"table": HISTORY_TABLE}
+        ).scalar()
+        if not is_partitioned:
+            # not migrated yet
+            db.session.rollback()
+            return []
+
+        existing = {partition["name"] for partition in self.list_partitions()}
+        statements = {}
+        first = month_start(now)
+        for offset in range(self.partitions_ahead + 1):
+            month = add_months(first, offset)
+            name = partition_name(month)
+            if name not in existing:
+                statements[name] = (
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {HISTORY_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                )
+        statements[DEFAULT_PARTITION] = f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {HISTORY_TABLE} DEFAULT"
+
+        created = []
+        for name, statement in statements.items():
+            try:
+                db.session.execute(text(statement))
+                db.session.commit()
+                if name != DEFAULT_PARTITION:
+                    created.append(name)
+            except Exception as e:
+                # e.g. the default partition already has interactions of the month, which must be moved by hand
+                logger.error(f"Error creating the history partition {name}: {e}")
+                db.session.rollback()
+        if created:
+            logger.info(f"Created the history partitions {', '.join(created)}")
+
+        in_default = db.session.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+        db.session.rollback()
+        if in_default:
+            logger.warning(
+                f"{in_default} interactions are in {DEFAULT_PARTITION}, outside of the monthly partitions: "
+                "they are never archived nor deleted"
+            )
+        return created
+
+    def apply_retention(self, now: datetime = None, dry_run: bool = False) -> list[dict]:
+        """
+        Archive and delete the expired interactions of the past months, according to the retention policies.
+
+        :param now: The current time, in UTC.
+        :param dry_run: Only return what would be done.
+        :return: One entry per partition with expired interactions: {"partition", "action": "drop" or "delete",
+            "accounts": the accounts with their own policy whose interactions expired, "others": whether the
+            interactions of the accounts with the default policy expired, "archived": the archive files written,
+            "deleted": the number of deleted interactions, None for a dropped partition}
+        """
+        policies = HistoryRetention.query.all()
+        db.session.rollback()
+        current = month_start(now)
+        policy_accounts = [policy.account_id for policy in policies]
+
+        def expired(retention_months, partition):
+            return retention_months is not None and partition["end"] <= add_months(current, -retention_months)
+
+        report = []
+        for partition in self.list_partitions():
+            if partition["end"] > current:
+                continue
+            expired_policies = [policy for policy in policies if expired(policy.retention_months, partition)]
+            others = expired(self.retention_months, partition)
+            if not expired_policies and not others:
+                continue
+            accounts = [policy.account_id for policy in expired_policies]
+            archived_accounts = [policy.account_id for policy in expired_policies if policy.archive]
+            entry = {
+                "partition": partition["name"],
+                "action": "drop" if others and len(expired_policies) == len(policies) else "delete",
+                "accounts": accounts,
+                "others": others,
+                "archived": [],
+                "deleted": None,
+            }
+            report.append(entry)
+            if dry_run:
+                continue
+
+            if archived_accounts or (others and self.archive):
+                entry["archived"] = self._archive(
+                    partition["name"], archived_accounts, others and self.archive, policy_accounts
+                )
+            if entry["action"] == "drop":
+                self._drop(partition["name"])
+            else:
+                entry["deleted"] = self._delete(partition["name"], accounts, others, policy_accounts)
+            logger.info(
+                f"Applied the history retention to {partition['name']}: {entry['action']}, "
+                f"{len(entry['archived'])} archive files"
+            )
+        return report
+
+    def _archive(self, partition: str, accounts: list[str], others: bool, policy_accounts: list[str]) -> list[str]:
+        """
+        Export the interactions of a partition to <archive dir>/<account>/<partition>.jsonl.gz, written atomically.
+        An existing file is replaced: it is from an earlier run that did not get to delete the interactions.
+        """
+        condition, params = _accounts_condition(accounts, others, policy_accounts)
+        result = db.session.execute(
+            text(
+                f"SELECT {', '.join(ARCHIVED_COLUMNS)} FROM {partition} WHERE {condition} ORDER BY account_id, id"
+            ),
+            params,
+            execution_options={"yield_per": ARCHIVE_BATCH_ROWS},
+        )
+        paths = []
+        account_id, archive_file, temp_path = None, None, None
+        try:
+            for row in result:
+                if row.account_id != account_id:
+                    if archive_file:
+                        paths.append(_close_archive(archive_file, temp_path, account_id, partition, self.archive_dir))
+                    account_id = row.account_id
+                    account_dir = os.path.join(self.archive_dir, account_id)
+                    os.makedirs(account_dir, exist_ok=True)
+                    temp_fd, temp_path = tempfile.mkstemp(dir=account_dir, suffix=".tmp")
+                    os.close(temp_fd)
+                    archive_file = gzip.open(temp_path, "wt", encoding="utf-8")
+                archive_file.write(json.dumps(dict(row._mapping), default=str) + "\n")
+            if archive_file:
+                paths.append(_close_archive(archive_file, temp_path, account_id, partition, self.archive_dir))
+                archive_file = None
+        except BaseException:
+            if archive_file:
+                archive_file.close()
+                os.remove(temp_path)
+            raise
+        finally:
+            result.close()
+            db.session.rollback()
+        return paths
+
+    def _delete(self, partition: str, accounts: list[str], others: bool, policy_accounts: list[str]) -> int:
+        condition, params = _accounts_condition(accounts, others, policy_accounts)
+        try:
+            deleted = db.session.execute(text(f"DELETE FROM {partition} WHERE {condition}"), params).rowcount
+            db.session.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting the expired interactions of {partition}: {e}")
+            db.session.rollback()
+            raise e
+
+    def _drop(self, partition: str):
+        try:
+            db.session.execute(text(f"SET LOCAL lock_timeout = '{DROP_LOCK_TIMEOUT}'"))
+            db.session.execute(text(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {partition}"))
+            db.session.execute(text(f"DROP TABLE {partition}"))
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error dropping the history partition {partition}: {e}")
+            db.session.rollback()
+            raise e
+
+
+def _accounts_condition(accounts: list[str], others: bool, policy_accounts: list[str]) -> tuple[str, dict]:
+    """
+    The SQL condition selecting the interactions of some accounts with their own policy and, if others is set, of
+    all the accounts with the default policy.
+    """
+    condition = "account_id = ANY(:accounts)"
+    if others:
+        condition += " OR account_id <> ALL(:policy_accounts)"
+    return f"({condition})", {"accounts": accounts, "policy_accounts": policy_accounts}
+
+
+def _close_archive(archive_file, temp_path: str, account_id: str, partition: str, archive_dir: str) -> str:
+    archive_file.close()
+    with open(temp_path, "rb") as written:
+        os.fsync(written.fileno())
+    path = os.path.join(archive_dir, account_id, f"{partition}.jsonl.gz")
+    os.replace(temp_path, path)
+    return path
@@ -1,27 +1,100 @@
+import copy
+import os
+from datetime import datetime, time
 from api.models.interaction_history import InteractionHistory
+from api.models.interaction_summary import InteractionSummary
+from api.services.embedding_service import EmbeddingService, retrievable_filter
+from api.services.history_retention_service import add_months, month_start
 from api.db import db
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
 import logging
 logger = logging.getLogger(__name__)
 
+class OverlappingChunk(Exception):
+    pass
+
+
+# Fields of an interaction that can be selected or excluded, the first part of a dotted path
+HISTORY_FIELDS = {
+    "id",
+    "account_id",
+    "agent_id",
+    "session_id",
+    "timestamp",
+    "interaction",
+    "summary",
+    "type",
+    "job_id",
+    "reference_id",
+}
+
+
+def _project(row: dict, fields: list[str] = None, exclude: list[str] = None) -> dict:
+    """
+    Keep the selected (dotted) fields of a row and drop the excluded ones. Missing paths are ignored.
+    """
+    if fields:
+        projected = {"id": row["id"]}
+        for path in fields:
+            source, target = row, projected
+            keys = path.split(".")
+            for key in keys[:-1]:
+                if not isinstance(source, dict) or key not in source:
+                    break
+                source = source[key]
+                target = target.setdefault(key, {})
+            else:
+                if isinstance(source, dict) and keys[-1] in source:
+                    target[keys[-1]] = source[keys[-1]]
+        row = projected
+    if exclude:
+        # the nested values are the ones of the loaded row, which must not change
+        row = copy.deepcopy(row)
+    for path in exclude or []:
+        keys = path.split(".")
+        parent = row
+        for key in keys[:-1]:
+            parent = parent.get(key) if isinstance(parent, dict) else None
+        if isinstance(parent, dict):
+            parent.pop(keys[-1], None)
+    return row
+
 
 class InteractionHistoryService:
 
+    def __init__(self):
+        self.embeddings = EmbeddingService()
+        # months of history before the current one read by the queries of the agents, 0 for the whole history
+        self.hot_months = int(os.getenv("HISTORY_HOT_MONTHS", 3))
+
+    def _recent(self, query, recent_only: bool = True):
+        """
+        Limit a query to the recent monthly partitions of the history, the current month and the HISTORY_HOT_MONTHS
+        before it, so that it does not look up the indexes of every older partition.
+        """
+        if not recent_only or not self.hot_months:
+            return query
+        since = datetime.combine(add_months(month_start(), -self.hot_months), time.min)
+        return query.filter(InteractionHistory.timestamp >= since)
+
     def save_interaction(
         self,
         account_id: str,
         agent_id: str,
         session_id: str,
         interaction: dict,
-        summary: str,
-    ):
+        summary: str = None,
+    ) -> dict:
         """
-        Save a new interaction and update the moving summary.
+        Save a new interaction and update the moving summary. It is embedded in the background, see EmbeddingBackfill.
 
         :param account_id: The ID of the account the agent belongs to.
         :param agent_id: The id of the agent.
         :param session_id: The session ID this interaction belongs to.
         :param interaction: A dictionary representing the interaction details.
-        :param summary: The updated summary.
+        :param summary: The updated summary, if the agent computed it with the interaction.
+        :return: The saved interaction, with its ID and timestamp.
         """
         try:
             interaction_history = InteractionHistory(
@@ -33,35 +106,304 @@ class InteractionHistoryService:
             )
             db.session.add(interaction_history)
             db.session.commit()
+            return interaction_history.to_dict()
         except Exception as e:
             logger.error(f"Error saving interaction: {e}")
             db.session.rollback()
             raise e
 
+    def save_interactions(
+        self, account_id: str, agent_id: str, session_id: str, interactions: list[dict]
+    ) -> list[dict]:
+        """
+        Save an ordered batch of interactions of a session in one transaction. They are embedded in the background.
+
+        :param account_id: The ID of the account the agent belongs to.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID the interactions belong to.
+        :param interactions: The interactions, oldest first.
+        :return: The saved interactions with their IDs and timestamps, in the same order.
+        """
+        try:
+            rows = []
+            for interaction in interactions:
+                row = InteractionHistory(
+                    account_id=account_id,
+                    agent_id=agent_id,
+                    session_id=session_id,
+                    interaction=interaction,
+                )
+                db.session.add(row)
+                # flush one by one so the IDs follow the order of the batch
+                db.session.flush()
+                rows.append(row)
+            db.session.commit()
+            return [row.to_dict() for row in rows]
+        except Exception as e:
+            logger.error(f"Error saving interactions: {e}")
+            db.session.rollback()
+            raise e
+
     def get_history(
-        self, account_id: str, agent_id: str, session_id: str, n: int = 10
-    ) -> list:
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        n: int = 10,
+        before_id: int = None,
+        after_id: int = None,
+        since_id: int = None,
+        fields: list[str] = None,
+        exclude: list[str] = None,
+        types: list[str] = None,
+        recent_only: bool = True,
+    ) -> dict:
         """
-        Retrieve the last 'n' interactions for a given session.
+        Retrieve one page of the interactions of a session, newest first, paginated by interaction ID.
+        At most one of the cursors before_id, after_id and since_id is used:
+        - none: the latest 'n' interactions;
+        - before_id: the 'n' interactions preceding before_id, to page back through the history;
+        - after_id: the 'n' interactions following after_id, to page forward without gaps;
+        - since_id: the latest 'n' interactions newer than since_id, to sync a local copy. If has_more is set,
+          there are more new interactions than 'n' and the copy should be fetched again.
 
         :param account_id: The ID of the account to filter by.
         :param agent_id: The id of the agent to filter by.
         :param session_id: The session ID to filter by.
-        :param n: The number of recent interactions to return.
-        :return: A list of interactions sorted by timestamp in descending order.
+        :param n: The maximum number of interactions to return.
+        :param before_id: Return interactions older than this ID.
+        :param after_id: Return interactions newer than this ID, starting from the oldest.
+        :param since_id: Return the latest interactions newer than this ID.
+        :param fields: The fields to return, all by default. Nested keys of the interaction can be selected with
+            dotted paths, e.g. "interaction.type".
+        :param exclude: Fields to leave out, with the same dotted paths, e.g. "interaction.content.code".
+        :param types: Only return interactions of these types, e.g. ["job"].
+        :param recent_only: Only read the recent partitions of the history, see _recent. The older interactions of
+            a session are reached by paging with recent_only unset.
+        :return: {"interactions": the page, newest first, "has_more": whether the cursor has more interactions}
         """
         try:
-            interactions = InteractionHistory.query.filter_by(
-                account_id=account_id, agent_id=agent_id, session_id=session_id
-            ).order_by(InteractionHistory.timestamp.desc()).limit(n).all()
+            query = self._recent(
+                InteractionHistory.query.filter_by(account_id=account_id, agent_id=agent_id, session_id=session_id),
+                recent_only,
+            )
+            if types:
+                # a single type matches the partial index of the type, if it has one
+                query = query.filter(
+                    InteractionHistory.type == types[0] if len(types) == 1 else InteractionHistory.type.in_(types)
+                )
+            columns = {field.split(".")[0] for field in fields} | {"id"} if fields else None
+            if columns:
+                query = query.options(
+                    load_only(*(getattr(InteractionHistory, column) for column in columns))
+                )
 
-            logger.info(f"Interactions: {interactions}")
-            
-            return [interaction.to_dict() for interaction in interactions]
+            if after_id is not None:
+                query = query.filter(InteractionHistory.id > after_id).order_by(InteractionHistory.id)
+            else:
+                if before_id is not None:
+                    query = query.filter(InteractionHistory.id < before_id)
+                if since_id is not None:
+                    query = query.filter(InteractionHistory.id > since_id)
+                query = query.order_by(InteractionHistory.id.desc())
+
+            # one more row than asked tells whether there are more
+            interactions = query.limit(n + 1).all()
+            has_more = len(interactions) > n
+            interactions = interactions[:n]
+            if after_id is not None:
+                interactions.reverse()
+
+            return {
+                "interactions": [
+                    _project(interaction.to_dict(columns), fields, exclude) for interaction in interactions
+                ],
+                "has_more": has_more,
+            }
         except Exception as e:
             logger.error(f"Error getting history: {e}")
             raise e
 
+    def get_latest(
+        self, account_id: str, agent_id: str, session_id: str, interaction_type: str, recent_only: bool = True
+    ) -> dict:
+        """
+        Retrieve the latest interaction of a type in a session, e.g. the latest plan or confirmation.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :param interaction_type: The type of the interaction.
+        :param recent_only: Only read the recent partitions of the history.
+        :return: The interaction, None if the session has none of this type.
+        """
+        try:
+            query = InteractionHistory.query.filter(
+                InteractionHistory.account_id == account_id,
+                InteractionHistory.agent_id == agent_id,
+                InteractionHistory.session_id == session_id,
+                InteractionHistory.type == interaction_type,
+            )
+            interaction = (
+                self._recent(query, recent_only)
+                .order_by(InteractionHistory.id.desc())
+                .first()
+            )
+            return interaction.to_dict() if interaction else None
+        except Exception as e:
+            logger.error(f"Error getting the latest {interaction_type}: {e}")
+            raise e
+
+    def get_job_events(self, account_id: str, job_id: str, recent_only: bool = True) -> list[dict]:
+        """
+        Retrieve the interactions about a job, from its creation to its result, in order.
+
+        :param account_id: The ID of the account.
+        :param job_id: The ID of the job.
+        :param recent_only: Only read the recent partitions of the history.
+        :return: The interactions, oldest first.
+        """
+        try:
+            query = InteractionHistory.query.filter(
+                InteractionHistory.job_id == job_id,
+                InteractionHistory.account_id == account_id,
+            )
+            interactions = (
+                self._recent(query, recent_only)
+                .order_by(InteractionHistory.id)
+                .all()
+            )
+            return [interaction.to_dict() for interaction in interactions]
+        except Exception as e:
+            logger.error(f"Error getting the events of job {job_id}: {e}")
+            raise e
+
+    def get_reference_interactions(
+        self, account_id: str, agent_id: str, reference_id: str, n: int = 10, recent_only: bool = True
+    ) -> list[dict]:
+        """
+        Retrieve the latest interactions about a generated code, i.e. its plans and confirmations, in any session.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param reference_id: The reference ID of the generated code.
+        :param n: The maximum number of interactions to return.
+        :param recent_only: Only read the recent partitions of the history.
+        :return: The interactions, newest first.
+        """
+        try:
+            query = InteractionHistory.query.filter(
+                InteractionHistory.account_id == account_id,
+                InteractionHistory.agent_id == agent_id,
+                InteractionHistory.reference_id == reference_id,
+            )
+            interactions = (
+                self._recent(query, recent_only)
+                .order_by(InteractionHistory.id.desc())
+                .limit(n)
+                .all()
+            )
+            return [interaction.to_dict() for interaction in interactions]
+        except Exception as e:
+            logger.error(f"Error getting the interactions of reference {reference_id}: {e}")
+            raise e
+
+    def get_relevant(
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        query: str,
+        k: int = 5,
+        before_id: int = None,
+    ) -> list[dict]:
+        """
+        Retrieve the past interactions of a session most similar to a text, e.g. the latest user input.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :param query: The text to find relevant interactions for.
+        :param k: The maximum number of interactions to return.
+        :param before_id: Only consider interactions older than this ID, e.g. the ones not in the recent history.
+        :return: The relevant interactions, oldest first, each with its cosine distance to the query. Empty if
+            embeddings are disabled.
+        """
+        query_embedding = self.embeddings.embed_query(query)
+        if query_embedding is None:
+            return []
+        try:
+            distance = InteractionHistory.embedding.cosine_distance(query_embedding)
+            query = db.session.query(
+                InteractionHistory.id,
+                InteractionHistory.timestamp,
+                InteractionHistory.interaction,
+                distance.label("distance"),
+            )
+            rows = (
+                self._recent(query)
+                .filter(
+                    InteractionHistory.account_id == account_id,
+                    InteractionHistory.agent_id == agent_id,
+                    InteractionHistory.session_id == session_id,
+                    InteractionHistory.embedding.isnot(None),
+                    *([InteractionHistory.id < before_id] if before_id is not None else []),
+                )
+                .order_by(distance)
+                .limit(k)
+                .all()
+            )
+            return [
+                {"id": row.id, "timestamp": row.timestamp, "interaction": row.interaction, "distance": row.distance}
+                for row in sorted(rows, key=lambda row: row.id)
+            ]
+        except Exception as e:
+            logger.error(f"Error getting relevant interactions: {e}")
+            raise e
+
+    def embed_missing(self, after_id: int = 0, limit: int = 100, recent_only: bool = True) -> dict:
+        """
+        Compute the embeddings of the next interactions without one, in order of ID. The interactions that aren't
+        worth retrieving are skipped, and so are the ones another API process is embedding.
+
+        :param after_id: Only embed the interactions after this ID.
+        :param limit: Maximum number of interactions embedded.
+        :param recent_only: Only embed the interactions of the recent partitions, see HISTORY_HOT_MONTHS.
+        :return: {"after_id": ID to continue from, "embedded": number of interactions embedded}. Nothing is
+            embedded once every interaction up to the latest has an embedding.
+        :raises Exception: The error of the embedding model. Nothing is embedded and the ID doesn't advance.
+        """
+        if not self.embeddings.enabled:
+            return {"after_id": after_id, "embedded": 0}
+        try:
+            head = self._recent(db.session.query(func.max(InteractionHistory.id)), recent_only).scalar()
+            rows = (
+                self._recent(db.session.query(InteractionHistory), recent_only)
+                .options(load_only(InteractionHistory.id, InteractionHistory.interaction))
+                .filter(
+                    InteractionHistory.id > after_id,
+                    InteractionHistory.id <= (head or 0),
+                    InteractionHistory.embedding.is_(None),
+                    retrievable_filter(InteractionHistory),
+                )
+                .order_by(InteractionHistory.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                db.session.rollback()
+                return {"after_id": max(after_id, head or 0), "embedded": 0}
+            embeddings = self.embeddings.embed_interactions([row.interaction for row in rows], raise_errors=True)
+            for row, embedding in zip(rows, embeddings):
+                row.embedding = embedding
+            db.session.commit()
+            return {"after_id": rows[-1].id, "embedded": len(rows)}
+        except Exception as e:
+            logger.error(f"Error embedding the interactions after {after_id}: {e}")
+            db.session.rollback()
+            raise e
+
     def get_summary(self, account_id: str, agent_id: str, session_id: str) -> str:
         """
         Retrieve the latest moving summary for the session.
@@ -72,9 +414,13 @@ class InteractionHistoryService:
         :return: The latest summary as a string.
         """
         try:
-            interaction = InteractionHistory.query.filter_by(
-                account_id=account_id, agent_id=agent_id, session_id=session_id
-            ).order_by(InteractionHistory.timestamp.desc()).first()
+            # the summary is updated in the background, so the latest interactions may not carry one yet
+            interaction = self._recent(InteractionHistory.query).filter(
+                InteractionHistory.account_id == account_id,
+                InteractionHistory.agent_id == agent_id,
+                InteractionHistory.session_id == session_id,
+                InteractionHistory.summary.isnot(None),
+            ).order_by(InteractionHistory.id.desc()).first()
             if interaction:
                 return interaction.summary
             else:
@@ -83,3 +429,114 @@ class InteractionHistoryService:
             logger.error(f"Error getting summary: {e}")
             raise e
 
+    def update_summary(
+        self, account_id: str, agent_id: str, session_id: str, summary: str, folded_through: int = None
+    ) -> bool:
+        """
+        Store an updated moving summary on the latest interaction of the session.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :param summary: The updated summary.
+        :param folded_through: If the summary now covers chunk summaries, the to_id of the last of them. They are
+            marked as folded in the same transaction.
+        :return: False if the session has no interactions.
+        """
+        try:
+            interaction = self._recent(InteractionHistory.query).filter_by(
+                account_id=account_id, agent_id=agent_id, session_id=session_id
+            ).order_by(InteractionHistory.id.desc()).first()
+            if not interaction:
+                return False
+            interaction.summary = summary
+            if folded_through is not None:
+                InteractionSummary.query.filter(
+                    InteractionSummary.account_id == account_id,
+                    InteractionSummary.agent_id == agent_id,
+                    InteractionSummary.session_id == session_id,
+                    InteractionSummary.to_id <= folded_through,
+                ).update({"folded": True})
+            db.session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating summary: {e}")
+            db.session.rollback()
+            raise e
+
+    def get_memory(self, account_id: str, agent_id: str, session_id: str) -> dict:
+        """
+        Return the summarized levels of the memory of a session: the session summary and the chunk summaries that
+        are not folded into it yet.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :return: {"summary": the session summary, "chunks": [{"from_id", "to_id", "summary"}] oldest first,
+            "covered_id": the ID of the last interaction covered by a chunk, None if there is no chunk}
+        """
+        try:
+            chunks = (
+                InteractionSummary.query.filter_by(
+                    account_id=account_id, agent_id=agent_id, session_id=session_id, folded=False
+                )
+                .order_by(InteractionSummary.to_id)
+                .all()
+            )
+            covered_id = (
+                db.session.query(func.max(InteractionSummary.to_id))
+                .filter(
+                    InteractionSummary.account_id == account_id,
+                    InteractionSummary.agent_id == agent_id,
+                    InteractionSummary.session_id == session_id,
+                )
+                .scalar()
+            )
+            return {
+                "summary": self.get_summary(account_id, agent_id, session_id),
+                "chunks": [chunk.to_dict() for chunk in chunks],
+                "covered_id": covered_id,
+            }
+        except Exception as e:
+            logger.error(f"Error getting memory: {e}")
+            raise e
+
+    def add_chunk_summary(
+        self, account_id: str, agent_id: str, session_id: str, from_id: int, to_id: int, summary: str
+    ) -> dict:
+        """
+        Store the summary of a chunk of consecutive interactions of a session.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :param from_id: The ID of the first interaction of the chunk.
+        :param to_id: The ID of the last interaction of the chunk.
+        :param summary: The summary of the chunk.
+        :return: The stored chunk summary.
+        :raises OverlappingChunk: If a chunk summary already covers some of the interactions.
+        """
+        try:
+            overlapping = InteractionSummary.query.filter(
+                InteractionSummary.account_id == account_id,
+                InteractionSummary.agent_id == agent_id,
+                InteractionSummary.session_id == session_id,
+                InteractionSummary.to_id >= from_id,
+            ).first()
+            if overlapping:
+                raise OverlappingChunk(f"Interactions up to {overlapping.to_id} are already summarized")
+            chunk = InteractionSummary(
+                account_id=account_id,
+                agent_id=agent_id,
+                session_id=session_id,
+                from_id=from_id,
+                to_id=to_id,
+                summary=summary,
+            )
+            db.session.add(chunk)
+            db.session.commit()
+            return chunk.to_dict()
+        except Exception as e:
+            logger.error(f"Error adding chunk summary: {e}")
+            db.session.rollback()
+            raise e
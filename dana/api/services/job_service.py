@@ -1,6 +1,10 @@
 from uuid import uuid4
+from typing import Optional
+from api.models.agent import Agent
 from api.models.job import Job, JobType
+from api.models.job_log import JobLogChunk
 from api.db import db
+from embodiment.interactors.interactor_factory import InteractorFactory
 import json
 
 
@@ -12,8 +16,14 @@ class JobNotFound(Exception):
     pass
 
 
+FINAL_STATUSES = (JobType.COMPLETED, JobType.FAILED, JobType.CANCELLED)
+
+
 class JobService:
 
+    def __init__(self):
+        self.interactor = InteractorFactory.create()
+
     def create_job(
         self,
         account_id: str,
@@ -21,6 +31,7 @@ class JobService:
         session_id: str,
         name: str,
         description: str,
+        parent_job_id: Optional[str] = None,
     ) -> Job:
         job_id = str(uuid4())
         job = Job(
@@ -31,6 +42,7 @@ class JobService:
             status=JobType.CREATED,
             name=name,
             description=description,
+            parent_job_id=parent_job_id,
         )
         db.session.add(job)
         db.session.commit()
@@ -41,10 +53,97 @@ class JobService:
     ) -> Job:
         job = Job.query.filter_by(job_id=job_id, account_id=account_id).first()
         if job:
-            if job.status == JobType.COMPLETED or job.status == JobType.FAILED:
+            if job.status in FINAL_STATUSES:
                 raise JobAlreadyCompleted("Job already completed")
             job.status = JobType[status.upper()]
             job.payload = json.dumps(payload) if payload else None
             db.session.commit()
             return job
         raise JobNotFound("Job not found")
+
+    def cancel_job(self, job_id: str, account_id: str) -> Optional[Job]:
+        """
+        Ask the agent running a job to cancel it. The agent kills the job and reports it as cancelled.
+        If the agent doesn't know the job anymore (e.g. because it was restarted), the job is marked as cancelled here.
+
+        :return: The job if it was marked as cancelled here, None if the agent reports the cancellation.
+        """
+        job = Job.query.filter_by(job_id=job_id, account_id=account_id).first()
+        if not job:
+            raise JobNotFound("Job not found")
+        if job.status in FINAL_STATUSES:
+            raise JobAlreadyCompleted("Job already completed")
+
+        agent = Agent.query.filter_by(agent_id=job.agent_id, account_id=account_id).first()
+        if agent and agent.deployment_metadata and self.interactor.cancel_job(
+            job_id, agent.deployment_metadata
+        ):
+            return None
+
+        job.status = JobType.CANCELLED
+        job.payload = json.dumps({"error": "The job was cancelled."})
+        db.session.commit()
+        return job
+
+    def append_logs(self, job_id: str, account_id: str, chunks: list[dict]) -> Job:
+        """
+        Store chunks of the output of a job.
+
+        :param chunks: List of {"sequence", "stream", "content"} as sent by the agent.
+        :return: The job the chunks belong to.
+        """
+        job = Job.query.filter_by(job_id=job_id, account_id=account_id).first()
+        if not job:
+            raise JobNotFound("Job not found")
+        for chunk in chunks:
+            db.session.add(
+                JobLogChunk(
+                    job_id=job_id,
+                    account_id=account_id,
+                    sequence=chunk["sequence"],
+                    stream=chunk["stream"],
+                    content=chunk["content"],
+                )
+            )
+        db.session.commit()
+        return job
+
+    def get_logs(
+        self, job_id: str, account_id: str, after_sequence: int = -1, limit: int = 100
+    ) -> list[dict]:
+        """
+        Return the output chunks of a job in order, starting after a given sequence number.
+        """
+        chunks = (
+            JobLogChunk.query.filter(
+                JobLogChunk.job_id == job_id,
+                JobLogChunk.account_id == account_id,
+                JobLogChunk.sequence > after_sequence,
+            )
+            .order_by(JobLogChunk.sequence)
+            .limit(limit)
+            .all()
+        )
+        return [chunk.to_dict() for chunk in chunks]
+
+    def get_child_jobs(self, job_id: str, account_id: str) -> list[dict]:
+        """
+        Return the child jobs of a batch job, one per input set, in the order they were started.
+        """
+        if not Job.query.filter_by(job_id=job_id, account_id=account_id).first():
+            raise JobNotFound("Job not found")
+        children = (
+            Job.query.filter_by(parent_job_id=job_id, account_id=account_id)
+            .order_by(Job.created_at)
+            .all()
+        )
+        return [
+            {
+                "job_id": child.job_id,
+                "name": child.name,
+                "status": child.status.value,
+                "result": json.loads(child.payload) if child.payload else None,
+                "created_at": child.created_at.isoformat() if child.created_at else None,
+            }
+            for child in children
+        ]
@@ -8,6 +8,8 @@ class AgentContext:
     """
 
     history: list[dict]
+    # the interactions before the history: {"session_summary", "chunk_summaries", "relevant_interactions"}
+    earlier_history: dict
     intents: list[str]
     facts: list[str]
     policies: list[str]
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 import uuid
+from typing import Optional
 from pydantic import BaseModel
 from sqlalchemy import (
     create_engine,
@@ -23,18 +24,29 @@ class GeneratedCodeFormat(BaseModel):
     requirements: list[str]
     secrets: list[str]
     integrations: list[str]
+    idempotent: bool
+    # name of the trusted registry action that performs the whole task, empty if there is none
+    action: str
 
 
 class GeneratedCodeWithInput(BaseModel):
     generated_code: GeneratedCodeFormat
     inputs: list[InputItemFormat]
     reference_id: str
+    timeout_seconds: Optional[int] = None
+    # one list of inputs per run when the code is executed as a batch
+    batch_inputs: list[list[InputItemFormat]] = []
+
+
+class InputSetFormat(BaseModel):
+    inputs: list[InputItemFormat]
 
 
 class AgentGeneratedCodeFormat(BaseModel):
     reference_id: str
     version: str
     inputs: list[InputItemFormat]
+    batch_inputs: list[InputSetFormat]
 
 
 class BaseCodeGenerator(ABC):
@@ -96,10 +108,10 @@ class BaseCodeGenerator(ABC):
                         """
                         INSERT INTO agent_generated_codes (
                             reference_id, account_id, agent_id, session_id,
-                            name, description, code, requirements, secrets, integrations, created_at
+                            name, description, code, requirements, secrets, integrations, idempotent, action, created_at
                         )
                         VALUES (:reference_id, :account_id, :agent_id, :session_id, :name, :description, :code, :requirements, :secrets,
-                        :integrations, NOW())
+                        :integrations, :idempotent, :action, NOW())
                         """
                     ),
                     {
@@ -113,6 +125,8 @@ class BaseCodeGenerator(ABC):
                         "requirements": ",".join(generated_code.requirements) if generated_code.requirements else "",
                         "secrets": ",".join(generated_code.secrets) if generated_code.secrets else "",
                         "integrations": ",".join(generated_code.integrations) if generated_code.integrations else "",
+                        "idempotent": generated_code.idempotent,
+                        "action": generated_code.action or None,
                     },
                 )
                 session.commit()
@@ -161,7 +175,7 @@ class BaseCodeGenerator(ABC):
             # Query to fetch the specific version or the latest
             # todo: include version in the query
             query = """
-                SELECT name, description, code, requirements, secrets, integrations
+                SELECT name, description, code, requirements, secrets, integrations, idempotent, timeout_seconds, action
                 FROM agent_generated_codes
                 WHERE account_id = :account_id AND agent_id = :agent_id AND session_id = :session_id AND reference_id = :reference_id
             """
@@ -182,7 +196,17 @@ class BaseCodeGenerator(ABC):
                 result = session.execute(text(query), params).fetchone()
 
             if result:
-                name, description, code, requirements, secrets, integrations = result
+                (
+                    name,
+                    description,
+                    code,
+                    requirements,
+                    secrets,
+                    integrations,
+                    idempotent,
+                    timeout_seconds,
+                    action,
+                ) = result
                 return GeneratedCodeWithInput(
                     generated_code=GeneratedCodeFormat(
                         name=name,
@@ -191,9 +215,17 @@ class BaseCodeGenerator(ABC):
                         requirements=requirements.split(",") if requirements else [],
                         secrets=secrets.split(",") if secrets else [],
                         integrations=integrations.split(",") if integrations else [],
+                        idempotent=bool(idempotent),
+                        action=action or "",
                     ),
                     inputs=response.inputs or [],
                     reference_id=reference_id,
+                    timeout_seconds=timeout_seconds,
+                    batch_inputs=[
+                        input_set.inputs
+                        for input_set in response.batch_inputs or []
+                        if input_set.inputs
+                    ],
                 )
 
         except Exception as e:
@@ -220,14 +252,20 @@ class BaseCodeGenerator(ABC):
                 "role": "user",
                 "content": f"""
                     Given the following context:
+                    Summary of the earlier interactions with the user: {context.get('earlier_history', 'No earlier history')}
                     History of interactions with the user: {context.get('history', 'No history available')}
                     Please determine:
                     1. The reference_id of the relevant code.
                     2. The version of the code (set to 'latest' if not specified).
                     3. The inputs required for the code execution with format that matches the code requirements. Exclude the secrets and 
                     integrations as they are passed separately.
+                    4. The batch inputs: if the user asks to run the code for several items (e.g. several recipients, dates or files),
+                    one set of inputs per item, each with every input of the code. Otherwise an empty list.
+                    When there are batch inputs, 'inputs' holds the values shared by all the items.
+                    Datasets produced by earlier jobs are listed in their results under 'artifacts'; to pass one to the code, use an input of
+                    type 'artifact' whose value is its 'artifact_id'.
                     Use only the available facts and history. Don't make up any fictional values.
-                    Output as a JSON object with keys 'reference_id', 'version', 'inputs'.
+                    Output as a JSON object with keys 'reference_id', 'version', 'inputs', 'batch_inputs'.
                     """,
             },
         ]
@@ -256,10 +294,10 @@ class BaseCodeGenerator(ABC):
                         """
                         INSERT INTO agent_generated_codes (
                             reference_id, account_id, agent_id, session_id,
-                            name, description, code, requirements, secrets, integrations, created_at
+                            name, description, code, requirements, secrets, integrations, idempotent, action, created_at
                         )
                         VALUES (:reference_id, :account_id, :agent_id, :session_id, :name, :description, :code, :requirements, :secrets,
-                         :integrations, NOW())
+                         :integrations, :idempotent, :action, NOW())
                         """
                     ),
                     {
@@ -273,6 +311,8 @@ class BaseCodeGenerator(ABC):
                         "requirements": ",".join(generated_code.requirements) if generated_code.requirements else "",
                         "secrets": ",".join(generated_code.secrets) if generated_code.secrets else "",
                         "integrations": ",".join(generated_code.integrations) if generated_code.integrations else "",
+                        "idempotent": generated_code.idempotent,
+                        "action": generated_code.action or None,
                         # todo: add version
                     },
                 )
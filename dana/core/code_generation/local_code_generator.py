@@ -5,7 +5,9 @@ from core.code_generation.base_code_generator import (
     BaseCodeGenerator,
     GeneratedCodeFormat,
 )
+from core.execution.action_registry import ActionSpec
 from core.supervisor.local_code_generator_reviewer import LocalCodeGeneratorReviewer
+from core.supervisor.local_code_sandbox_validator import LocalCodeSandboxValidator
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +18,24 @@ class LocalCodeGenerator(BaseCodeGenerator):
     that runs inside the agent.
     """
 
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client,
+        validator: LocalCodeSandboxValidator = None,
+        actions: list[ActionSpec] = None,
+    ):
         """
         Initialize the InternalCodeGenerator with the LLM client.
         :param llm_client: The LLM client to generate code.
+        :param validator: Optional validator to dry-run the code once the reviewer accepts it.
+        :param actions: Trusted registry actions the generated code may be backed by.
         """
         super().__init__(llm_client)
         # todo: make this configurable
         self.max_revisions = 6
         self.reviewer = LocalCodeGeneratorReviewer(llm_client, self.max_revisions)
+        self.validator = validator
+        self.actions = actions or []
 
     def _create_prompt(self, user_input, context: AgentContext, feedback: dict):
         """
@@ -50,6 +61,12 @@ class LocalCodeGenerator(BaseCodeGenerator):
             for integration in context.get("integrations", [])
         }
 
+        TRUSTED_ACTIONS = (
+            "; ".join(action.describe() for action in self.actions)
+            if self.actions
+            else "No trusted actions available"
+        )
+
         FEEDBACK = (
             f"""
             Previous code generated by the agent: {feedback.get('previous_code')}
@@ -91,8 +108,11 @@ class LocalCodeGenerator(BaseCodeGenerator):
                     Policies: {context.get('policies', 'No policies available')}
                     Secrets shared with the agent: {secrets if secrets else 'No secrets available'}
                     Integrations shared with the agent: {integrations if integrations else 'No integrations available'}
+                    Summary of the earlier communication: {context.get('earlier_history', 'No earlier history')}
                     Communication history: {context.get('history', 'No history available')}
-                    Output the result as a JSON object with properties: "code", "requirements", "secrets", "integrations", "name", and "description".
+                    Trusted actions: {TRUSTED_ACTIONS}
+                    Output the result as a JSON object with properties: "code", "requirements", "secrets", "integrations", "name", "description",
+                    "idempotent" and "action".
                     - code: Python code fulfilling the task. The code shouldn't use any placeholder values and environment variables. All inputs must
                     be passed as function arguments.
                     - requirements: List of non-standard (third-party) Python packages required for the code. The packages will be installed using
@@ -104,6 +124,13 @@ class LocalCodeGenerator(BaseCodeGenerator):
                     - name: A unique name that describes the code. While being concise, try to make it descriptive enough to easily which scenario
                     the code is used for.
                     - description: A brief description of the code.
+                    - idempotent: true only if the code has no side effects, i.e. it only reads data or computes a value, so running it again
+                    with the same inputs gives the same result. Code that sends, creates, updates or deletes anything (e.g. sends an email)
+                    is NOT idempotent.
+                    - action: the name of the trusted action that performs the whole task on its own, or an empty string if none does.
+                    When an action is set, the inputs of 'main' MUST be named exactly like the inputs of the action, since the action is called
+                    with them (and with 'secrets' and 'integrations', like 'main') instead of the code. The code runs when they don't cover
+                    the action.
                     Notes:
                     - The code MUST have a function named 'main' that takes all the required inputs as arguments.
                     - The `main` function MUST be the entry point of the code, but you can have additional functions if needed.
@@ -117,6 +144,10 @@ class LocalCodeGenerator(BaseCodeGenerator):
                     - Do not use any dummy values unless explicitly mentioned in the user input.
                     - AVOID using any placeholder values in the code. Even if the value is constant, e.g. how many retries to attempt, it should be
                     passed as an argument to the 'main' function.
+                    - Large tabular data is exchanged as files, never as inline JSON. An input of type 'artifact' is passed to 'main' as the path
+                    of a .npy or Arrow IPC file that should be memory-mapped (numpy.load(path, mmap_mode="r") or pyarrow.memory_map). To return a
+                    large table, write it as a .npy or Arrow IPC (.arrow) file into the 'outputs' directory of the working directory and only
+                    return a short message; the file is stored and referred to by a handle.
                     {FEEDBACK}
                     """,
             },
@@ -147,6 +178,9 @@ class LocalCodeGenerator(BaseCodeGenerator):
                     generated_code=response, user_input=user_input, context=context
                 )
 
+                if review_result["is_valid"] and self.validator:
+                    review_result = self._dry_run(response, user_input, context)
+
                 if review_result["is_valid"]:
                     return response
 
@@ -175,4 +209,31 @@ class LocalCodeGenerator(BaseCodeGenerator):
                 description="",
                 secrets=[],
                 integrations=[],
+                idempotent=False,
+                action="",
+            )
+
+    def _dry_run(
+        self, generated_code: GeneratedCodeFormat, user_input: str, context: AgentContext
+    ) -> dict:
+        """
+        Dry-run the generated code in the sandbox. Errors of the dry run itself never block the code.
+        :param generated_code: The code accepted by the reviewer.
+        :param user_input: The user's latest input.
+        :param context: The contextual state of the agent.
+        :return: The validation result in the same format as the review result.
+        """
+        try:
+            inputs = (
+                self.reviewer.synthesize_inputs(generated_code, user_input, context)
+                if self.validator.call_main
+                else []
+            )
+            return self.validator.validate(
+                generated_code,
+                inputs=inputs,
+                integrations=context.get("integrations", []),
             )
+        except Exception:
+            logger.warning(f"Dry run of the generated code failed: {traceback.format_exc()}")
+            return {"is_valid": True, "feedback": "", "suggested_fix": ""}
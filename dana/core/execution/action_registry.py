@@ -0,0 +1,125 @@
+import glob
+import logging
+import os
+from dataclasses import dataclass, field
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "registry", "actions"
+)
+
+
+class ActionArgumentError(Exception):
+    pass
+
+
+@dataclass
+class ActionSpec:
+    """
+    A vetted action of the registry: a directory with `<name>.py` defining the function `<name>`, the spec
+    `<name>.yaml` (description, typed inputs and outputs) and its pinned requirements in requirements.txt.
+    Inputs are required unless their spec sets `required: false`.
+    """
+
+    name: str
+    description: str
+    module_path: str
+    inputs: list[dict] = field(default_factory=list)
+    outputs: list[dict] = field(default_factory=list)
+    requirements: list[str] = field(default_factory=list)
+
+    def coerce_arguments(self, values: dict) -> dict:
+        """
+        Build the keyword arguments of the action from the values of its inputs, converted to the declared types.
+        Values of names the action doesn't declare are left out.
+
+        :param values: The values by input name, e.g. the inputs of a job.
+        :return: The typed keyword arguments.
+        :raises ActionArgumentError: If a required input is missing or a value can't be converted to the type
+            of its input.
+        """
+        arguments = {}
+        for spec in self.inputs:
+            name = spec["name"]
+            if name not in values:
+                if spec.get("required", True):
+                    raise ActionArgumentError(f"Missing input {name} of action {self.name}")
+                continue
+            value = values[name]
+            try:
+                arguments[name] = _COERCIONS.get(spec.get("type", "string"), lambda v: v)(value)
+            except (TypeError, ValueError) as e:
+                raise ActionArgumentError(
+                    f"Invalid value for input {name} of action {self.name}: {e}"
+                )
+        return arguments
+
+    def describe(self) -> str:
+        """
+        One-line description of the action and its inputs, for prompts.
+        """
+        inputs = ", ".join(f"{spec['name']}: {spec.get('type', 'string')}" for spec in self.inputs)
+        summary = " ".join(self.description.split())
+        return f"{self.name}({inputs}) - {summary}"
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in {"true", "1", "yes"}
+    return bool(value)
+
+
+_COERCIONS = {
+    "string": str,
+    "integer": int,
+    "int": int,
+    "number": float,
+    "float": float,
+    "boolean": _to_bool,
+    "bool": _to_bool,
+}
+
+
+def load_actions(registry_dir: str = DEFAULT_REGISTRY_DIR) -> dict[str, ActionSpec]:
+    """
+    Load the specs of the actions in the registry. Actions with an incomplete directory are skipped.
+
+    :param registry_dir: The directory of the registry actions.
+    :return: The actions by name.
+    """
+    from core.execution.local_code_executor import is_standard_library
+
+    actions = {}
+    for spec_path in sorted(glob.glob(os.path.join(registry_dir, "*", "*.yaml"))):
+        action_dir = os.path.dirname(spec_path)
+        with open(spec_path, "r") as spec_file:
+            spec = yaml.safe_load(spec_file) or {}
+        name = spec.get("name")
+        module_path = os.path.join(action_dir, f"{name}.py")
+        if not name or not os.path.exists(module_path):
+            logger.warning(f"Skipping registry action without a module: {spec_path}")
+            continue
+
+        requirements = []
+        requirements_path = os.path.join(action_dir, "requirements.txt")
+        if os.path.exists(requirements_path):
+            with open(requirements_path, "r") as requirements_file:
+                requirements = [
+                    line.strip()
+                    for line in requirements_file
+                    if line.strip()
+                    and not line.startswith("#")
+                    and not is_standard_library(line.strip())
+                ]
+        actions[name] = ActionSpec(
+            name=name,
+            description=spec.get("description", ""),
+            module_path=module_path,
+            inputs=spec.get("inputs") or [],
+            outputs=spec.get("outputs") or [],
+            requirements=requirements,
+        )
+    return actions
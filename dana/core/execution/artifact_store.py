@@ -0,0 +1,402 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Optional
+
+import numpy
+
+from core.http_client import HTTPClient, get_http_client
+
+logger = logging.getLogger(__name__)
+
+# The directory of the workspace where a job writes the artifacts it returns
+OUTPUT_DIR = "outputs"
+ARTIFACT_FORMATS = {".npy": "npy", ".arrow": "arrow"}
+# Rows read at a time while computing the summary of an array, so the file is never loaded as a whole
+SUMMARY_CHUNK_ROWS = 1024 * 1024
+# Only the first columns of wide tables are summarized, the schema lists all of them
+MAX_SUMMARY_COLUMNS = 100
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# The files of the cache; the temporary files of downloads in progress are left alone
+CACHED_ARTIFACT_NAME = re.compile(r"^[0-9a-f]{64}\.(npy|arrow)$")
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(DOWNLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _describe_npy(path: str) -> tuple[dict, dict]:
+    array = numpy.load(path, mmap_mode="r", allow_pickle=False)
+    rows = array.shape[0] if array.ndim else 1
+    if array.dtype.names:
+        columns = [(name, array[name]) for name in array.dtype.names]
+    elif array.ndim == 2:
+        columns = [(str(index), array[:, index]) for index in range(array.shape[1])]
+    else:
+        columns = [("value", array.reshape(-1) if array.ndim != 1 else array)]
+
+    schema = {
+        "dtype": str(array.dtype),
+        "shape": list(array.shape),
+        "columns": [{"name": name, "type": str(column.dtype)} for name, column in columns],
+    }
+    statistics = {}
+    for name, column in columns[:MAX_SUMMARY_COLUMNS]:
+        if column.dtype.kind not in "biuf":
+            continue
+        minimum = maximum = None
+        total = 0.0
+        count = nulls = 0
+        for start in range(0, len(column), SUMMARY_CHUNK_ROWS):
+            chunk = numpy.asarray(column[start : start + SUMMARY_CHUNK_ROWS], dtype=numpy.float64)
+            missing = numpy.isnan(chunk)
+            nulls += int(missing.sum())
+            chunk = chunk[~missing]
+            if not chunk.size:
+                continue
+            minimum = float(chunk.min()) if minimum is None else min(minimum, float(chunk.min()))
+            maximum = float(chunk.max()) if maximum is None else max(maximum, float(chunk.max()))
+            total += float(chunk.sum())
+            count += chunk.size
+        statistics[name] = {
+            "min": minimum,
+            "max": maximum,
+            "mean": total / count if count else None,
+            "nulls": nulls,
+        }
+    return schema, {"rows": rows, "columns": statistics}
+
+
+def _describe_arrow(path: str) -> tuple[dict, dict]:
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+    except ImportError:
+        # pyarrow is optional: without it the artifact is still stored, just without schema and statistics
+        logger.warning(f"pyarrow is not installed, storing {path} without schema and summary")
+        return {}, {"rows": None, "columns": {}}
+
+    with pyarrow.memory_map(path, "r") as source:
+        try:
+            reader = pyarrow.ipc.open_file(source)
+            batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+        except pyarrow.ArrowInvalid:
+            source.seek(0)
+            reader = pyarrow.ipc.open_stream(source)
+            batches = iter(reader)
+        schema = {
+            "columns": [{"name": field.name, "type": str(field.type)} for field in reader.schema],
+        }
+        numeric = [
+            field.name
+            for field in reader.schema
+            if pyarrow.types.is_integer(field.type) or pyarrow.types.is_floating(field.type)
+        ][:MAX_SUMMARY_COLUMNS]
+        rows = 0
+        statistics = {name: {"min": None, "max": None, "sum": 0.0, "count": 0, "nulls": 0} for name in numeric}
+        for batch in batches:
+            rows += batch.num_rows
+            for name in numeric:
+                column = batch.column(name)
+                stats = statistics[name]
+                stats["nulls"] += column.null_count
+                if column.null_count == len(column):
+                    continue
+                min_max = pyarrow.compute.min_max(column).as_py()
+                stats["min"] = min_max["min"] if stats["min"] is None else min(stats["min"], min_max["min"])
+                stats["max"] = min_max["max"] if stats["max"] is None else max(stats["max"], min_max["max"])
+                stats["sum"] += pyarrow.compute.sum(column).as_py() or 0
+                stats["count"] += len(column) - column.null_count
+    for stats in statistics.values():
+        total, count = stats.pop("sum"), stats.pop("count")
+        stats["mean"] = total / count if count else None
+    return schema, {"rows": rows, "columns": statistics}
+
+
+def describe_artifact(path: str) -> tuple[str, dict, dict]:
+    """
+    Read the schema and compute summary statistics of a columnar file without loading it in memory.
+
+    :param path: Path of a .npy or Arrow IPC (.arrow) file.
+    :return: The format, the schema (column names and types) and the summary (row count and, for numeric columns,
+        min, max, mean and number of nulls).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    format = ARTIFACT_FORMATS.get(extension)
+    if format == "npy":
+        return (format, *_describe_npy(path))
+    if format == "arrow":
+        return (format, *_describe_arrow(path))
+    raise ArtifactError(f"Unsupported artifact file: {os.path.basename(path)}")
+
+
+class ArtifactStore:
+    """
+    Exchanges the columnar artifacts of the jobs with the API.
+    Artifacts are addressed by the SHA-256 of their content: an artifact is uploaded once and downloaded once per
+    agent, into a local cache the jobs memory-map the files from. The cache is evicted least recently used first
+    whenever it exceeds its disk quota. The artifacts fetched for a running job are pinned until it releases them,
+    with shared file locks, so several agent processes can share the same cache directory.
+    """
+
+    def __init__(
+        self,
+        auth_token: str,
+        dana_url: str,
+        cache_dir: str,
+        http_client: HTTPClient = None,
+        max_disk_bytes: int = 5 * 1024**3,
+    ):
+        """
+        :param auth_token: Token of the agent for the API.
+        :param dana_url: Base URL of the API.
+        :param cache_dir: Directory of the local copies of the artifacts.
+        :param http_client: The HTTP client for the API, the one of the process by default.
+        :param max_disk_bytes: Maximum total size of the cache. Pinned artifacts are never evicted to meet it.
+        """
+        self.auth_token = auth_token
+        self.dana_url = dana_url
+        self.http = http_client or get_http_client()
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._downloads = {}
+        # artifact ID -> [open file holding the shared lock, number of jobs using it]
+        self._pins = {}
+        self._evict_lock = threading.Lock()
+        self._metrics = {"hits": 0, "downloads": 0, "evictions": 0, "disk_bytes": 0}
+
+    def fetch(self, artifact_id: str) -> str:
+        """
+        Return the path of the local copy of an artifact, downloading it first if needed, and pin it until `release`.
+        The copy is read-only; jobs memory-map it rather than modifying it.
+
+        :param artifact_id: The handle of the artifact.
+        :return: The path of the .npy or .arrow file.
+        """
+        if not all(c in "0123456789abcdef" for c in artifact_id) or len(artifact_id) != 64:
+            raise ArtifactError(f"Invalid artifact handle: {artifact_id}")
+        with self._lock:
+            download_lock = self._downloads.setdefault(artifact_id, threading.Lock())
+        with download_lock:
+            while True:
+                path = self._cached_path(artifact_id)
+                if path:
+                    self._count("hits")
+                else:
+                    path = self._download(artifact_id)
+                    self._count("downloads")
+                if self._pin(artifact_id, path):
+                    break
+                # evicted by another process in the meantime
+        self._evict()
+        return path
+
+    def release(self, artifact_id: str):
+        """
+        Unpin an artifact returned by `fetch`, once the job using it has finished.
+        """
+        with self._lock:
+            pin = self._pins.get(artifact_id)
+            if not pin:
+                return
+            pin[1] -= 1
+            if pin[1] == 0:
+                del self._pins[artifact_id]
+                # closing the file releases its lock
+                pin[0].close()
+
+    def metrics(self) -> dict:
+        """
+        Return the cache counters and the size of the cache measured by the last eviction.
+        """
+        with self._lock:
+            return {**self._metrics, "pinned": len(self._pins)}
+
+    def upload(self, path: str) -> dict:
+        """
+        Store a file written by a job as an artifact, unless the API already has the same content.
+
+        :param path: Path of a .npy or Arrow IPC (.arrow) file.
+        :return: The handle and metadata of the artifact: artifact_id, name, format, size_bytes, schema and summary.
+        """
+        format, schema, summary = describe_artifact(path)
+        artifact_id = _file_sha256(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cached_path = os.path.join(self.cache_dir, f"{artifact_id}.{format}")
+        if not os.path.exists(cached_path):
+            self._add_to_cache(path, cached_path)
+
+        response = self.http.get(
+            f"{self.dana_url}/artifact/{artifact_id}", auth_token=self.auth_token
+        )
+        if response.status_code == 404:
+            with open(path, "rb") as file:
+                response = self.http.post(
+                    f"{self.dana_url}/artifact",
+                    auth_token=self.auth_token,
+                    data={
+                        "name": name,
+                        "format": format,
+                        "schema": json.dumps(schema),
+                        "summary": json.dumps(summary),
+                    },
+                    files={"file": (os.path.basename(path), file)},
+                )
+        response.raise_for_status()
+        artifact = response.json()
+        return {
+            "artifact_id": artifact_id,
+            "name": name,
+            "format": format,
+            "size_bytes": os.path.getsize(path),
+            "schema": artifact.get("schema") or schema,
+            "summary": artifact.get("summary") or summary,
+        }
+
+    def _download(self, artifact_id: str) -> str:
+        response = self.http.get(
+            f"{self.dana_url}/artifact/{artifact_id}", auth_token=self.auth_token
+        )
+        if response.status_code == 404:
+            raise ArtifactError(f"Artifact {artifact_id} not found")
+        response.raise_for_status()
+        format = response.json()["format"]
+
+        with self.http.get(
+            f"{self.dana_url}/artifact/{artifact_id}/content",
+            auth_token=self.auth_token,
+            stream=True,
+        ) as content:
+            content.raise_for_status()
+            digest = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as temp_file:
+                try:
+                    for chunk in content.iter_content(DOWNLOAD_CHUNK_BYTES):
+                        digest.update(chunk)
+                        temp_file.write(chunk)
+                except BaseException:
+                    os.remove(temp_file.name)
+                    raise
+        if digest.hexdigest() != artifact_id:
+            os.remove(temp_file.name)
+            raise ArtifactError(f"The content of artifact {artifact_id} doesn't match its handle")
+
+        path = os.path.join(self.cache_dir, f"{artifact_id}.{format}")
+        os.chmod(temp_file.name, 0o444)
+        os.replace(temp_file.name, path)
+        logger.info(f"Downloaded artifact {artifact_id} to {path}")
+        return path
+
+    def _add_to_cache(self, path: str, cached_path: str):
+        # the workspace of the job is removed later, so the cache gets its own link (or copy) of the file
+        temp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            os.link(path, temp_path)
+        except OSError:
+            with open(path, "rb") as source, open(temp_path, "wb") as target:
+                while chunk := source.read(DOWNLOAD_CHUNK_BYTES):
+                    target.write(chunk)
+        os.chmod(temp_path, 0o444)
+        os.replace(temp_path, cached_path)
+        self._evict()
+
+    def _cached_path(self, artifact_id: str) -> Optional[str]:
+        for extension in ARTIFACT_FORMATS:
+            path = os.path.join(self.cache_dir, artifact_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _pin(self, artifact_id: str, path: str) -> bool:
+        """
+        Take a shared lock on a cached artifact, which keeps it from being evicted, and mark it as recently used.
+
+        :return: False if the file was evicted before it could be locked.
+        """
+        with self._lock:
+            pin = self._pins.get(artifact_id)
+            if pin:
+                pin[1] += 1
+                os.utime(path)
+                return True
+            try:
+                file = open(path, "rb")
+            except FileNotFoundError:
+                return False
+            fcntl.flock(file, fcntl.LOCK_SH)
+            try:
+                if os.stat(path).st_ino != os.fstat(file.fileno()).st_ino:
+                    raise FileNotFoundError(path)
+            except FileNotFoundError:
+                file.close()
+                return False
+            self._pins[artifact_id] = [file, 1]
+            os.utime(path)
+            return True
+
+    def _evict(self):
+        """
+        Remove the least recently used artifacts that aren't pinned, by this or any other process, until the cache
+        fits in its disk quota.
+        """
+        with self._evict_lock:
+            entries = []
+            disk_bytes = 0
+            for name in os.listdir(self.cache_dir):
+                if not CACHED_ARTIFACT_NAME.match(name):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+                disk_bytes += stat.st_size
+            entries.sort()
+            for _, path, size in entries:
+                if disk_bytes <= self.max_disk_bytes:
+                    break
+                if self._remove(path):
+                    self._count("evictions")
+                    logger.info(f"Evicted artifact {os.path.basename(path)} to stay within the cache quota")
+                    disk_bytes -= size
+            with self._lock:
+                self._metrics["disk_bytes"] = disk_bytes
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return False
+        with file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # pinned by a job
+                return False
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
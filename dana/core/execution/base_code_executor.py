@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from typing import Optional
+from core.execution.job_queue import JobPriority
 from core.job_management.job_manager import JobManager
 from core.interaction_manager.interaction_manager import InteractionManager
 from core.perception.perception_handler import InputItemFormat
@@ -21,9 +23,13 @@ class BaseCodeExecutor(ABC):
         integrations: dict,
         name: str,
         description: str,
+        priority: int = JobPriority.NORMAL,
+        timeout: Optional[float] = None,
+        idempotent: bool = False,
+        action: Optional[str] = None,
     ):
         """
-        Execute the job and update its status in the database.
+        Schedule the job for execution and update its status in the database as it runs.
 
         :param account_id: The account ID.
         :param agent_id: The agent ID.
@@ -35,6 +41,54 @@ class BaseCodeExecutor(ABC):
         :param integrations: The integrations required by the code.
         :param name: The name of the job.
         :param description: The description of the job.
+        :param priority: The priority of the job in the execution queue, lower values run first.
+        :param timeout: Maximum number of seconds the job may run. None uses the default of the executor.
+        :param idempotent: Whether running the code again with the same inputs gives the same result without side
+            effects. The result of an idempotent job may be served from a cache.
+        :param action: Name of the trusted registry action that performs the task, if any. The executor may call
+            the action instead of running the code.
+        :return: The ID of the job, returned as soon as the job is scheduled.
 
         """
         pass
+
+    @abstractmethod
+    def execute_batch(
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        code: str,
+        requirements: list,
+        input_sets: list[list[InputItemFormat]],
+        secrets: dict,
+        integrations: dict,
+        name: str,
+        description: str,
+        priority: int = JobPriority.NORMAL,
+        timeout: Optional[float] = None,
+        idempotent: bool = False,
+        action: Optional[str] = None,
+    ) -> str:
+        """
+        Schedule a batch job that runs the code once per input set, in parallel with bounded concurrency.
+        Every input set runs as a child job of the batch; the batch job is reported with the aggregated results
+        and failures of its children once they have all finished.
+
+        :param input_sets: One list of inputs per run of the code.
+        :param timeout: Maximum number of seconds each child job may run.
+        :return: The ID of the batch job, returned as soon as the batch is scheduled.
+
+        The other parameters are the same as for `execute_code`.
+        """
+        pass
+
+    @abstractmethod
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job and report it as cancelled.
+
+        :param job_id: The ID of the job.
+        :return: True if the job is being cancelled, False if the executor doesn't know the job.
+        """
+        pass
@@ -0,0 +1,86 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.perception.perception_handler import InputItemFormat
+
+
+@dataclass
+class BatchRun:
+    """
+    A batch job: one code executed once per input set, each run being a child job of the batch.
+    Tracks the input sets that are still waiting and the outcome of every child.
+    """
+
+    job_id: str
+    account_id: str
+    agent_id: str
+    session_id: str
+    name: str
+    description: str
+    input_sets: list[list[InputItemFormat]]
+    code: str
+    requirements: list
+    secrets: dict
+    integrations: dict
+    priority: int
+    timeout: Optional[float] = None
+    idempotent: bool = False
+    action: Optional[str] = None
+    pending: deque = field(default_factory=deque)
+    # child job IDs of the input sets that are running, by index (None while the child is being created)
+    running: dict = field(default_factory=dict)
+    outcomes: dict = field(default_factory=dict)
+    cancelled: bool = False
+    filling: bool = False
+    finished: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self.pending.extend(range(len(self.input_sets)))
+
+    @property
+    def done(self) -> bool:
+        return not self.running and (not self.pending or self.cancelled)
+
+    def record(self, index: int, job_id: Optional[str], status: str, result: dict):
+        """
+        Record the outcome of the child job of an input set.
+        """
+        self.outcomes[index] = {
+            "job_id": job_id,
+            "inputs": {input_item.name: input_item.value for input_item in self.input_sets[index]},
+            "status": status,
+            "result": result,
+        }
+
+    def final_status(self) -> str:
+        """
+        The status of the batch: completed if any child completed, cancelled if the batch was cancelled before,
+        failed otherwise. Failures of individual children are part of the aggregated result.
+        """
+        if any(outcome["status"] == "completed" for outcome in self.outcomes.values()):
+            return "completed"
+        return "cancelled" if self.cancelled else "failed"
+
+    def aggregate(self) -> dict:
+        """
+        Aggregate the outcomes of the children into the result of the batch, in the order of the input sets.
+        """
+        counts = {"completed": 0, "failed": 0, "cancelled": 0}
+        for outcome in self.outcomes.values():
+            counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+        if counts["completed"] == len(self.input_sets):
+            status = "success"
+        elif counts["completed"]:
+            status = "partial_success"
+        else:
+            status = "failure"
+        return {
+            "status": status,
+            "total": len(self.input_sets),
+            **counts,
+            "duration_seconds": round(time.monotonic() - self.started_at, 3),
+            "results": [self.outcomes[index] for index in sorted(self.outcomes)],
+        }
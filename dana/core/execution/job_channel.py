@@ -0,0 +1,104 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_runner.py")
+HEADER = struct.Struct(">Q")
+# The descriptor the result envelope is written to when the job is forked from a zygote
+RESULT_FD = 3
+
+
+class JobChannel:
+    """
+    Passes the arguments of a job to the runner shim (job_runner.py) on its stdin and receives the result envelope
+    on a dedicated pipe. Both ends are served by threads, so neither large arguments nor large results can
+    fill a pipe and block the job.
+    """
+
+    def __init__(self, arguments: dict):
+        """
+        :param arguments: The arguments of the job: inputs (by name), secrets and integrations.
+        """
+        data = json.dumps(arguments).encode()
+        self._arguments = HEADER.pack(len(data)) + data
+        self._stdin_r, self._stdin_w = os.pipe()
+        self._result_r, self._result_w = os.pipe()
+        self._result = bytearray()
+        self._threads = []
+
+    @property
+    def fds(self) -> list[int]:
+        """
+        The descriptors of the job: the read end of its stdin and the write end of the result pipe.
+        """
+        return [self._stdin_r, self._result_w]
+
+    def start(self):
+        """
+        Start sending the arguments and receiving the result. Call it once the job has been started with `fds`.
+        """
+        os.close(self._stdin_r)
+        os.close(self._result_w)
+        self._threads = [
+            threading.Thread(target=self._write_arguments, daemon=True),
+            threading.Thread(target=self._read_result, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def result(self, timeout: float = 5) -> Optional[dict]:
+        """
+        Return the result envelope of the exited job: {"ok": True, "result": ...} or {"ok": False, "error": ...}.
+
+        :param timeout: Maximum number of seconds to wait for the rest of the envelope.
+        :return: The envelope, or None if the job exited without writing one.
+        """
+        for thread in self._threads:
+            thread.join(timeout)
+        data = bytes(self._result)
+        if len(data) < HEADER.size:
+            return None
+        (size,) = HEADER.unpack_from(data)
+        envelope = json.loads(data[HEADER.size : HEADER.size + size])
+        if "spill" in envelope:
+            envelope = self._read_spill(envelope["spill"]["path"], envelope["spill"]["size"])
+        return envelope
+
+    def close(self):
+        """
+        Release the pipes, e.g. when the job could not be started.
+        """
+        if not self._threads:
+            for fd in (self._stdin_r, self._stdin_w, self._result_r, self._result_w):
+                os.close(fd)
+
+    def _write_arguments(self):
+        try:
+            view = memoryview(self._arguments)
+            while view:
+                view = view[os.write(self._stdin_w, view) :]
+        except BrokenPipeError:
+            # the job exited without reading all of its arguments, its result tells why
+            pass
+        finally:
+            os.close(self._stdin_w)
+
+    def _read_result(self):
+        try:
+            while chunk := os.read(self._result_r, 1024 * 1024):
+                self._result += chunk
+        finally:
+            os.close(self._result_r)
+
+    @staticmethod
+    def _read_spill(path: str, size: int) -> dict:
+        logger.info(f"Reading spilled job result of {size} bytes from {path}")
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                return json.loads(mapped[:])
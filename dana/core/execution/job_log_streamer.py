@@ -0,0 +1,173 @@
+import logging
+import os
+import select
+import threading
+import time
+from typing import Optional
+
+from core.job_management.job_manager import JobManager
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+TRUNCATION_NOTICE = b"\n[output truncated]\n"
+
+
+def _utf8_boundary(data: bytes, size: int) -> int:
+    """
+    The largest cut of `data` at or before `size` bytes that doesn't split a UTF-8 character.
+    """
+    if size >= len(data):
+        return len(data)
+    cut = size
+    # continuation bytes are 0b10xxxxxx
+    while cut > 0 and data[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return cut
+
+
+def _complete_utf8(data: bytes) -> int:
+    """
+    The length of `data` without a UTF-8 character whose last bytes haven't been read yet.
+    """
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:
+            # a lead byte: 110xxxxx starts 2 bytes, 1110xxxx 3 and 11110xxx 4
+            expected = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4 if byte & 0xF8 == 0xF0 else 1
+            return len(data) - back if expected > back else len(data)
+    return len(data)
+
+
+class JobLogStreamer:
+    """
+    Captures the stdout and stderr of a job through pipes and sends them to the API while the job runs.
+    The output is sent in chunks of at most `chunk_bytes` UTF-8 bytes, cut between characters, at least every
+    `flush_interval` seconds when there is
+    new output, so neither a chatty nor a quiet job is a problem. At most one chunk per stream is buffered; while
+    a chunk is being sent the pipes aren't read, which makes a job that writes faster than the API accepts wait.
+    """
+
+    STREAMS = ("stdout", "stderr")
+
+    def __init__(
+        self,
+        job_manager: JobManager,
+        job_id: str,
+        chunk_bytes: int = 16 * 1024,
+        flush_interval: float = 1.0,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        :param job_manager: Instance of JobManager for sending the chunks.
+        :param job_id: The ID of the job.
+        :param chunk_bytes: Maximum size of a chunk, in bytes.
+        :param flush_interval: Maximum number of seconds new output waits before it is sent.
+        :param max_bytes: Maximum number of bytes of output of the job that are sent. The rest is read and discarded.
+            None means no limit.
+        """
+        self.job_manager = job_manager
+        self.job_id = job_id
+        self.chunk_bytes = chunk_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.sent_bytes = 0
+        self.truncated = False
+        self._sequence = 0
+        self._pipes = {stream: os.pipe() for stream in self.STREAMS}
+        self._buffers = {stream: b"" for stream in self.STREAMS}
+        self._thread = None
+
+    @property
+    def fds(self) -> list[int]:
+        """
+        The write ends of the pipes, for the stdout and stderr of the job.
+        """
+        return [self._pipes[stream][1] for stream in self.STREAMS]
+
+    def start(self):
+        """
+        Start reading the output. Call it once the job has been started with `fds`.
+        """
+        for stream in self.STREAMS:
+            os.close(self._pipes[stream][1])
+        self._thread = threading.Thread(target=self._read, name=f"job-log-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5):
+        """
+        Wait for the remaining output of the exited job and send it.
+
+        :param timeout: Maximum number of seconds to wait, in case a process started by the job still holds the pipes.
+        """
+        if self._thread:
+            self._thread.join(timeout)
+        else:
+            # the job never started, so nobody will close the write ends
+            for stream in self.STREAMS:
+                os.close(self._pipes[stream][1])
+        for stream in self.STREAMS:
+            try:
+                os.close(self._pipes[stream][0])
+            except OSError:
+                pass
+
+    def _read(self):
+        open_fds = {self._pipes[stream][0]: stream for stream in self.STREAMS}
+        last_flush = time.monotonic()
+        while open_fds:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                readable, _, _ = select.select(list(open_fds), [], [], timeout)
+            except (OSError, ValueError):
+                # the pipes were closed by `close` after its timeout
+                return
+            for fd in readable:
+                stream = open_fds[fd]
+                data = os.read(fd, READ_SIZE)
+                if not data:
+                    del open_fds[fd]
+                    continue
+                self._buffers[stream] += data
+                if len(self._buffers[stream]) >= self.chunk_bytes:
+                    self._flush()
+                    last_flush = time.monotonic()
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush(final=True)
+
+    def _flush(self, final: bool = False):
+        chunks = []
+        for stream in self.STREAMS:
+            data = self._buffers[stream]
+            # a character split between two reads waits for its end, unless the stream is over
+            cut = len(data) if final else _complete_utf8(data)
+            content, self._buffers[stream] = data[:cut], data[cut:]
+            if self.max_bytes is not None:
+                remaining = self.max_bytes - self.sent_bytes
+                if len(content) > remaining:
+                    if not self.truncated:
+                        self.truncated = True
+                        content = content[: _utf8_boundary(content, max(remaining, 0))] + TRUNCATION_NOTICE
+                    else:
+                        content = b""
+            self.sent_bytes += len(content)
+            while content:
+                cut = _utf8_boundary(content, self.chunk_bytes) or self.chunk_bytes
+                chunks.append(
+                    {
+                        "sequence": self._sequence,
+                        "stream": stream,
+                        "content": content[:cut].decode("utf-8", errors="replace"),
+                    }
+                )
+                content = content[cut:]
+                self._sequence += 1
+        if not chunks:
+            return
+        try:
+            self.job_manager.append_job_logs(job_id=self.job_id, chunks=chunks)
+        except Exception as e:
+            # losing a piece of the live output must not fail the job
+            logger.warning(f"Failed to send {len(chunks)} log chunks of job {self.job_id}: {e}")
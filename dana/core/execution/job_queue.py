@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobPriority:
+    HIGH = 0
+    NORMAL = 5
+    LOW = 10
+
+
+@dataclass(order=True)
+class QueuedJob:
+    """
+    A job waiting in the queue. Jobs are ordered by priority (lower runs first) and then by submission order.
+    """
+
+    priority: int
+    sequence: int
+    job_id: str = field(compare=False)
+    account_id: str = field(compare=False)
+    agent_id: str = field(compare=False)
+    run: Callable[[], Optional[str]] = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class JobQueue:
+    """
+    A priority queue of jobs served by a bounded pool of worker threads.
+    Optional per-agent and per-account caps limit how many jobs of the same owner run at the same time;
+    jobs over the cap stay queued while jobs of other owners are picked up.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_per_agent: Optional[int] = None,
+        max_per_account: Optional[int] = None,
+    ):
+        """
+        :param workers: Number of worker threads, i.e. the maximum number of jobs running at the same time.
+        :param max_per_agent: Maximum number of running jobs per agent. None means no limit.
+        :param max_per_account: Maximum number of running jobs per account. None means no limit.
+        """
+        self.max_per_agent = max_per_agent
+        self.max_per_account = max_per_account
+        self._pending = []
+        self._sequence = itertools.count()
+        self._running_per_agent = {}
+        self._running_per_account = {}
+        self._condition = threading.Condition()
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "started": 0,
+            "running": 0,
+            "total_wait_seconds": 0.0,
+        }
+        self._workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        job_id: str,
+        account_id: str,
+        agent_id: str,
+        run: Callable[[], Optional[str]],
+        priority: int = JobPriority.NORMAL,
+    ):
+        """
+        Enqueue a job and return immediately.
+
+        :param job_id: The ID of the job.
+        :param account_id: The account the job belongs to.
+        :param agent_id: The agent the job belongs to.
+        :param run: The callable that executes the job. It is responsible for reporting the job status, and returns
+            the final status (completed, failed or cancelled) for the metrics; a job that raises counts as failed.
+        :param priority: The priority of the job, see JobPriority.
+        """
+        job = QueuedJob(
+            priority=priority,
+            sequence=next(self._sequence),
+            job_id=job_id,
+            account_id=account_id,
+            agent_id=agent_id,
+            run=run,
+        )
+        with self._condition:
+            heapq.heappush(self._pending, job)
+            self._metrics["submitted"] += 1
+            self._condition.notify()
+        logger.info(f"Queued job {job_id} with priority {priority} (queue depth: {len(self._pending)})")
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a job that hasn't started yet from the queue.
+
+        :param job_id: The ID of the job.
+        :return: True if the job was queued and is removed, False if it already started or is unknown.
+        """
+        with self._condition:
+            job = next((job for job in self._pending if job.job_id == job_id), None)
+            if not job:
+                return False
+            self._pending.remove(job)
+            heapq.heapify(self._pending)
+            self._metrics["cancelled"] += 1
+        logger.info(f"Removed job {job_id} from the queue")
+        return True
+
+    def metrics(self) -> dict:
+        """
+        Return the queue depth and the job counters. Completed, failed and cancelled count the final status of the
+        jobs, cancelled includes the jobs removed from the queue before they started.
+        """
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._pending)
+            metrics["running_per_agent"] = dict(self._running_per_agent)
+            metrics["running_per_account"] = dict(self._running_per_account)
+        started = metrics.pop("started")
+        metrics["avg_wait_seconds"] = metrics.pop("total_wait_seconds") / started if started else 0.0
+        return metrics
+
+    def _is_eligible(self, job: QueuedJob) -> bool:
+        if self.max_per_agent is not None and self._running_per_agent.get(job.agent_id, 0) >= self.max_per_agent:
+            return False
+        if (
+            self.max_per_account is not None
+            and self._running_per_account.get(job.account_id, 0) >= self.max_per_account
+        ):
+            return False
+        return True
+
+    def _take(self) -> QueuedJob:
+        with self._condition:
+            while True:
+                job = next((job for job in sorted(self._pending) if self._is_eligible(job)), None)
+                if job:
+                    self._pending.remove(job)
+                    heapq.heapify(self._pending)
+                    self._running_per_agent[job.agent_id] = self._running_per_agent.get(job.agent_id, 0) + 1
+                    self._running_per_account[job.account_id] = self._running_per_account.get(job.account_id, 0) + 1
+                    self._metrics["started"] += 1
+                    self._metrics["running"] += 1
+                    self._metrics["total_wait_seconds"] += time.monotonic() - job.enqueued_at
+                    return job
+                self._condition.wait()
+
+    def _release(self, job: QueuedJob, status: str):
+        with self._condition:
+            for running, key in (
+                (self._running_per_agent, job.agent_id),
+                (self._running_per_account, job.account_id),
+            ):
+                running[key] -= 1
+                if not running[key]:
+                    del running[key]
+            self._metrics["running"] -= 1
+            self._metrics[status] += 1
+            # a slot of this owner is free again, queued jobs that were over the cap may be eligible now
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            job = self._take()
+            logger.info(f"Starting job {job.job_id} on {threading.current_thread().name}")
+            status = "failed"
+            try:
+                status = job.run() or "completed"
+            except Exception:
+                logger.error(f"Job {job.job_id} crashed: {traceback.format_exc()}")
+            finally:
+                self._release(job, status if status in ("completed", "cancelled") else "failed")
@@ -0,0 +1,102 @@
+"""
+Runner shim for the jobs of LocalCodeExecutor.
+
+This file is executed as a script by the interpreter of the job environment and must only depend on the standard
+library. It reads the arguments of the job from stdin as a length-prefixed JSON envelope, imports `task.py` from
+the current working directory and calls its `main`. The result envelope is written to a dedicated file descriptor,
+so the output of the task on stdout and stderr can't corrupt it. Results larger than the spill threshold are
+written to a memory-mapped file next to the task and only a reference to that file is sent on the descriptor.
+The resource limits of the job are applied here, before the task is imported, rather than between fork and exec
+in the multithreaded agent.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import resource
+import struct
+import sys
+import traceback
+
+HEADER = struct.Struct(">Q")
+
+
+def _read_exact(fd: int, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = os.read(fd, min(size, 1024 * 1024))
+        if not chunk:
+            raise EOFError("The argument envelope was truncated.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def read_arguments(fd: int) -> dict:
+    (size,) = HEADER.unpack(_read_exact(fd, HEADER.size))
+    return json.loads(_read_exact(fd, size))
+
+
+def write_result(fd: int, envelope: dict, spill_path: str, spill_threshold: int):
+    data = json.dumps(envelope).encode()
+    if len(data) > spill_threshold:
+        with open(spill_path, "w+b") as f:
+            f.truncate(len(data))
+            with mmap.mmap(f.fileno(), len(data)) as mapped:
+                mapped[:] = data
+                mapped.flush()
+        data = json.dumps({"spill": {"path": spill_path, "size": len(data)}}).encode()
+    _write_all(fd, HEADER.pack(len(data)) + data)
+
+
+def apply_rlimits(rlimits: dict):
+    # the limits produced by ResourceLimits.rlimits
+    for name, (soft, hard) in rlimits.items():
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+
+
+def run(arguments: dict) -> dict:
+    # the task is imported from the job directory, not from the directory of this file
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [os.getcwd()] + [path for path in sys.path if os.path.abspath(path or ".") != here]
+    import task
+
+    kwargs = dict(arguments.get("inputs", {}))
+    if arguments.get("secrets"):
+        kwargs["secrets"] = arguments["secrets"]
+    if arguments.get("integrations"):
+        kwargs["integrations"] = arguments["integrations"]
+    return task.main(**kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--result-fd", type=int, required=True)
+    parser.add_argument("--spill-path", default="0dev.result")
+    parser.add_argument("--spill-threshold", type=int, default=1024 * 1024)
+    parser.add_argument("--rlimits", type=json.loads, default={})
+    args = parser.parse_args()
+
+    exit_code = 0
+    try:
+        apply_rlimits(args.rlimits)
+        envelope = {"ok": True, "result": run(read_arguments(0))}
+        # fail here, not in the executor, if the result isn't serializable
+        json.dumps(envelope)
+    except BaseException as e:
+        traceback.print_exc()
+        envelope = {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+        exit_code = 1
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    write_result(args.result_fd, envelope, os.path.abspath(args.spill_path), args.spill_threshold)
+    os.close(args.result_fd)
+    sys.exit(exit_code)
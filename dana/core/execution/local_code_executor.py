@@ -1,18 +1,49 @@
+import ast
+import json
 import subprocess
-import tempfile
 import os
 import logging
 import sys
+import threading
+import time
 import importlib.util
 import traceback
-import json
+from contextlib import nullcontext
+from typing import Callable, Optional
 
+from core.execution.action_registry import ActionArgumentError
+from core.execution.artifact_store import ARTIFACT_FORMATS, OUTPUT_DIR, ArtifactStore
 from core.execution.base_code_executor import BaseCodeExecutor
+from core.execution.batch_run import BatchRun
+from core.execution.job_channel import RESULT_FD, RUNNER_PATH, JobChannel
+from core.execution.job_log_streamer import JobLogStreamer
+from core.execution.job_queue import JobPriority, JobQueue
+from core.execution.resource_limits import JobCgroup, ResourceLimits
+from core.execution.result_cache import ResultCache
+from core.execution.subprocess_child import SubprocessChild
+from core.execution.trusted_action_executor import ActionWorkerUnavailable, TrustedActionExecutor
+from core.execution.venv_pool import VenvPool
+from core.execution.workspace_manager import WorkspaceManager
+from core.execution.zygote import ZygotePool
+from core.interaction_manager.interaction_manager import InteractionManager
+from core.job_management.job_manager import JobManager
 from core.perception.perception_handler import InputItemFormat
 
 
 logger = logging.getLogger(__name__)
 
+CANCELLED_ERROR = "The job was cancelled."
+# The whole environment of a job on the stdlib fast path, besides HOME
+FAST_PATH_ENV = {"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8"}
+
+
+class JobExecutionError(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
 
 def is_standard_library(module_name: str) -> bool:
     """Check if a module is part of the standard library."""
@@ -29,7 +60,108 @@ def is_standard_library(module_name: str) -> bool:
     )
 
 
+def uses_only_standard_library(code: str) -> bool:
+    """Check if all the absolute imports of the code are standard library modules."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules = [node.module]
+        else:
+            continue
+        if not all(is_standard_library(module.split(".")[0]) for module in modules):
+            return False
+    return True
+
+
 class LocalCodeExecutor(BaseCodeExecutor):
+    def __init__(
+        self,
+        job_manager: JobManager,
+        interaction_manager: InteractionManager,
+        venv_pool: VenvPool,
+        job_queue: JobQueue,
+        workspace_manager: WorkspaceManager,
+        zygote_pool: ZygotePool = None,
+        resource_limits: ResourceLimits = None,
+        cgroup_root: str = None,
+        log_chunk_bytes: int = 16 * 1024,
+        log_flush_interval: float = 1.0,
+        log_max_bytes: int = 10 * 1024 * 1024,
+        result_spill_bytes: int = 1024 * 1024,
+        default_timeout: float = 240,
+        stdlib_fast_path: bool = True,
+        result_cache: ResultCache = None,
+        batch_concurrency: int = 4,
+        artifact_store: ArtifactStore = None,
+        action_executor: TrustedActionExecutor = None,
+    ):
+        """
+        :param job_manager: Instance of JobManager for updating the job status.
+        :param interaction_manager: Instance of InteractionManager for saving the job interactions.
+        :param venv_pool: Cache of virtual environments the jobs run in.
+        :param job_queue: Queue of the worker pool that runs the jobs.
+        :param workspace_manager: Allocates the working directories of the jobs and cleans them up.
+        :param zygote_pool: Optional pool of zygotes to fork the jobs from. Without it, every job starts a new interpreter.
+        :param resource_limits: Default limits of every job (CPU time, memory, open files, output size).
+        :param cgroup_root: Optional delegated cgroup v2 directory. When set, every job runs in its own cgroup
+            that limits its resident memory and reports its peak memory usage.
+        :param log_chunk_bytes: Maximum size of a chunk of the job output streamed to the API.
+        :param log_flush_interval: Maximum number of seconds new job output waits before it is streamed.
+        :param log_max_bytes: Maximum number of bytes of the output of a job streamed to the API, None for no limit.
+            Independent of the output_mb resource limit, which limits the files the job writes.
+        :param result_spill_bytes: Results larger than this are passed back through a memory-mapped file
+            instead of the result pipe.
+        :param default_timeout: Seconds a job may run unless the version of its code sets its own timeout.
+        :param stdlib_fast_path: Run tasks that only use the standard library in an isolated interpreter,
+            without a virtual environment.
+        :param result_cache: Optional cache for the results of idempotent jobs.
+        :param batch_concurrency: Maximum number of child jobs of a batch that are queued or running at a time.
+        :param artifact_store: Optional store of columnar artifacts. With it, inputs of type "artifact" are passed
+            to the jobs as the path of a local copy, and the .npy/.arrow files a job writes to its outputs directory
+            are stored and returned by handle.
+        :param action_executor: Optional executor of the vetted registry actions. Jobs whose code is backed by one
+            of its actions call the action in its long-lived worker instead of running the code in a job process.
+        """
+        super().__init__(job_manager, interaction_manager)
+        self.venv_pool = venv_pool
+        self.job_queue = job_queue
+        self.workspace_manager = workspace_manager
+        self.zygote_pool = zygote_pool
+        self.resource_limits = resource_limits or ResourceLimits()
+        self.cgroup_root = cgroup_root
+        if self.resource_limits.memory_mb and not cgroup_root:
+            logger.warning("The memory limit of the jobs is only enforced with a cgroup root; it is ignored")
+        self.log_chunk_bytes = log_chunk_bytes
+        self.log_flush_interval = log_flush_interval
+        self.log_max_bytes = log_max_bytes
+        self.result_spill_bytes = result_spill_bytes
+        self.default_timeout = default_timeout
+        self.stdlib_fast_path = stdlib_fast_path
+        self.result_cache = result_cache
+        self.batch_concurrency = batch_concurrency
+        self.artifact_store = artifact_store
+        self.action_executor = action_executor
+        self._path_metrics = {
+            "fast": {"jobs": 0, "total_seconds": 0.0},
+            "slow": {"jobs": 0, "total_seconds": 0.0},
+            "action": {"jobs": 0, "total_seconds": 0.0},
+        }
+        self._lock = threading.Lock()
+        # owners of the jobs that are queued or running, by job ID
+        self._jobs = {}
+        # processes of the running jobs, by job ID
+        self._children = {}
+        self._cancelled = set()
+        # batch jobs that are running, by the job ID of the batch
+        self._batches = {}
+        # callbacks of the child jobs of batches, by job ID
+        self._on_done = {}
+
     def execute_code(
         self,
         account_id: str,
@@ -42,6 +174,10 @@ class LocalCodeExecutor(BaseCodeExecutor):
         integrations: dict,
         name: str,
         description: str,
+        priority: int = JobPriority.NORMAL,
+        timeout: Optional[float] = None,
+        idempotent: bool = False,
+        action: Optional[str] = None,
     ) -> str:
         job_id = self.job_manager.create_job(
             session_id=session_id, name=name, description=description
@@ -64,44 +200,222 @@ class LocalCodeExecutor(BaseCodeExecutor):
             interaction=interaction,
         )
 
-        # todo: ideally this should be triggered when the code execution starts
+        cache_key = (
+            ResultCache.key_for(code, inputs, secrets, integrations)
+            if idempotent and self.result_cache
+            else None
+        )
+        cached_result = self.result_cache.get(cache_key) if cache_key else None
+        if cached_result is not None:
+            logger.info(f"Completing job {job_id} with a cached result")
+            self._report_cached(account_id, agent_id, session_id, job_id, cached_result)
+            return job_id
+
+        with self._lock:
+            self._jobs[job_id] = (account_id, agent_id, session_id)
+
+        self.job_queue.submit(
+            job_id=job_id,
+            account_id=account_id,
+            agent_id=agent_id,
+            run=lambda: self._run_job(
+                account_id=account_id,
+                agent_id=agent_id,
+                session_id=session_id,
+                job_id=job_id,
+                code=code,
+                requirements=requirements,
+                inputs=inputs,
+                secrets=secrets,
+                integrations=integrations,
+                name=name,
+                description=description,
+                timeout=timeout or self.default_timeout,
+                cache_key=cache_key,
+                action=action,
+            ),
+            priority=priority,
+        )
+
+        return job_id
+
+    def execute_batch(
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        code: str,
+        requirements: list,
+        input_sets: list[list[InputItemFormat]],
+        secrets: dict,
+        integrations: dict,
+        name: str,
+        description: str,
+        priority: int = JobPriority.NORMAL,
+        timeout: Optional[float] = None,
+        idempotent: bool = False,
+        action: Optional[str] = None,
+    ) -> str:
+        job_id = self.job_manager.create_job(
+            session_id=session_id, name=name, description=description
+        )
+        self.interaction_manager.save_interaction(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            interaction={
+                "type": "job",
+                "content": {
+                    "job_id": job_id,
+                    "name": name,
+                    "description": description,
+                    "status": "created",
+                    "batch_size": len(input_sets),
+                },
+            },
+        )
         self.job_manager.update_job_status(
             job_id=job_id,
             session_id=session_id,
             status="in_progress",
-            payload={},
+            payload={"total": len(input_sets)},
         )
 
-        interaction = {
-            "type": "job",
-            "content": {
-                "job_id": job_id,
-                "name": name,
-                "description": description,
-                "status": "in_progress",
-            },
-        }
-        self.interaction_manager.save_interaction(
+        batch = BatchRun(
+            job_id=job_id,
             account_id=account_id,
             agent_id=agent_id,
             session_id=session_id,
-            interaction=interaction,
+            name=name,
+            description=description,
+            input_sets=input_sets,
+            code=code,
+            requirements=requirements,
+            secrets=secrets,
+            integrations=integrations,
+            priority=priority,
+            timeout=timeout,
+            idempotent=idempotent,
+            action=action,
+        )
+        with self._lock:
+            self._batches[job_id] = batch
+        logger.info(
+            f"Running batch job {job_id} with {len(input_sets)} input sets, "
+            f"at most {self.batch_concurrency} at a time"
         )
 
+        # every child that finishes starts the next input set, so only the first ones are started here
+        self._fill_batch(batch)
+        return job_id
+
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job. A running job is killed together with every process it started.
+        The job is reported as cancelled once it has stopped. Cancelling a batch job cancels its children
+        and skips the input sets that haven't started yet.
+
+        :param job_id: The ID of the job.
+        :return: True if the job is being cancelled, False if it isn't queued or running here.
+        """
+        with self._lock:
+            batch = self._batches.get(job_id)
+            if batch:
+                batch.cancelled = True
+                children = [child_id for child_id in batch.running.values() if child_id]
+        if batch:
+            logger.info(f"Cancelling batch job {job_id} and its {len(children)} running children")
+            for child_id in children:
+                self.cancel_job(child_id)
+            self._finish_batch_if_done(batch)
+            return True
+
+        with self._lock:
+            owner = self._jobs.get(job_id)
+            if not owner:
+                return False
+            self._cancelled.add(job_id)
+            child = self._children.get(job_id)
+
+        if self.job_queue.cancel(job_id):
+            # the job never started, so nothing else will report it
+            account_id, agent_id, session_id = owner
+            with self._lock:
+                on_done = self._on_done.get(job_id)
+            self._report_cancelled(
+                account_id, agent_id, session_id, job_id, save_interaction=not on_done
+            )
+            self._forget(job_id)
+            if on_done:
+                on_done("cancelled", {"error": CANCELLED_ERROR})
+        elif child:
+            logger.info(f"Killing the process group of job {job_id}")
+            child.kill()
+        # a job that is still preparing its environment is stopped before it starts its process
+        return True
+
+    def _run_job(
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        job_id: str,
+        code: str,
+        requirements: list,
+        inputs: list[InputItemFormat],
+        secrets: dict,
+        integrations: dict,
+        name: str,
+        description: str,
+        timeout: float,
+        cache_key: Optional[str] = None,
+        on_done: Optional[Callable[[str, dict], None]] = None,
+        action: Optional[str] = None,
+    ):
+        """
+        Run a queued job on a worker thread and report its status.
+        The result of a successful job is cached under `cache_key`, if given.
+        The child jobs of a batch don't save interactions; they hand their final status and result to `on_done`.
+        A job whose code is backed by a trusted registry `action` calls the action instead of running the code.
+
+        :return: The final status of the job: completed, failed or cancelled.
+        """
+        self.job_manager.update_job_status(
+            job_id=job_id,
+            session_id=session_id,
+            status="in_progress",
+            payload={},
+        )
+
+        if not on_done:
+            interaction = {
+                "type": "job",
+                "content": {
+                    "job_id": job_id,
+                    "name": name,
+                    "description": description,
+                    "status": "in_progress",
+                },
+            }
+            self.interaction_manager.save_interaction(
+                account_id=account_id,
+                agent_id=agent_id,
+                session_id=session_id,
+                interaction=interaction,
+            )
+
         logger.info(f"Updated job status to 'in_progress' for job_id: {job_id}")
 
-        # Temporary directory for virtual environment and script
-        temp_dir = tempfile.mkdtemp()
+        # Working directory of the job, cleaned up by the workspace manager once the job is done
+        temp_dir = self.workspace_manager.allocate(job_id)
+        # artifacts fetched for the inputs, pinned in the cache until the job is done
+        fetched_artifacts = []
         job_final_status = "failed"
         job_exec_result = {"error": "Execution did not complete"}
+        started = time.monotonic()
+        metrics = {}
         try:
-            # Create a virtual environment
-            venv_dir = os.path.join(temp_dir, "venv")
-            subprocess.run(["python3", "-m", "venv", venv_dir], check=True)
-
-            logger.info(f"Created virtual environment at: {venv_dir}")
-
-            # Install dependencies
+            # Only the non-standard requirements need to be installed in the environment
             non_standard_requirements = [
                 requirement
                 for requirement in requirements
@@ -110,89 +424,120 @@ class LocalCodeExecutor(BaseCodeExecutor):
 
             logger.info(f"Non-standard requirements: {non_standard_requirements}")
 
-            if non_standard_requirements:
-                logger.info(f"Installing requirements: {non_standard_requirements}")
-                pip_executable = os.path.join(venv_dir, "bin", "pip")
-                subprocess.run(
-                    [pip_executable, "install"] + non_standard_requirements, check=True
-                )
-
             # Write the task code to a temporary file
-            logger.info(f"Writing task code to a temporary file: {temp_dir}/task.py")
+            logger.info(f"Writing task code to: {temp_dir}/task.py")
             script_path = os.path.join(temp_dir, "task.py")
             with open(script_path, "w") as script_file:
                 script_file.write(code)
 
-            # Write the caller script to a temporary file
-            caller_script_path = os.path.join(temp_dir, "main.py")
-            logger.info(
-                f"Writing caller script to a temporary file: {temp_dir}/main.py"
-            )
-
-            args = {}
-            args["inputs"] = (
-                ", ".join(
-                    [
-                        f"{input_item.name}={repr(input_item.get_typed_value())}"
-                        for input_item in inputs
-                    ]
-                )
-                if inputs
-                else ""
-            )
-            if secrets:
-                args["secrets"] = secrets
-            if integrations:
-                args["integrations"] = integrations
+            # Large tabular results are written to the outputs directory and stored as artifacts
+            os.makedirs(os.path.join(temp_dir, OUTPUT_DIR))
 
-            args_str = ", ".join([f"{k}={v}" for k, v in args.items() if v])
-
-            output_file = os.path.join(temp_dir, "0dev.out")
+            # The arguments are passed to the runner shim as a JSON envelope on its stdin
+            arguments = {
+                "inputs": {
+                    input_item.name: self._input_value(input_item, fetched_artifacts)
+                    for input_item in inputs or []
+                },
+                "secrets": secrets,
+                "integrations": integrations,
+            }
 
-            with open(caller_script_path, "w") as caller_script_file:
-                caller_script_file.write(
-                    f"""
-import task
-import json
-import time
-import os
-result=task.main({args_str})
-with open('{output_file}', 'w') as f:
-    f.write(json.dumps(result))
-"""
+            if self._is_cancelled(job_id):
+                raise JobCancelled(job_id)
+            invocation = None
+            run_started = time.monotonic()
+            if action and self.action_executor and self.action_executor.has_action(action):
+                try:
+                    invocation = self.action_executor.start(
+                        action, arguments["inputs"], secrets=secrets, integrations=integrations
+                    )
+                except (ActionArgumentError, ActionWorkerUnavailable) as e:
+                    # the generated code does the same as the action
+                    logger.warning(f"Running the code of job {job_id} instead of action {action}: {e}")
+
+            if invocation:
+                # vetted registry action: called in the long-lived action worker, no environment or process to set up
+                metrics["path"] = "action"
+                with self._lock:
+                    self._children[job_id] = invocation
+                if self._is_cancelled(job_id):
+                    # cancelled while the action was starting
+                    invocation.kill()
+                # an action that times out or is cancelled is killed with its worker
+                envelope = invocation.wait(timeout)
+                metrics["run_seconds"] = round(time.monotonic() - run_started, 3)
+                returncode, rusage, peak_memory_bytes = 0, {}, None
+            else:
+                # Execute the script in a cached virtual environment with the requirements installed
+                # Tasks that only import the standard library don't need a virtual environment at all
+                fast_path = (
+                    self.stdlib_fast_path
+                    and not non_standard_requirements
+                    and uses_only_standard_library(code)
                 )
-
-            # Execute the script in the virtual environment
-            python_executable = os.path.join(venv_dir, "bin", "python")
-            logger.info(f"Executing script with Python: {python_executable}")
-            executionResult = subprocess.run(
-                [python_executable, caller_script_path],
-                check=True,
-                cwd=temp_dir,
-                timeout=240,
+                metrics["path"] = "fast" if fast_path else "slow"
+                install_started = time.monotonic()
+                with (
+                    nullcontext(None)
+                    if fast_path
+                    else self.venv_pool.acquire(non_standard_requirements)
+                ) as venv_dir:
+                    metrics["install_seconds"] = round(time.monotonic() - install_started, 3)
+                    run_started = time.monotonic()
+                    returncode, envelope, rusage, peak_memory_bytes = self._run_limited(
+                        job_id=job_id,
+                        venv_dir=venv_dir,
+                        requirements=non_standard_requirements,
+                        arguments=arguments,
+                        cwd=temp_dir,
+                        limits=self.resource_limits,
+                        timeout=timeout,
+                    )
+                    metrics["run_seconds"] = round(time.monotonic() - run_started, 3)
+
+            metrics["cpu_seconds"] = round(rusage.get("utime", 0) + rusage.get("stime", 0), 3)
+            metrics["peak_rss_kb"] = (
+                peak_memory_bytes // 1024 if peak_memory_bytes else rusage.get("maxrss_kb")
             )
-
-            logger.info(f"Result: {executionResult}")
-
-            # read the output file and store it in the result
-            with open(f"{output_file}", "r") as f:
-                output = f.read()
-            logger.info(f"Output: {output}")
-            try:
-                parsedOutput = json.loads(output)
-                print("parsedOutput", parsedOutput)
-            except json.JSONDecodeError:
-                parsedOutput = {"status": "failed", "error": "Invalid JSON output"}
-
-            if (
-                executionResult.returncode == 0
-                and parsedOutput.get("status") == "success"
-            ):
+            metrics["wall_seconds"] = round(time.monotonic() - started, 3)
+            self._record_path(metrics["path"], metrics["wall_seconds"])
+
+            logger.info(f"Job {job_id} exited with {returncode}, metrics: {metrics}")
+            logger.info(f"Virtual environment pool metrics: {self.venv_pool.metrics()}")
+            logger.info(f"Job queue metrics: {self.job_queue.metrics()}")
+            logger.info(f"Workspace metrics: {self.workspace_manager.metrics()}")
+            logger.info(f"Executor metrics: {self.metrics()}")
+            if self.result_cache:
+                logger.info(f"Result cache metrics: {self.result_cache.metrics()}")
+            if self.action_executor:
+                logger.info(f"Trusted action metrics: {self.action_executor.metrics()}")
+            if self.artifact_store:
+                logger.info(f"Artifact cache metrics: {self.artifact_store.metrics()}")
+
+            if not envelope:
+                # the job was killed or crashed before the runner could report a result
+                raise subprocess.CalledProcessError(returncode, RUNNER_PATH)
+            if not envelope["ok"]:
+                raise JobExecutionError(envelope["error"])
+
+            parsedOutput = envelope["result"]
+            logger.info(f"Output: {parsedOutput}")
+            if not isinstance(parsedOutput, dict):
+                parsedOutput = {"status": "failed", "error": "Invalid output"}
+            # only the handles, schemas and summaries of the artifacts go into the result, never their rows
+            artifacts = self._store_artifacts(job_id, temp_dir)
+            if artifacts:
+                parsedOutput = {**parsedOutput, "artifacts": artifacts}
+
+            if parsedOutput.get("status") == "success":
+                if cache_key:
+                    self.result_cache.put(cache_key, parsedOutput)
                 self.job_manager.update_job_status(
                     job_id=job_id,
                     session_id=session_id,
                     status="completed",
-                    payload=output,
+                    payload={**parsedOutput, "metrics": metrics},
                 )
                 job_final_status = "completed"
                 job_exec_result = parsedOutput
@@ -201,43 +546,426 @@ with open('{output_file}', 'w') as f:
                     job_id=job_id,
                     session_id=session_id,
                     status="failed",
-                    payload=output,
+                    payload={**parsedOutput, "metrics": metrics},
                 )
                 job_final_status = "failed"
                 job_exec_result = parsedOutput
 
         except Exception as e:
-            logger.error(
-                f"Error during subprocess execution:\n {traceback.format_exc()}"
+            if self._is_cancelled(job_id):
+                logger.info(f"Job {job_id} was cancelled")
+                self.job_manager.update_job_status(
+                    job_id=job_id,
+                    session_id=session_id,
+                    status="cancelled",
+                    payload={"error": CANCELLED_ERROR, "metrics": metrics},
+                )
+                job_final_status = "cancelled"
+                job_exec_result = {"error": CANCELLED_ERROR}
+            else:
+                logger.error(
+                    f"Error during subprocess execution:\n {traceback.format_exc()}"
+                )
+                if isinstance(e, subprocess.TimeoutExpired):
+                    e = JobExecutionError(f"The job timed out after {timeout} seconds.")
+                self.job_manager.update_job_status(
+                    job_id=job_id,
+                    session_id=session_id,
+                    status="failed",
+                    payload={"error": str(e), "metrics": metrics},
+                )
+                job_final_status = "failed"
+                job_exec_result = {"error": str(e)}
+
+        finally:
+            self.workspace_manager.release(temp_dir, failed=job_final_status != "completed")
+            for artifact_id in fetched_artifacts:
+                self.artifact_store.release(artifact_id)
+            self._forget(job_id)
+
+            if on_done:
+                on_done(job_final_status, job_exec_result)
+            else:
+                interaction = {
+                    "type": "job",
+                    "content": {
+                        "job_id": job_id,
+                        "status": job_final_status,
+                        "payload": job_exec_result,
+                    },
+                }
+
+                self.interaction_manager.save_interaction(
+                    account_id=account_id,
+                    agent_id=agent_id,
+                    session_id=session_id,
+                    interaction=interaction,
+                )
+        return job_final_status
+
+    def _run_limited(
+        self,
+        job_id: str,
+        venv_dir: Optional[str],
+        requirements: list[str],
+        arguments: dict,
+        cwd: str,
+        limits: ResourceLimits,
+        timeout: float,
+    ) -> tuple[int, Optional[dict], dict, Optional[int]]:
+        """
+        Run the task of a job through the runner shim under its resource limits and wait for it,
+        streaming its output to the API. Without a virtual environment the task runs on the stdlib fast path.
+
+        :return: The exit code, the result envelope (None if the job didn't write one), the resource usage
+            reported for the process and the peak memory of its cgroup, if any.
+        :raises subprocess.TimeoutExpired: If the job runs longer than the timeout. The job is killed.
+        :raises JobCancelled: If the job was cancelled before its process started.
+        """
+        if self._is_cancelled(job_id):
+            raise JobCancelled(job_id)
+        cgroup = JobCgroup(self.cgroup_root, job_id, limits) if self.cgroup_root else None
+        log_streamer = JobLogStreamer(
+            self.job_manager,
+            job_id,
+            chunk_bytes=self.log_chunk_bytes,
+            flush_interval=self.log_flush_interval,
+            max_bytes=self.log_max_bytes,
+        )
+        channel = JobChannel(arguments)
+        child = None
+        try:
+            if venv_dir is None:
+                # stdlib-only task: an isolated interpreter without site-packages and with a clean environment
+                logger.info(f"Executing script on the stdlib fast path with Python: {sys.executable}")
+                stdout, stderr = log_streamer.fds
+                stdin, result_fd = channel.fds
+                child = SubprocessChild(
+                    [sys.executable, "-I", "-S", "-u", RUNNER_PATH] + self._runner_args(result_fd, limits.rlimits()),
+                    cwd=cwd,
+                    env={**FAST_PATH_ENV, "HOME": cwd},
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    pass_fds=[result_fd],
+                )
+            elif self.zygote_pool:
+                # fork the job from the warm zygote of the environment instead of starting a new interpreter
+                logger.info(f"Executing script with the zygote of: {venv_dir}")
+                child = self.zygote_pool.spawn(
+                    venv_dir=venv_dir,
+                    lock_file=self.venv_pool.lock_path(venv_dir),
+                    requirements=requirements,
+                    script=RUNNER_PATH,
+                    cwd=cwd,
+                    args=self._runner_args(RESULT_FD),
+                    rlimits=limits.rlimits(),
+                    fds=log_streamer.fds + channel.fds,
+                    fd_targets=[1, 2, 0, RESULT_FD],
+                )
+            else:
+                python_executable = os.path.join(venv_dir, "bin", "python")
+                logger.info(f"Executing script with Python: {python_executable}")
+                stdout, stderr = log_streamer.fds
+                stdin, result_fd = channel.fds
+                child = SubprocessChild(
+                    [python_executable, RUNNER_PATH] + self._runner_args(result_fd, limits.rlimits()),
+                    cwd=cwd,
+                    env={**os.environ, "PYTHONUNBUFFERED": "1"},
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    pass_fds=[result_fd],
+                )
+            log_streamer.start()
+            channel.start()
+            if cgroup:
+                cgroup.add(child.pid)
+            with self._lock:
+                self._children[job_id] = child
+            if self._is_cancelled(job_id):
+                # cancelled while the process was starting
+                child.kill()
+
+            try:
+                returncode = child.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                child.kill()
+                child.wait()
+                raise
+            return (
+                returncode,
+                channel.result(),
+                child.rusage,
+                cgroup.peak_memory_bytes() if cgroup else None,
             )
-            self.job_manager.update_job_status(
-                job_id=job_id,
-                session_id=session_id,
-                status="failed",
-                payload={"error": str(e)},
+        finally:
+            if child:
+                # tear down whatever the job left running in its process group
+                child.kill()
+            channel.close()
+            log_streamer.close()
+            if cgroup:
+                cgroup.remove()
+
+    def metrics(self) -> dict:
+        """
+        Return the number of jobs and their average latency (wall time) on the stdlib fast path, the slow path
+        and the trusted action path.
+        """
+        metrics = {}
+        with self._lock:
+            for path, counters in self._path_metrics.items():
+                metrics[f"{path}_path_jobs"] = counters["jobs"]
+                metrics[f"{path}_path_avg_seconds"] = (
+                    round(counters["total_seconds"] / counters["jobs"], 3) if counters["jobs"] else 0.0
+                )
+        return metrics
+
+    def _record_path(self, path: str, seconds: float):
+        with self._lock:
+            self._path_metrics[path]["jobs"] += 1
+            self._path_metrics[path]["total_seconds"] += seconds
+
+    def _is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancelled
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._children.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            self._on_done.pop(job_id, None)
+
+    def _start_batch_child(self, batch: BatchRun, index: int):
+        """
+        Create the child job of an input set of a batch and queue it, or complete it from the result cache.
+        """
+        inputs = batch.input_sets[index]
+        name = f"{batch.name} [{index + 1}/{len(batch.input_sets)}]"
+        try:
+            child_id = self.job_manager.create_job(
+                session_id=batch.session_id,
+                name=name,
+                description=batch.description,
+                parent_job_id=batch.job_id,
             )
-            job_final_status = "failed"
-            job_exec_result = {"error": str(e)}
+        except Exception as e:
+            logger.error(f"Failed to create a child job of batch {batch.job_id}: {traceback.format_exc()}")
+            self._on_batch_child_done(batch, index, None, "failed", {"error": str(e)})
+            return
 
-        finally:
-            # Clean up temporary directory
-            # todo: uncomment this line
-            # shutil.rmtree(temp_dir)
+        def on_done(status: str, result: dict):
+            self._on_batch_child_done(batch, index, child_id, status, result)
 
-            interaction = {
+        with self._lock:
+            batch.running[index] = child_id
+
+        cache_key = (
+            ResultCache.key_for(batch.code, inputs, batch.secrets, batch.integrations)
+            if batch.idempotent and self.result_cache
+            else None
+        )
+        cached_result = self.result_cache.get(cache_key) if cache_key else None
+        if cached_result is not None:
+            self._report_cached(
+                batch.account_id, batch.agent_id, batch.session_id, child_id, cached_result, save_interaction=False
+            )
+            on_done("completed", cached_result)
+            return
+
+        with self._lock:
+            self._jobs[child_id] = (batch.account_id, batch.agent_id, batch.session_id)
+            self._on_done[child_id] = on_done
+
+        self.job_queue.submit(
+            job_id=child_id,
+            account_id=batch.account_id,
+            agent_id=batch.agent_id,
+            run=lambda: self._run_job(
+                account_id=batch.account_id,
+                agent_id=batch.agent_id,
+                session_id=batch.session_id,
+                job_id=child_id,
+                code=batch.code,
+                requirements=batch.requirements,
+                inputs=inputs,
+                secrets=batch.secrets,
+                integrations=batch.integrations,
+                name=name,
+                description=batch.description,
+                timeout=batch.timeout or self.default_timeout,
+                cache_key=cache_key,
+                on_done=on_done,
+                action=batch.action,
+            ),
+            priority=batch.priority,
+        )
+        if batch.cancelled:
+            # the batch was cancelled while this child was being created
+            self.cancel_job(child_id)
+
+    def _fill_batch(self, batch: BatchRun):
+        """
+        Start input sets of a batch until `batch_concurrency` children are queued or running.
+        Only one thread fills a batch at a time; a child that finishes meanwhile is picked up by that thread.
+        """
+        with self._lock:
+            if batch.filling:
+                return
+            batch.filling = True
+        while True:
+            with self._lock:
+                if batch.cancelled or not batch.pending or len(batch.running) >= self.batch_concurrency:
+                    batch.filling = False
+                    break
+                index = batch.pending.popleft()
+                batch.running[index] = None
+            self._start_batch_child(batch, index)
+        self._finish_batch_if_done(batch)
+
+    def _on_batch_child_done(
+        self, batch: BatchRun, index: int, child_id: Optional[str], status: str, result: dict
+    ):
+        with self._lock:
+            batch.running.pop(index, None)
+            batch.record(index, child_id, status, result)
+        logger.info(f"Child job {child_id} of batch {batch.job_id} finished with status {status}")
+        self._fill_batch(batch)
+
+    def _finish_batch_if_done(self, batch: BatchRun):
+        """
+        Report a batch job once all its children have finished, with their aggregated results.
+        """
+        with self._lock:
+            if batch.finished or batch.filling or not batch.done:
+                return
+            batch.finished = True
+            self._batches.pop(batch.job_id, None)
+            for index in batch.pending:
+                # skipped because the batch was cancelled
+                batch.record(index, None, "cancelled", {"error": CANCELLED_ERROR})
+            batch.pending.clear()
+
+        status = batch.final_status()
+        payload = batch.aggregate()
+        logger.info(
+            f"Batch job {batch.job_id} finished with status {status}: {payload['completed']} completed, "
+            f"{payload['failed']} failed, {payload['cancelled']} cancelled"
+        )
+        self.job_manager.update_job_status(
+            job_id=batch.job_id,
+            session_id=batch.session_id,
+            status=status,
+            payload=payload,
+        )
+        self.interaction_manager.save_interaction(
+            account_id=batch.account_id,
+            agent_id=batch.agent_id,
+            session_id=batch.session_id,
+            interaction={
+                "type": "job",
+                "content": {
+                    "job_id": batch.job_id,
+                    "status": status,
+                    "payload": payload,
+                },
+            },
+        )
+
+    def _report_cached(
+        self,
+        account_id: str,
+        agent_id: str,
+        session_id: str,
+        job_id: str,
+        result: dict,
+        save_interaction: bool = True,
+    ):
+        self.job_manager.update_job_status(
+            job_id=job_id,
+            session_id=session_id,
+            status="completed",
+            payload={**result, "cached": True},
+        )
+        if not save_interaction:
+            return
+        self.interaction_manager.save_interaction(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            interaction={
                 "type": "job",
                 "content": {
                     "job_id": job_id,
-                    "status": job_final_status,
-                    "payload": job_exec_result,
+                    "status": "completed",
+                    "payload": result,
+                    "cached": True,
                 },
-            }
+            },
+        )
 
-            self.interaction_manager.save_interaction(
-                account_id=account_id,
-                agent_id=agent_id,
-                session_id=session_id,
-                interaction=interaction,
-            )
+    def _report_cancelled(
+        self, account_id: str, agent_id: str, session_id: str, job_id: str, save_interaction: bool = True
+    ):
+        self.job_manager.update_job_status(
+            job_id=job_id,
+            session_id=session_id,
+            status="cancelled",
+            payload={"error": CANCELLED_ERROR},
+        )
+        if not save_interaction:
+            return
+        self.interaction_manager.save_interaction(
+            account_id=account_id,
+            agent_id=agent_id,
+            session_id=session_id,
+            interaction={
+                "type": "job",
+                "content": {
+                    "job_id": job_id,
+                    "status": "cancelled",
+                    "payload": {"error": CANCELLED_ERROR},
+                },
+            },
+        )
 
-            return job_id
+    def _input_value(self, input_item: InputItemFormat, fetched_artifacts: list[str]):
+        if input_item.type != "artifact":
+            return input_item.get_typed_value()
+        if not self.artifact_store:
+            raise JobExecutionError(
+                f"Input {input_item.name} is an artifact, but no artifact store is configured."
+            )
+        path = self.artifact_store.fetch(input_item.value)
+        fetched_artifacts.append(input_item.value)
+        return path
+
+    def _store_artifacts(self, job_id: str, workspace: str) -> list[dict]:
+        output_dir = os.path.join(workspace, OUTPUT_DIR)
+        paths = sorted(
+            os.path.join(output_dir, file_name)
+            for file_name in os.listdir(output_dir)
+            if os.path.splitext(file_name)[1].lower() in ARTIFACT_FORMATS
+        )
+        if paths and not self.artifact_store:
+            logger.warning(f"Job {job_id} wrote artifacts, but no artifact store is configured")
+            return []
+        artifacts = []
+        for path in paths:
+            artifact = self.artifact_store.upload(path)
+            logger.info(
+                f"Stored artifact {artifact['artifact_id']} ({artifact['size_bytes']} bytes) of job {job_id}"
+            )
+            artifacts.append(artifact)
+        return artifacts
+
+    def _runner_args(self, result_fd: int, rlimits: dict = None) -> list[str]:
+        # the zygotes apply the limits themselves, in the forked child
+        return [
+            "--result-fd",
+            str(result_fd),
+            "--spill-threshold",
+            str(self.result_spill_bytes),
+        ] + (["--rlimits", json.dumps(rlimits)] if rlimits else [])
@@ -0,0 +1,99 @@
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResourceLimits:
+    """
+    Limits enforced on every job. None means no limit.
+    """
+
+    cpu_seconds: Optional[int] = None
+    memory_mb: Optional[int] = None
+    open_files: Optional[int] = None
+    output_mb: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "ResourceLimits":
+        """
+        Build the limits from a dictionary, e.g. the `resource_limits` of the agent configuration.
+        Unknown keys are ignored.
+        """
+        return cls(**{k: int(v) for k, v in (values or {}).items() if k in cls.__dataclass_fields__ and v is not None})
+
+    def merged_with(self, overrides: "ResourceLimits") -> "ResourceLimits":
+        """
+        Return a copy of these limits with the limits set in `overrides` taking precedence.
+        """
+        values = asdict(self)
+        values.update({k: v for k, v in asdict(overrides).items() if v is not None})
+        return ResourceLimits(**values)
+
+    def rlimits(self) -> dict:
+        """
+        Translate the limits into setrlimit arguments, keyed by the name of the resource.
+        The memory limit isn't one of them: RLIMIT_AS limits the address space, not the memory used, and fails jobs
+        that memory-map large artifacts or whose numeric libraries reserve thread arenas. Memory is limited by the
+        JobCgroup of the job, when the agent has a delegated cgroup.
+        """
+        rlimits = {}
+        if self.cpu_seconds:
+            # the soft limit sends SIGXCPU, the hard limit a second later SIGKILL
+            rlimits["RLIMIT_CPU"] = [self.cpu_seconds, self.cpu_seconds + 1]
+        if self.open_files:
+            rlimits["RLIMIT_NOFILE"] = [self.open_files] * 2
+        if self.output_mb:
+            rlimits["RLIMIT_FSIZE"] = [self.output_mb * 1024 * 1024] * 2
+        return rlimits
+
+
+class JobCgroup:
+    """
+    A cgroup v2 created for a single job. It limits the resident memory of the job (which rlimits can't do)
+    and reports the peak memory usage of the whole process tree. It requires a delegated cgroup subtree.
+    """
+
+    def __init__(self, root: str, job_id: str, limits: ResourceLimits):
+        """
+        :param root: A cgroup directory the agent is allowed to create child groups in.
+        :param job_id: The ID of the job.
+        :param limits: The limits of the job.
+        """
+        self.path = os.path.join(root, f"job-{job_id}")
+        os.makedirs(self.path, exist_ok=True)
+        if limits.memory_mb:
+            self._write("memory.max", str(limits.memory_mb * 1024 * 1024))
+            self._write("memory.swap.max", "0")
+
+    def add(self, pid: int):
+        """
+        Move a process into the cgroup.
+        """
+        self._write("cgroup.procs", str(pid))
+
+    def peak_memory_bytes(self) -> Optional[int]:
+        """
+        Return the peak memory usage of the cgroup, if the kernel reports it.
+        """
+        try:
+            with open(os.path.join(self.path, "memory.peak"), "r") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def remove(self):
+        try:
+            os.rmdir(self.path)
+        except OSError as e:
+            logger.warning(f"Failed to remove cgroup {self.path}: {e}")
+
+    def _write(self, name: str, value: str):
+        try:
+            with open(os.path.join(self.path, name), "w") as f:
+                f.write(value)
+        except OSError as e:
+            logger.warning(f"Failed to set {name} of cgroup {self.path}: {e}")
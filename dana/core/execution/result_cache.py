@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core.perception.perception_handler import InputItemFormat
+
+
+class ResultCache:
+    """
+    An in-memory cache of the results of idempotent jobs, with a time to live and least recently used eviction.
+    Results are keyed by the code, the inputs and the names (not the values) of the secrets and integrations.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 1000):
+        """
+        :param ttl_seconds: How long a result stays valid.
+        :param max_entries: Maximum number of cached results.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(
+        code: str,
+        inputs: list[InputItemFormat],
+        secrets: dict,
+        integrations: dict,
+    ) -> str:
+        """
+        Compute the cache key of a job from its code hash, the hash of its canonical inputs and
+        the names of its secrets and integrations.
+        """
+        code_hash = hashlib.sha256(code.encode()).hexdigest()
+        canonical_inputs = json.dumps(
+            {input_item.name: input_item.get_typed_value() for input_item in inputs or []},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        inputs_hash = hashlib.sha256(canonical_inputs.encode()).hexdigest()
+        names = json.dumps([sorted(secrets or {}), sorted(integrations or {})])
+        return hashlib.sha256(f"{code_hash}:{inputs_hash}:{names}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Return the cached result of a key, or None if there is no valid result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self._metrics["misses"] += 1
+            return None
+
+    def put(self, key: str, result: dict):
+        """
+        Cache a result, evicting the least recently used results over the size limit.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def metrics(self) -> dict:
+        """
+        Return the hit/miss counters and the number of cached results.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+        return metrics
@@ -0,0 +1,81 @@
+import os
+import signal
+import subprocess
+import threading
+from typing import Optional
+
+
+class SubprocessChild:
+    """
+    A job process started with a new interpreter, in a session and process group of its own. It has the same interface as ZygoteChild so that
+    LocalCodeExecutor can treat both the same way, including the resource usage of the finished job.
+    """
+
+    def __init__(
+        self,
+        args: list[str],
+        cwd: str,
+        env: dict = None,
+        stdin: int = None,
+        stdout: int = None,
+        stderr: int = None,
+        pass_fds: list[int] = (),
+    ):
+        """
+        :param args: The command to run.
+        :param cwd: Working directory of the job.
+        :param env: Environment of the job. None inherits the environment of the agent.
+        :param stdin: Optional file descriptor for the stdin of the job.
+        :param stdout: Optional file descriptor for the stdout of the job.
+        :param stderr: Optional file descriptor for the stderr of the job.
+        :param pass_fds: Additional file descriptors the job inherits.
+        """
+        self.args = args
+        self.returncode = None
+        self.rusage = {}
+        self._process = subprocess.Popen(
+            args,
+            cwd=cwd,
+            env=env,
+            stdin=stdin,
+            stdout=stdout,
+            stderr=stderr,
+            pass_fds=pass_fds,
+            start_new_session=True,
+        )
+        self.pid = self._process.pid
+        # os.wait4 (rather than Popen.wait) is what reports the resource usage of the child
+        self._waiter = threading.Thread(target=self._wait4, daemon=True)
+        self._waiter.start()
+
+    def _wait4(self):
+        _, status, rusage = os.wait4(self.pid, 0)
+        self.rusage = {
+            "utime": rusage.ru_utime,
+            "stime": rusage.ru_stime,
+            "maxrss_kb": rusage.ru_maxrss,
+        }
+        self.returncode = os.waitstatus_to_exitcode(status)
+        self._process.returncode = self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for the job to exit.
+
+        :param timeout: Maximum number of seconds to wait.
+        :return: The exit code of the job, negative if it was killed by a signal.
+        :raises subprocess.TimeoutExpired: If the job is still running after the timeout.
+        """
+        self._waiter.join(timeout)
+        if self._waiter.is_alive():
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def kill(self):
+        """
+        Kill the process group of the job, i.e. the job and every process it started that is still running.
+        """
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
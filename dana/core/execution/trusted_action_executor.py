@@ -0,0 +1,318 @@
+import itertools
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+from contextlib import ExitStack
+from typing import Optional
+
+from core.execution.action_registry import ActionSpec
+from core.execution.job_channel import HEADER
+from core.execution.venv_pool import VenvPool
+
+logger = logging.getLogger(__name__)
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trusted_action_worker.py")
+
+
+class ActionWorkerUnavailable(Exception):
+    pass
+
+
+class _PendingInvocation:
+    def __init__(self):
+        self.done = threading.Event()
+        self.envelope = None
+
+
+class ActionInvocation:
+    """
+    An invocation of an action in the worker. Like a job process, it can be waited for or killed.
+    """
+
+    def __init__(self, executor: "TrustedActionExecutor", name: str, pending: _PendingInvocation, worker_socket):
+        self.executor = executor
+        self.name = name
+        self._pending = pending
+        self._worker_socket = worker_socket
+
+    def wait(self, timeout: Optional[float] = None) -> dict:
+        """
+        Wait for the result of the action. An action that doesn't return within the timeout is killed.
+
+        :param timeout: Maximum number of seconds to wait for the action.
+        :return: The result envelope, like the one of a job: {"ok": True, "result"} or {"ok": False, "error", ...}.
+        :raises subprocess.TimeoutExpired: If the action doesn't return within the timeout.
+        :raises ActionWorkerUnavailable: If the worker dies or is killed during the invocation.
+        """
+        if not self._pending.done.wait(timeout):
+            self.kill()
+            raise subprocess.TimeoutExpired(self.name, timeout)
+        if self._pending.envelope is None:
+            raise ActionWorkerUnavailable("The action worker exited during the invocation.")
+        if not self._pending.envelope["ok"]:
+            with self.executor._lock:
+                self.executor._metrics["failures"] += 1
+        return self._pending.envelope
+
+    def kill(self):
+        """
+        Kill the worker running the action. The invocations it was running for other jobs fail too.
+        """
+        if not self._pending.done.is_set():
+            self.executor._kill_worker(self._worker_socket)
+
+
+class TrustedActionExecutor:
+    """
+    Runs the vetted registry actions in a long-lived worker process instead of a job process per invocation.
+    The worker runs in one environment with the pinned requirements of all the actions, imports every action once,
+    and calls them with typed arguments. It is started on first use and restarted if it dies.
+    A thread can't be stopped, so a cancelled or timed out invocation kills the whole worker, failing the other
+    invocations it was running; the worker is restarted on the next invocation.
+    """
+
+    def __init__(
+        self,
+        actions: dict[str, ActionSpec],
+        venv_pool: VenvPool,
+        threads: int = 4,
+        startup_timeout: float = 60.0,
+    ):
+        """
+        :param actions: The registry actions by name, see load_actions.
+        :param venv_pool: Cache of virtual environments, for the environment of the worker.
+        :param threads: Number of invocations the worker runs concurrently.
+        :param startup_timeout: Maximum number of seconds the worker takes to import the actions, once its
+            environment is installed.
+        """
+        self.actions = actions
+        self.venv_pool = venv_pool
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._process = None
+        self._socket = None
+        self._environment = ExitStack()
+        self._metrics = {"invocations": 0, "failures": 0, "worker_starts": 0, "worker_kills": 0}
+
+    def has_action(self, name: str) -> bool:
+        return name in self.actions
+
+    def invoke(
+        self,
+        name: str,
+        values: dict,
+        secrets: dict = None,
+        integrations: dict = None,
+        timeout: Optional[float] = None,
+    ) -> dict:
+        """
+        Call an action in the worker and wait for its result, see start and ActionInvocation.wait.
+        """
+        return self.start(name, values, secrets, integrations).wait(timeout)
+
+    def start(self, name: str, values: dict, secrets: dict = None, integrations: dict = None) -> ActionInvocation:
+        """
+        Start an action in the worker.
+
+        :param name: The name of the action.
+        :param values: The values of the inputs of the action by name. They are converted to the declared types,
+            values the action doesn't declare are left out.
+        :param secrets: The secrets of the job. Like generated code, the action receives them as its `secrets`
+            argument, if it takes one.
+        :param integrations: The integrations of the job, received as the `integrations` argument, if any.
+        :return: The invocation, to wait for its result or kill it.
+        :raises ActionArgumentError: If the values can't be bound to the inputs of the action.
+        :raises ActionWorkerUnavailable: If the worker can't be started.
+        """
+        arguments = self.actions[name].coerce_arguments(values)
+        invocation_id = next(self._ids)
+        pending = _PendingInvocation()
+        self._ensure_worker()
+        with self._lock:
+            worker_socket = self._socket
+            if worker_socket is None:
+                raise ActionWorkerUnavailable("The action worker was stopped while it was starting.")
+            self._pending[invocation_id] = pending
+            self._metrics["invocations"] += 1
+
+        data = json.dumps(
+            {
+                "id": invocation_id,
+                "action": name,
+                "arguments": arguments,
+                "secrets": secrets,
+                "integrations": integrations,
+            }
+        ).encode()
+        try:
+            with self._send_lock:
+                worker_socket.sendall(HEADER.pack(len(data)) + data)
+        except OSError as e:
+            with self._lock:
+                self._pending.pop(invocation_id, None)
+            raise ActionWorkerUnavailable(str(e))
+        return ActionInvocation(self, name, pending, worker_socket)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "pending": len(self._pending)}
+
+    def shutdown(self):
+        with self._lock:
+            self._stop_worker()
+
+    def _ensure_worker(self):
+        """
+        Start the worker unless it runs. The environment is installed and the worker imports the actions without
+        holding the lock, so the other invocations and the metrics aren't held up; starts are serialized.
+        """
+        with self._start_lock:
+            with self._lock:
+                if self._process and self._process.poll() is None:
+                    return
+                self._stop_worker()
+
+            environment = ExitStack()
+            try:
+                process, worker_socket, actions = self._start_worker(environment)
+            except BaseException:
+                environment.close()
+                raise
+
+            with self._lock:
+                self._process, self._socket, self._environment = process, worker_socket, environment
+            logger.info(f"Started trusted action worker (PID: {process.pid}) for actions {actions}")
+            threading.Thread(
+                target=self._read_responses, args=(worker_socket,), name="action-worker-reader", daemon=True
+            ).start()
+
+    def _start_worker(self, environment: ExitStack) -> tuple[subprocess.Popen, socket.socket, list[str]]:
+        requirements = sorted({r for action in self.actions.values() for r in action.requirements})
+        if requirements:
+            # the lease on the environment is held as long as the worker runs
+            venv_dir = environment.enter_context(self.venv_pool.acquire(requirements))
+            python_executable = os.path.join(venv_dir, "bin", "python")
+        else:
+            python_executable = sys.executable
+
+        worker_socket, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            process = subprocess.Popen(
+                [
+                    python_executable,
+                    WORKER_PATH,
+                    "--socket-fd",
+                    str(remote.fileno()),
+                    "--threads",
+                    str(self.threads),
+                ]
+                + [action.module_path for action in self.actions.values()],
+                pass_fds=[remote.fileno()],
+                start_new_session=True,
+            )
+        except BaseException:
+            worker_socket.close()
+            raise
+        finally:
+            remote.close()
+        with self._lock:
+            self._metrics["worker_starts"] += 1
+
+        # an action that hangs while it is imported must not hold up the invocations forever
+        worker_socket.settimeout(self.startup_timeout)
+        ready = self._read_envelope(worker_socket)
+        worker_socket.settimeout(None)
+        if not ready or not ready["ok"]:
+            error = ready["error"] if ready else (
+                f"The action worker exited or didn't start within {self.startup_timeout} seconds."
+            )
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+            worker_socket.close()
+            raise ActionWorkerUnavailable(error)
+        return process, worker_socket, ready["result"]
+
+    def _read_responses(self, worker_socket: socket.socket):
+        while envelope := self._read_envelope(worker_socket):
+            with self._lock:
+                pending = self._pending.pop(envelope.pop("id"), None)
+            if pending:
+                pending.envelope = envelope
+                pending.done.set()
+
+        # the worker exited: fail the invocations that were waiting for it
+        with self._lock:
+            if worker_socket is not self._socket:
+                return
+            logger.warning("The trusted action worker exited, it is restarted on the next invocation")
+            pending_invocations = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_invocations:
+            pending.done.set()
+
+    def _kill_worker(self, worker_socket: socket.socket):
+        with self._lock:
+            if worker_socket is not self._socket:
+                # already restarted
+                return
+            logger.warning(f"Killing the trusted action worker (PID: {self._process.pid})")
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self._metrics["worker_kills"] += 1
+            self._stop_worker()
+            pending_invocations = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_invocations:
+            pending.done.set()
+
+    def _stop_worker(self):
+        if self._socket:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+        if self._process:
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        self._environment.close()
+
+    @staticmethod
+    def _read_envelope(worker_socket: socket.socket) -> Optional[dict]:
+        try:
+            header = TrustedActionExecutor._recv_exact(worker_socket, HEADER.size)
+            (size,) = HEADER.unpack(header)
+            return json.loads(TrustedActionExecutor._recv_exact(worker_socket, size))
+        except (EOFError, OSError):
+            return None
+
+    @staticmethod
+    def _recv_exact(worker_socket: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = worker_socket.recv(min(size, 1024 * 1024))
+            if not chunk:
+                raise EOFError
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
@@ -0,0 +1,110 @@
+"""
+Worker process for TrustedActionExecutor.
+
+This file is executed as a script by the interpreter of the environment of the registry actions and must only
+depend on the standard library. It imports every action once at startup, then serves invocations from a socket:
+every request is a length-prefixed JSON envelope {"id", "action", "arguments", "secrets", "integrations"} and is
+answered, possibly out of order, with {"id", "ok": True, "result"} or {"id", "ok": False, "error", "traceback"}. Invocations run on a pool
+of threads, so a slow action (e.g. waiting for an SMTP server) doesn't hold up the others.
+"""
+
+import argparse
+import importlib.util
+import inspect
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+HEADER = struct.Struct(">Q")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def load_actions(module_paths: list[str]) -> dict:
+    actions = {}
+    for module_path in module_paths:
+        name = os.path.splitext(os.path.basename(module_path))[0]
+        # an action may import helpers from its own directory
+        sys.path.insert(0, os.path.dirname(module_path))
+        spec = importlib.util.spec_from_file_location(f"registry_action_{name}", module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        actions[name] = getattr(module, name)
+    return actions
+
+
+def _takes(action, name: str) -> bool:
+    parameters = inspect.signature(action).parameters.values()
+    return any(p.name == name or p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+
+def serve(sock: socket.socket, actions: dict, threads: int):
+    send_lock = threading.Lock()
+
+    def send(message: dict):
+        data = json.dumps(message, default=str).encode()
+        with send_lock:
+            sock.sendall(HEADER.pack(len(data)) + data)
+
+    def invoke(request: dict):
+        try:
+            action = actions[request["action"]]
+            kwargs = dict(request["arguments"])
+            # like generated code, the action receives the secrets and integrations as arguments of their own
+            for name in ("secrets", "integrations"):
+                if request.get(name) and _takes(action, name):
+                    kwargs[name] = request[name]
+            result = action(**kwargs)
+            send({"id": request["id"], "ok": True, "result": result})
+        except BaseException as e:
+            send(
+                {
+                    "id": request["id"],
+                    "ok": False,
+                    "error": f"{type(e).__name__}: {e}",
+                    "traceback": traceback.format_exc(),
+                }
+            )
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="action") as pool:
+        while True:
+            try:
+                (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+                request = json.loads(_recv_exact(sock, size))
+            except (EOFError, OSError):
+                # the executor went away
+                return
+            pool.submit(invoke, request)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket-fd", type=int, required=True)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("modules", nargs="+", help="Module files of the actions, each defining a function of its name.")
+    args = parser.parse_args()
+
+    control = socket.socket(fileno=args.socket_fd)
+    try:
+        loaded = load_actions(args.modules)
+    except BaseException:
+        message = json.dumps({"id": None, "ok": False, "error": traceback.format_exc()}).encode()
+        control.sendall(HEADER.pack(len(message)) + message)
+        sys.exit(1)
+    message = json.dumps({"id": None, "ok": True, "result": sorted(loaded)}).encode()
+    control.sendall(HEADER.pack(len(message)) + message)
+    serve(control, loaded, args.threads)
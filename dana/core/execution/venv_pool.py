@@ -0,0 +1,248 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from core.execution.wheelhouse import Wheelhouse, normalize_requirement
+
+logger = logging.getLogger(__name__)
+
+MARKER_FILE = "0dev-venv.json"
+
+
+class VenvPool:
+    """
+    A content-addressed cache of virtual environments.
+    Each environment is keyed by the hash of its normalized requirement set and the interpreter version, so jobs with
+    the same requirements reuse an existing environment instead of creating and installing a new one.
+    Environments in use are protected by shared file locks, which makes the pool safe for concurrent jobs and for
+    multiple agent processes sharing the same root directory.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_entries: int = 20,
+        max_disk_bytes: int = 5 * 1024**3,
+        python: str = "python3",
+        wheelhouse: Wheelhouse = None,
+    ):
+        """
+        :param root: Directory where the environments are stored.
+        :param max_entries: Maximum number of environments to keep.
+        :param max_disk_bytes: Maximum total size of the environments.
+        :param python: The interpreter used to create the environments.
+        :param wheelhouse: Optional local wheelhouse to install the requirements from.
+        """
+        self.root = root
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.python = python
+        self.wheelhouse = wheelhouse
+        os.makedirs(self.root, exist_ok=True)
+        self.python_version = subprocess.run(
+            [self.python, "-c", "import sys; print(sys.version)"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        self._lock = threading.Lock()
+        self._in_use = {}
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "build_failures": 0,
+            "build_seconds": 0.0,
+        }
+
+    def key_for(self, requirements: list[str]) -> str:
+        """
+        Compute the cache key of a requirement set.
+
+        :param requirements: The requirements of the job.
+        :return: The hex digest identifying the environment.
+        """
+        normalized = sorted({normalize_requirement(r) for r in requirements if r.strip()})
+        payload = json.dumps({"python": self.python_version, "requirements": normalized})
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    @contextmanager
+    def acquire(self, requirements: list[str]):
+        """
+        Get an environment with the given requirements installed, creating it if needed.
+        The environment can't be evicted until the context is exited.
+
+        :param requirements: The non-standard requirements of the job.
+        :return: A context manager yielding the path of the environment.
+        """
+        key = self.key_for(requirements)
+        venv_dir = os.path.join(self.root, key)
+        with self._lock:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+
+        lock_file = open(self.lock_path(venv_dir), "w")
+        try:
+            # a shared lock is kept while the environment is in use so other processes can't evict it
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            if self._is_valid(venv_dir, key):
+                self._count("hits")
+                logger.info(f"Reusing virtual environment {venv_dir}")
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # another job may have built the environment while we were waiting for the exclusive lock
+                if self._is_valid(venv_dir, key):
+                    self._count("hits")
+                else:
+                    self._count("misses")
+                    self._build(venv_dir, key, requirements)
+                fcntl.flock(lock_file, fcntl.LOCK_SH)
+            os.utime(os.path.join(venv_dir, MARKER_FILE))
+            yield venv_dir
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+            self.evict()
+
+    def lock_path(self, venv_dir: str) -> str:
+        """
+        Get the lock file of an environment. Holding a shared lock on it prevents the eviction of the environment.
+
+        :param venv_dir: Path of the environment.
+        :return: Path of the lock file.
+        """
+        return os.path.join(self.root, f"{os.path.basename(venv_dir)}.lock")
+
+    def install(self, venv_dir: str, requirements: list[str]):
+        """
+        Install the requirements into a freshly created environment.
+
+        :param venv_dir: Path of the environment.
+        :param requirements: The requirements to install.
+        """
+        if self.wheelhouse:
+            self.wheelhouse.install(venv_dir, requirements)
+            return
+        pip_executable = os.path.join(venv_dir, "bin", "pip")
+        subprocess.run([pip_executable, "install"] + requirements, check=True)
+
+    def _build(self, venv_dir: str, key: str, requirements: list[str]):
+        started_at = time.monotonic()
+        shutil.rmtree(venv_dir, ignore_errors=True)
+        try:
+            subprocess.run([self.python, "-m", "venv", venv_dir], check=True)
+            logger.info(f"Created virtual environment at: {venv_dir}")
+            if requirements:
+                logger.info(f"Installing requirements: {requirements}")
+                self.install(venv_dir, requirements)
+        except Exception:
+            self._count("build_failures")
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            raise
+
+        # the marker is written last, an environment without it is incomplete and gets rebuilt
+        with open(os.path.join(venv_dir, MARKER_FILE), "w") as marker:
+            json.dump(
+                {
+                    "key": key,
+                    "python": self.python_version,
+                    "requirements": requirements,
+                    "size_bytes": self._disk_usage(venv_dir),
+                    "created_at": time.time(),
+                },
+                marker,
+            )
+        with self._lock:
+            self._metrics["build_seconds"] += time.monotonic() - started_at
+
+    def _is_valid(self, venv_dir: str, key: str) -> bool:
+        marker = self._read_marker(venv_dir)
+        python_executable = os.path.join(venv_dir, "bin", "python")
+        return (
+            marker is not None
+            and marker.get("key") == key
+            and marker.get("python") == self.python_version
+            and os.access(python_executable, os.X_OK)
+        )
+
+    def evict(self):
+        """
+        Evict the least recently used environments until the pool fits its entry and disk limits.
+        Environments in use by this or any other process are skipped.
+        """
+        entries = []
+        for key in os.listdir(self.root):
+            marker = self._read_marker(os.path.join(self.root, key))
+            if marker:
+                marker_path = os.path.join(self.root, key, MARKER_FILE)
+                entries.append((os.path.getmtime(marker_path), key, marker.get("size_bytes", 0)))
+
+        entries.sort()
+        total_bytes = sum(size for _, _, size in entries)
+        count = len(entries)
+        for _, key, size in entries:
+            if count <= self.max_entries and total_bytes <= self.max_disk_bytes:
+                break
+            if self._remove(key):
+                count -= 1
+                total_bytes -= size
+
+    def _remove(self, key: str) -> bool:
+        with self._lock:
+            if key in self._in_use:
+                return False
+        with open(self.lock_path(key), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._count("evictions")
+        logger.info(f"Evicted virtual environment {key}")
+        return True
+
+    def metrics(self) -> dict:
+        """
+        Return the hit/miss counters and the current size of the pool.
+        """
+        entries = [key for key in os.listdir(self.root) if self._read_marker(os.path.join(self.root, key))]
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["in_use"] = sum(self._in_use.values())
+        metrics["entries"] = len(entries)
+        metrics["disk_bytes"] = sum(
+            self._read_marker(os.path.join(self.root, key)).get("size_bytes", 0) for key in entries
+        )
+        return metrics
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    @staticmethod
+    def _read_marker(venv_dir: str):
+        try:
+            with open(os.path.join(venv_dir, MARKER_FILE), "r") as marker:
+                return json.load(marker)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _disk_usage(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                if not os.path.islink(file_path):
+                    total += os.path.getsize(file_path)
+        return total
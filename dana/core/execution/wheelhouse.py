@@ -0,0 +1,196 @@
+import argparse
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_requirement(requirement: str) -> str:
+    """
+    Normalize a requirement so that equivalent spellings map to the same environment,
+    e.g. 'Beautifulsoup4 >= 4.0' and 'beautifulsoup4>=4.0'.
+    """
+    requirement = re.sub(r"\s+", "", requirement)
+    match = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$", requirement)
+    if not match:
+        return requirement
+    name, rest = match.groups()
+    return re.sub(r"[-_.]+", "-", name).lower() + rest
+
+
+class WheelhouseNotSeeded(Exception):
+    pass
+
+
+class Wheelhouse:
+    """
+    A local directory of wheels that job environments are installed from.
+    Packages are downloaded and built once. Every requirement set gets a lockfile with the exact versions it
+    resolved to, and from then on installs use only the local wheels (`--no-index --find-links`), which makes
+    them fast, deterministic and possible without network access.
+    """
+
+    def __init__(self, root: str, offline: bool = False, python: str = "python3"):
+        """
+        :param root: Directory where the wheels and lockfiles are stored.
+        :param offline: Never reach the package index. Requirement sets must be seeded in advance.
+        :param python: The interpreter the wheels are built for.
+        """
+        self.root = root
+        self.offline = offline
+        self.python = python
+        self.wheels_dir = os.path.join(root, "wheels")
+        self.locks_dir = os.path.join(root, "locks")
+        os.makedirs(self.wheels_dir, exist_ok=True)
+        os.makedirs(self.locks_dir, exist_ok=True)
+        self.python_version = subprocess.run(
+            [self.python, "-c", "import sys; print(sys.version)"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    def lockfile_path(self, requirements: list[str]) -> str:
+        """
+        Get the path of the lockfile of a requirement set.
+
+        :param requirements: The requirements to resolve.
+        :return: The path of the lockfile, which may not exist yet.
+        """
+        normalized = sorted({normalize_requirement(r) for r in requirements if r.strip()})
+        payload = json.dumps({"python": self.python_version, "requirements": normalized})
+        return os.path.join(self.locks_dir, f"{hashlib.sha256(payload.encode()).hexdigest()[:32]}.txt")
+
+    def ensure(self, requirements: list[str]) -> str:
+        """
+        Make sure the wheels of a requirement set are available locally and return its lockfile.
+
+        :param requirements: The requirements to resolve.
+        :return: The path of the lockfile.
+        :raises WheelhouseNotSeeded: If the requirement set is unknown and the wheelhouse is offline.
+        """
+        lockfile = self.lockfile_path(requirements)
+        if os.path.exists(lockfile):
+            return lockfile
+
+        if self.offline:
+            raise WheelhouseNotSeeded(f"The wheelhouse has no lockfile for the requirements: {requirements}")
+
+        with open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # another process may have seeded the same requirements while we were waiting
+            if os.path.exists(lockfile):
+                return lockfile
+
+            logger.info(f"Downloading wheels for requirements: {requirements}")
+            subprocess.run(
+                [self.python, "-m", "pip", "wheel", "--wheel-dir", self.wheels_dir, "--find-links", self.wheels_dir]
+                + requirements,
+                check=True,
+            )
+            pinned = self._resolve(requirements)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.locks_dir)
+            with os.fdopen(fd, "w") as tmp_file:
+                tmp_file.write("\n".join(pinned) + "\n")
+            os.replace(tmp_path, lockfile)
+
+        logger.info(f"Locked requirements {requirements} to {pinned}")
+        return lockfile
+
+    def install(self, venv_dir: str, requirements: list[str]):
+        """
+        Install a requirement set into a virtual environment from the local wheels only.
+
+        :param venv_dir: Path of the environment.
+        :param requirements: The requirements to install.
+        """
+        lockfile = self.ensure(requirements)
+        pip_executable = os.path.join(venv_dir, "bin", "pip")
+        subprocess.run(
+            [pip_executable, "install", "--no-index", "--no-deps", "--find-links", self.wheels_dir, "-r", lockfile],
+            check=True,
+        )
+
+    def seed(self, requirement_sets: list[list[str]]):
+        """
+        Download and lock several requirement sets in advance, e.g. before moving to an air-gapped executor.
+
+        :param requirement_sets: The requirement sets to seed.
+        """
+        for requirements in requirement_sets:
+            self.ensure(requirements)
+
+    def _resolve(self, requirements: list[str]) -> list[str]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "report.json")
+            subprocess.run(
+                [
+                    self.python,
+                    "-m",
+                    "pip",
+                    "install",
+                    "--dry-run",
+                    "--ignore-installed",
+                    "--quiet",
+                    "--no-index",
+                    "--find-links",
+                    self.wheels_dir,
+                    "--report",
+                    report_path,
+                ]
+                + requirements,
+                check=True,
+            )
+            with open(report_path, "r") as report_file:
+                report = json.load(report_file)
+        return sorted(
+            f"{item['metadata']['name']}=={item['metadata']['version']}" for item in report["install"]
+        )
+
+
+def registry_requirement_sets(registry_dir: str) -> list[list[str]]:
+    """
+    Collect the third-party requirements of every action in the registry.
+
+    :param registry_dir: The directory of the registry actions.
+    :return: One requirement set per action that needs third-party packages.
+    """
+    from core.execution.local_code_executor import is_standard_library
+
+    requirement_sets = []
+    for requirements_file in sorted(glob.glob(os.path.join(registry_dir, "*", "requirements.txt"))):
+        with open(requirements_file, "r") as f:
+            requirements = [
+                line.strip()
+                for line in f
+                if line.strip() and not line.startswith("#") and not is_standard_library(line.strip())
+            ]
+        if requirements:
+            requirement_sets.append(requirements)
+    return requirement_sets
+
+
+if __name__ == "__main__":
+    # Pre-seed the wheelhouse, e.g.: python -m core.execution.wheelhouse --registry registry/actions -r extra.txt
+    parser = argparse.ArgumentParser(description="Seed the wheelhouse used by the job environments.")
+    parser.add_argument("--root", default=os.getenv("WHEELHOUSE_ROOT", os.path.join(tempfile.gettempdir(), "0dev", "wheelhouse")))
+    parser.add_argument("--registry", help="Seed the requirements of every action in this registry directory.")
+    parser.add_argument("-r", "--requirements", action="append", default=[], help="A requirements file to seed as one set.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    requirement_sets = registry_requirement_sets(args.registry) if args.registry else []
+    for requirements_file in args.requirements:
+        with open(requirements_file, "r") as f:
+            requirement_sets.append([line.strip() for line in f if line.strip() and not line.startswith("#")])
+
+    Wheelhouse(args.root).seed(requirement_sets)
+    logger.info(f"Seeded {len(requirement_sets)} requirement set(s) into {args.root}")
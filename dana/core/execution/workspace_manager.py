@@ -0,0 +1,206 @@
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspaceManager:
+    """
+    Allocates the working directories of the jobs under a common root and removes them in the background.
+    Workspaces of completed jobs are removed as soon as possible; workspaces of failed jobs are kept for a retention
+    window so they can be inspected. The retained workspaces are evicted least recently used first whenever the root
+    exceeds its disk quota. Workspaces in use are protected by exclusive file locks, so several agent processes can
+    share the same root.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        failed_retention_seconds: float = 24 * 3600,
+        max_disk_bytes: int = 1024**3,
+        gc_interval: float = 60,
+    ):
+        """
+        :param root: Directory where the workspaces are created.
+        :param failed_retention_seconds: How long the workspace of a failed job is kept.
+        :param max_disk_bytes: Maximum total size of the workspaces. Only retained workspaces are evicted to meet it.
+        :param gc_interval: Seconds between two garbage collection runs.
+        """
+        self.root = root
+        self.failed_retention_seconds = failed_retention_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.gc_interval = gc_interval
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._active = {}
+        self._metrics = {
+            "allocated": 0,
+            "removed": 0,
+            "evictions": 0,
+            "retained": 0,
+            "disk_bytes": 0,
+            "gc_seconds": 0.0,
+        }
+        self._wakeup = threading.Event()
+        self._collector = threading.Thread(target=self._collect_periodically, name="workspace-gc", daemon=True)
+        self._collector.start()
+
+    def allocate(self, job_id: str) -> str:
+        """
+        Create the workspace of a job.
+
+        :param job_id: The ID of the job.
+        :return: The path of the new, empty workspace.
+        """
+        name = f"job-{job_id}"
+        lock_file = open(self._lock_path(name), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        path = os.path.join(self.root, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        with self._lock:
+            self._active[name] = lock_file
+            self._metrics["allocated"] += 1
+        return path
+
+    def release(self, path: str, failed: bool):
+        """
+        Hand a workspace back once its job has finished. It is removed in the background, after the retention
+        window if the job failed.
+
+        :param path: The path returned by `allocate`.
+        :param failed: Whether the job failed.
+        """
+        name = os.path.basename(path)
+        if failed:
+            with open(self._failed_marker_path(name), "w") as marker:
+                marker.write(str(time.time()))
+        # the workspace may have been written to until now, which makes it the most recently used one
+        os.utime(path)
+        with self._lock:
+            lock_file = self._active.pop(name, None)
+        if lock_file:
+            lock_file.close()
+        if not failed:
+            self._wakeup.set()
+
+    def collect(self):
+        """
+        Remove the workspaces that aren't needed anymore and evict retained workspaces over the disk quota.
+        Workspaces in use by this or any other process are skipped.
+        """
+        started = time.monotonic()
+        now = time.time()
+        retained = []
+        disk_bytes = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            size = self._disk_usage(path)
+            if self._is_active(name):
+                disk_bytes += size
+                continue
+            failed_at = self._failed_at(name)
+            if failed_at is not None and now - failed_at < self.failed_retention_seconds:
+                retained.append((os.path.getmtime(path), name, size))
+                disk_bytes += size
+            elif self._remove(name):
+                self._count("removed")
+
+        retained.sort()
+        evicted = 0
+        for _, name, size in retained:
+            if disk_bytes <= self.max_disk_bytes:
+                break
+            if self._remove(name):
+                self._count("evictions")
+                logger.info(f"Evicted retained workspace {name} to stay within the disk quota")
+                disk_bytes -= size
+                evicted += 1
+
+        with self._lock:
+            self._metrics["retained"] = len(retained) - evicted
+            self._metrics["disk_bytes"] = disk_bytes
+            self._metrics["gc_seconds"] = round(time.monotonic() - started, 3)
+
+    def metrics(self) -> dict:
+        """
+        Return the workspace counters and the disk usage measured by the last garbage collection.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["active"] = len(self._active)
+        return metrics
+
+    def _collect_periodically(self):
+        while True:
+            self._wakeup.wait(self.gc_interval)
+            self._wakeup.clear()
+            try:
+                self.collect()
+            except Exception:
+                logger.error(f"Workspace garbage collection failed: {traceback.format_exc()}")
+
+    def _is_active(self, name: str) -> bool:
+        with self._lock:
+            if name in self._active:
+                return True
+        if not os.path.exists(self._lock_path(name)):
+            return False
+        with open(self._lock_path(name), "r") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+    def _remove(self, name: str) -> bool:
+        with open(self._lock_path(name), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            for path in (self._failed_marker_path(name), self._lock_path(name)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def _failed_at(self, name: str):
+        try:
+            with open(self._failed_marker_path(name), "r") as marker:
+                return float(marker.read())
+        except (OSError, ValueError):
+            return None
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _lock_path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.lock")
+
+    def _failed_marker_path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.failed")
+
+    @staticmethod
+    def _disk_usage(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                if not os.path.islink(file_path):
+                    try:
+                        total += os.path.getsize(file_path)
+                    except OSError:
+                        pass
+        return total
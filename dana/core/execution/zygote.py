@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zygote_server.py")
+MAX_MESSAGE_SIZE = 64 * 1024
+# Modules every zygote imports in advance unless configured otherwise
+DEFAULT_PRELOAD = ["json", "datetime", "decimal", "csv", "email", "smtplib", "urllib.request"]
+
+
+class ZygoteUnavailable(Exception):
+    pass
+
+
+class ZygoteChild:
+    """
+    A job process forked by a zygote, in a session and process group of its own.
+    It behaves like a minimal subprocess.Popen.
+    """
+
+    def __init__(self, job_socket: socket.socket, pid: int, args: list[str]):
+        self.job_socket = job_socket
+        self.pid = pid
+        self.args = args
+        self.returncode = None
+        self.rusage = {}
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for the job to exit.
+
+        :param timeout: Maximum number of seconds to wait.
+        :return: The exit code of the job, negative if it was killed by a signal.
+        :raises subprocess.TimeoutExpired: If the job is still running after the timeout.
+        """
+        if self.returncode is not None:
+            return self.returncode
+        self.job_socket.settimeout(timeout)
+        try:
+            data = self.job_socket.recv(MAX_MESSAGE_SIZE)
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        finally:
+            self.job_socket.settimeout(None)
+
+        self._finish(json.loads(data) if data else {"exit_code": -signal.SIGKILL, "rusage": {}})
+        return self.returncode
+
+    def _finish(self, message: dict):
+        self.returncode = message["exit_code"]
+        self.rusage = message["rusage"]
+        self.job_socket.close()
+
+    def kill(self):
+        """
+        Kill the process group of the job, i.e. the job and every process it started that is still running.
+        """
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # not a group leader (yet): at least kill the job itself
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        except PermissionError:
+            pass
+
+
+class Zygote:
+    """
+    A long-lived process in a warm virtual environment that forks a fresh child for every job.
+    The zygote pre-imports the common libraries once, so the jobs don't pay for interpreter startup and imports.
+    """
+
+    def __init__(self, venv_dir: str, lock_file: str, preload: list[str], idle_timeout: float):
+        """
+        :param venv_dir: The virtual environment the zygote runs in.
+        :param lock_file: The lock file of the environment, held by the zygote so the environment isn't evicted.
+        :param preload: Modules to import in advance.
+        :param idle_timeout: Seconds without jobs after which the zygote exits.
+        """
+        self.venv_dir = venv_dir
+        self._lock = threading.Lock()
+        self.control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.process = subprocess.Popen(
+            [
+                os.path.join(venv_dir, "bin", "python"),
+                SERVER_PATH,
+                "--control-fd",
+                str(remote.fileno()),
+                "--lock-file",
+                lock_file,
+                "--preload",
+                ",".join(preload),
+                "--idle-timeout",
+                str(idle_timeout),
+            ],
+            pass_fds=[remote.fileno()],
+        )
+        remote.close()
+        logger.info(f"Started zygote (PID: {self.process.pid}) for {venv_dir} preloading {preload}")
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def spawn(
+        self,
+        script: str,
+        cwd: str,
+        args: list[str] = None,
+        env: dict = None,
+        fds: list[int] = None,
+        fd_targets: list[int] = None,
+        rlimits: dict = None,
+    ) -> ZygoteChild:
+        """
+        Fork a child that runs a script.
+
+        :param script: Path of the script to run.
+        :param cwd: Working directory of the child.
+        :param args: Command line arguments of the script.
+        :param env: Environment variables to add for the child.
+        :param fds: File descriptors to pass to the child.
+        :param fd_targets: The descriptor numbers `fds` are mapped to in the child, e.g. 0 for stdin.
+        :param rlimits: Resource limits to apply to the child, see ResourceLimits.rlimits.
+        :return: The forked child.
+        :raises ZygoteUnavailable: If the zygote is not running anymore.
+        """
+        request = {
+            "script": script,
+            "cwd": cwd,
+            "args": args or [],
+            "env": env or {},
+            "fd_targets": fd_targets or [],
+            "rlimits": rlimits or {},
+        }
+        job_socket, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            with self._lock:
+                socket.send_fds(self.control, [json.dumps(request).encode()], [remote.fileno()] + (fds or []))
+        except OSError as e:
+            job_socket.close()
+            raise ZygoteUnavailable(str(e))
+        finally:
+            remote.close()
+
+        data = job_socket.recv(MAX_MESSAGE_SIZE)
+        if not data:
+            # the zygote exited before forking, e.g. because it reached its idle timeout
+            job_socket.close()
+            raise ZygoteUnavailable("The zygote exited before starting the job.")
+        message = json.loads(data)
+        child = ZygoteChild(job_socket, message["pid"], [script] + (args or []))
+        if "exit_code" in message:
+            # the child exited before it could report itself
+            child._finish(message)
+        return child
+
+    def stop(self):
+        self.control.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class ZygotePool:
+    """
+    Keeps one zygote per warm virtual environment and forks the jobs from them.
+    """
+
+    def __init__(self, preload: list[str] = None, idle_timeout: float = 300):
+        """
+        :param preload: Common modules every zygote imports in advance.
+        :param idle_timeout: Seconds without jobs after which a zygote exits and releases its environment.
+        """
+        self.preload = preload or []
+        self.idle_timeout = idle_timeout
+        self._zygotes = {}
+        self._lock = threading.Lock()
+
+    def spawn(
+        self,
+        venv_dir: str,
+        lock_file: str,
+        requirements: list[str],
+        script: str,
+        cwd: str,
+        **kwargs,
+    ) -> ZygoteChild:
+        """
+        Fork a job from the zygote of an environment, starting the zygote if needed.
+
+        :param venv_dir: The virtual environment of the job.
+        :param lock_file: The lock file of the environment.
+        :param requirements: The requirements installed in the environment, imported in advance when possible.
+        :param script: Path of the script to run.
+        :param cwd: Working directory of the job.
+        :param kwargs: Additional arguments of Zygote.spawn.
+        :return: The forked child.
+        """
+        for attempt in range(2):
+            zygote = self._get(venv_dir, lock_file, requirements, restart=attempt > 0)
+            try:
+                return zygote.spawn(script, cwd, **kwargs)
+            except ZygoteUnavailable as e:
+                logger.warning(f"Zygote for {venv_dir} is unavailable ({e}), restarting it")
+        raise ZygoteUnavailable(f"Could not start a zygote for {venv_dir}")
+
+    def shutdown(self):
+        with self._lock:
+            for zygote in self._zygotes.values():
+                zygote.stop()
+            self._zygotes.clear()
+
+    def _get(self, venv_dir: str, lock_file: str, requirements: list[str], restart: bool) -> Zygote:
+        with self._lock:
+            zygote = self._zygotes.get(venv_dir)
+            if zygote and (restart or not zygote.is_alive()):
+                zygote.stop()
+                zygote = None
+            if not zygote:
+                zygote = Zygote(
+                    venv_dir,
+                    lock_file,
+                    preload=self.preload + [self._import_name(r) for r in requirements],
+                    idle_timeout=self.idle_timeout,
+                )
+                self._zygotes[venv_dir] = zygote
+            return zygote
+
+    @staticmethod
+    def _import_name(requirement: str) -> str:
+        # best effort: the distribution name is often, but not always, the name of the top-level module
+        return re.split(r"[<>=!~\[; ]", requirement, maxsplit=1)[0].replace("-", "_").lower()
+
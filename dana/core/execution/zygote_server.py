@@ -0,0 +1,172 @@
+"""
+Zygote process for LocalCodeExecutor.
+
+This file is executed as a script by the interpreter of a warm virtual environment and must only depend on the
+standard library. It pre-imports the common libraries once, then waits for job requests on a control socket.
+Every request carries a job socket (and optionally file descriptors for the stdio of the job) as ancillary data.
+The zygote forks a child per request; the child reports its pid on the job socket once it leads a process group of
+its own, runs a single script and exits, and the zygote then reports the exit status and resource usage of the child.
+"""
+
+import argparse
+import fcntl
+import importlib
+import json
+import os
+import resource
+import runpy
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+
+MAX_MESSAGE_SIZE = 64 * 1024
+MAX_FDS = 16
+FIRST_FREE_FD = 100
+
+
+def _send(sock: socket.socket, message: dict):
+    try:
+        sock.send(json.dumps(message).encode())
+    except OSError:
+        # the executor stopped waiting for this job
+        pass
+
+
+def _preload(modules: list[str]):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            # a module that can't be imported here will fail again, with a proper traceback, in the job
+            pass
+
+
+def _run_child(request: dict, fds: list[int], control: socket.socket, job_sockets: dict):
+    """Runs in the forked child. Never returns."""
+    exit_code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        # a process group of its own lets the executor kill the job together with any process it started; the pid is
+        # only reported once the group exists, so that killing it can't miss the job
+        os.setsid()
+        _send(socket.socket(fileno=os.dup(fds[0])), {"pid": os.getpid()})
+        control.close()
+        for job_socket in job_sockets.values():
+            job_socket.close()
+
+        # the first descriptor is the job socket, the rest are mapped to the requested targets (e.g. stdin/stdout).
+        # They are moved out of the way first so that mapping one descriptor can't clobber another one.
+        os.close(fds[0])
+        moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, FIRST_FREE_FD) for fd in fds[1:]]
+        for fd in fds[1:]:
+            os.close(fd)
+        for fd, target in zip(moved, request.get("fd_targets", [])):
+            os.dup2(fd, target)
+            os.close(fd)
+        # the output of the job may be streamed while it runs, so it shouldn't sit in a block buffer
+        for stream, fd in ((sys.stdout, 1), (sys.stderr, 2)):
+            if fd in request.get("fd_targets", []):
+                stream.reconfigure(line_buffering=True)
+
+        for name, (soft, hard) in request.get("rlimits", {}).items():
+            resource.setrlimit(getattr(resource, name), (soft, hard))
+
+        os.chdir(request["cwd"])
+        os.environ.update(request.get("env", {}))
+        sys.argv = [request["script"]] + request.get("args", [])
+        sys.path[0] = os.path.dirname(os.path.abspath(request["script"]))
+        runpy.run_path(request["script"], run_name="__main__")
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def serve(control: socket.socket, idle_timeout: float):
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    # a handler (rather than SIG_DFL) is needed for the wakeup fd to be written on SIGCHLD
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    job_sockets = {}
+    last_activity = time.monotonic()
+    while True:
+        timeout = None if job_sockets else max(0.0, idle_timeout - (time.monotonic() - last_activity))
+        readable, _, _ = select.select([control, wakeup_r], [], [], timeout)
+        if not readable and not job_sockets:
+            return
+
+        if wakeup_r in readable:
+            os.read(wakeup_r, 1024)
+            while job_sockets:
+                try:
+                    pid, status, rusage = os.wait4(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                job_socket = job_sockets.pop(pid, None)
+                if job_socket:
+                    _send(
+                        job_socket,
+                        {
+                            "pid": pid,
+                            "exit_code": os.waitstatus_to_exitcode(status),
+                            "rusage": {
+                                "utime": rusage.ru_utime,
+                                "stime": rusage.ru_stime,
+                                "maxrss_kb": rusage.ru_maxrss,
+                            },
+                        },
+                    )
+                    job_socket.close()
+            last_activity = time.monotonic()
+
+        if control in readable:
+            try:
+                data, fds, _, _ = socket.recv_fds(control, MAX_MESSAGE_SIZE, MAX_FDS)
+            except OSError:
+                return
+            if not data:
+                # the executor went away
+                return
+            last_activity = time.monotonic()
+            request = json.loads(data)
+
+            pid = os.fork()
+            if pid == 0:
+                _run_child(request, fds, control, job_sockets)
+
+            job_socket = socket.socket(fileno=fds[0])
+            for fd in fds[1:]:
+                os.close(fd)
+            job_sockets[pid] = job_socket
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--control-fd", type=int, required=True)
+    parser.add_argument("--lock-file", help="Held with a shared lock so the environment isn't evicted while in use.")
+    parser.add_argument("--preload", default="", help="Comma separated list of modules to import in advance.")
+    parser.add_argument("--idle-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    lock = None
+    if args.lock_file:
+        lock = open(args.lock_file, "w")
+        fcntl.flock(lock, fcntl.LOCK_SH)
+
+    _preload([module for module in args.preload.split(",") if module])
+    serve(socket.socket(fileno=args.control_fd), args.idle_timeout)
@@ -0,0 +1,138 @@
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Responses of overloaded or restarting servers worth trying again
+RETRY_STATUSES = (502, 503, 504)
+
+
+class HTTPClient:
+    """
+    Pooled HTTP client shared by the components of a process that call the Dana API or the agents.
+    Connections are kept alive and reused, every request has a connect and a read timeout, and failed connections
+    and idempotent requests (GET, PUT, DELETE...) are retried with exponential backoff. POST requests are only
+    retried when the connection could not be established, so they are never sent twice.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30,
+        retries: int = 3,
+        backoff_factor: float = 0.3,
+    ):
+        """
+        :param pool_connections: Number of hosts a connection pool is kept for.
+        :param pool_maxsize: Maximum number of connections kept alive per host.
+        :param connect_timeout: Seconds to wait for a connection.
+        :param read_timeout: Seconds to wait for the response once connected.
+        :param retries: Maximum number of retries of a request.
+        :param backoff_factor: The n-th retry waits backoff_factor * 2^(n-1) seconds.
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                raise_on_status=False,
+            ),
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "retries": 0, "errors": 0}
+
+    def request(
+        self, method: str, url: str, auth_token: Optional[str] = None, **kwargs
+    ) -> requests.Response:
+        """
+        Send a request through the pool.
+
+        :param method: The HTTP method.
+        :param url: The URL.
+        :param auth_token: Token sent as a bearer Authorization header, if any.
+        :param kwargs: Passed to requests, e.g. json, params, headers, files, stream or timeout.
+        :return: The response. Its status is not checked.
+        """
+        if auth_token:
+            kwargs["headers"] = {"Authorization": f"Bearer {auth_token}", **(kwargs.get("headers") or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self._session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._metrics["requests"] += 1
+                self._metrics["errors"] += 1
+            raise
+        retries = getattr(response.raw, "retries", None)
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["retries"] += len(retries.history) if retries else 0
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def metrics(self) -> dict:
+        """
+        Request counters and the state of the connection pool of every host.
+        """
+        pools = []
+        for key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append(
+                {
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    # connections opened since the pool was created, vs. requests sent over them
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": sum(1 for connection in list(pool.pool.queue) if connection),
+                    "max_connections": self.pool_maxsize,
+                }
+            )
+        with self._lock:
+            return {**self._metrics, "pools": pools}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    Return the HTTP client of the process, created on first use with the settings of the environment.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient(
+                pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 20)),
+                connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 3.05)),
+                read_timeout=float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", 30)),
+                retries=int(os.getenv("HTTP_MAX_RETRIES", 3)),
+                backoff_factor=float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", 0.3)),
+            )
+        return _client
@@ -58,6 +58,7 @@ class AnswerHandler:
         - Policies: {context.get('policies', 'No policies available')}
         - Secrets shared with the agent: {secrets if secrets else 'No secrets available'}
         - Integrations shared with the agent: {integrations if integrations else 'No integrations available'}
+        - Summary of the Earlier Interactions: {context.get('earlier_history', 'No earlier history')}
         - Interaction History: {context.get('history', 'No history available')}
         """
         user_content = (
@@ -1,27 +1,85 @@
+import copy
 import uuid
 import json
+from core.http_client import HTTPClient, get_http_client
+from core.interaction_manager.interaction_writer import InteractionWriter
+from core.interaction_manager.session_cache import SessionCache
+from core.interaction_manager.session_summarizer import SessionSummarizer, is_trivial
 from core.llms.base_llm import BaseLLM
-import requests
 from logging import getLogger
 
 logger = getLogger(__name__)
 
+# Upper bound the summarizer is asked to keep a chunk or session summary under, so the context stays bounded
+SUMMARY_MAX_WORDS = 150
+
 
 class InteractionManager:
     """
     Service for managing interactions between agents and users.
     """
 
-    def __init__(self, llm_client: BaseLLM, auth_token: str, dana_url: str):
+    def __init__(
+        self,
+        llm_client: BaseLLM,
+        auth_token: str,
+        dana_url: str,
+        summary_every_n: int = 5,
+        summary_max_delay: float = 10.0,
+        session_cache: SessionCache = None,
+        write_batch_size: int = 1,
+        write_max_delay: float = 0.5,
+        write_max_pending: int = 10000,
+        http_client: HTTPClient = None,
+        memory_verbatim: int = 10,
+        memory_chunk_size: int = 10,
+        memory_max_chunks: int = 5,
+        memory_relevant_k: int = 0,
+    ):
         """
         :param llm_client: An LLM client instance for generating summaries.
         :param auth_token: The authentication token for the API.
         :param dana_url: The URL of the Dana API.
+        :param summary_every_n: The summarized memory is updated once per this many interactions...
+        :param summary_max_delay: ...or once an interaction has waited this many seconds for it.
+        :param session_cache: Optional write-through cache of the history and memory of the active sessions.
+            Its history limit should be at least memory_verbatim + memory_chunk_size.
+        :param write_batch_size: Interactions are buffered and saved in batches of up to this many, 1 saves every
+            interaction as it comes.
+        :param write_max_delay: Maximum number of seconds a buffered interaction waits before it is saved.
+        :param write_max_pending: Maximum number of buffered interactions kept while they can't be saved.
+        :param http_client: The HTTP client for the API, the one of the process by default.
+        :param memory_verbatim: Number of latest interactions always kept verbatim in the context.
+        :param memory_chunk_size: Number of older interactions summarized together as a chunk.
+        :param memory_max_chunks: Number of chunk summaries kept before the oldest are folded into the session
+            summary.
+        :param memory_relevant_k: Number of older interactions retrieved by similarity to the input, 0 to disable.
         """
         super().__init__()
         self.llm_client = llm_client
         self.auth_token = auth_token
         self.dana_url = dana_url
+        self.http = http_client or get_http_client()
+        self.session_cache = session_cache
+        self.memory_verbatim = memory_verbatim
+        self.memory_chunk_size = memory_chunk_size
+        self.memory_max_chunks = memory_max_chunks
+        self.memory_relevant_k = memory_relevant_k
+        self.summarizer = SessionSummarizer(
+            self._update_memory,
+            every_n=summary_every_n,
+            max_delay=summary_max_delay,
+        )
+        self.writer = (
+            InteractionWriter(
+                self._write_interactions,
+                max_batch=write_batch_size,
+                max_delay=write_max_delay,
+                max_pending=write_max_pending,
+            )
+            if write_batch_size > 1
+            else None
+        )
 
     @staticmethod
     def start_session() -> str:
@@ -36,7 +94,8 @@ class InteractionManager:
         self, account_id: str, agent_id: str, session_id: str, interaction: dict
     ):
         """
-        Save a new interaction and update the moving summary.
+        Save a new interaction. With a write buffer, the interaction is saved with the next batch of its session,
+        see flush. The moving summary is updated in the background, see SessionSummarizer.
 
         :param account_id: The ID of the account the agent belongs to.
         :param agent_id: The id of the agent.
@@ -46,30 +105,56 @@ class InteractionManager:
 
         logger.info(f"Saving interaction: {interaction}")
 
-        # todo: Use a singleton to keep the updated summary
-        # 1. get the current summary
-        response = requests.get(
-            f"{self.dana_url}/interaction_history/session/{session_id}/summary",
-            headers={"Authorization": f"Bearer {self.auth_token}"},
-        )
-        response.raise_for_status()
-        current_summary = response.json()["summary"]
-
-        # 2. generate a new summary
-        updated_summary = self._update_summary(current_summary, interaction)
+        if self.writer:
+            self.writer.add(account_id, agent_id, session_id, interaction)
+            return
 
-        # 3. save the new interaction history
-        response = requests.post(
+        response = self.http.post(
             f"{self.dana_url}/interaction_history/session/{session_id}/interaction",
-            headers={"Authorization": f"Bearer {self.auth_token}"},
+            auth_token=self.auth_token,
             json={
                 "account_id": account_id,
                 "agent_id": agent_id,
                 "interaction": interaction,
-                "summary": updated_summary,
             },
         )
         response.raise_for_status()
+        self._on_saved(account_id, agent_id, session_id, [response.json()])
+
+    def flush(self, session_id: str = None):
+        """
+        Save the buffered interactions of a session (or of all sessions) now, e.g. at the end of a turn.
+
+        :param session_id: The session ID, None for all sessions.
+        """
+        if self.writer:
+            self.writer.flush(session_id)
+
+    def _write_interactions(
+        self, account_id: str, agent_id: str, session_id: str, interactions: list[dict]
+    ):
+        """
+        Save an ordered batch of interactions of a session in one request. Runs on the writer thread or on flush.
+        """
+        response = self.http.post(
+            f"{self.dana_url}/interaction_history/session/{session_id}/interactions",
+            auth_token=self.auth_token,
+            json={"interactions": interactions},
+        )
+        response.raise_for_status()
+        self._on_saved(account_id, agent_id, session_id, response.json()["interactions"])
+        logger.info(
+            f"Saved {len(interactions)} interactions of session {session_id}, writer metrics: {self.writer.metrics()}"
+        )
+
+    def _on_saved(self, account_id: str, agent_id: str, session_id: str, rows: list[dict]):
+        for row in rows:
+            if self.session_cache:
+                self.session_cache.append(
+                    session_id,
+                    {"id": row["id"], "timestamp": row["timestamp"], "interaction": row["interaction"]},
+                )
+            self.summarizer.add(account_id, agent_id, session_id, row["interaction"])
 
     def get_history(
         self, account_id: str, agent_id: str, session_id: str, n: int = 10
@@ -83,16 +168,99 @@ class InteractionManager:
         :param n: The number of recent interactions to return.
         :return: A list of interactions sorted by timestamp in descending order.
         """
-        response = requests.get(
-            f"{self.dana_url}/interaction_history/session/{session_id}",
-            headers={"Authorization": f"Bearer {self.auth_token}"},
-        )
-        response.raise_for_status()
-
         return [
             {"timestamp": row["timestamp"], "interaction": row["interaction"]}
-            for row in response.json()["interactions"]
+            for row in self._get_rows(session_id, n)
+        ]
+
+    def get_context(self, account_id: str, agent_id: str, session_id: str, query: str = None) -> dict:
+        """
+        Assemble the bounded memory of a session for the context of the agent: the interactions no chunk summary
+        covers yet verbatim (at least the last `memory_verbatim`, at most `memory_verbatim + memory_chunk_size - 1`
+        once the summaries are up to date), the summaries of the chunks of interactions before them, the
+        summary of the rest of the session, and the older interactions most relevant to the query.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :param query: The text to retrieve relevant older interactions for, usually the latest user input.
+        :return: {"history": the verbatim interactions, newest first, "relevant_history": oldest first,
+            "chunk_summaries": oldest first, "session_summary"}
+        """
+        memory = self.get_memory(account_id, agent_id, session_id)
+        covered_id = memory["covered_id"] or 0
+        rows = [
+            row
+            for row in self._get_rows(session_id, self.memory_verbatim + self.memory_chunk_size - 1)
+            if row["id"] > covered_id
         ]
+        relevant = (
+            self._get_relevant(session_id, query, before_id=rows[-1]["id"])
+            if query and rows and self.memory_relevant_k
+            else []
+        )
+        return {
+            "history": [
+                {"timestamp": row["timestamp"], "interaction": row["interaction"]} for row in rows
+            ],
+            "relevant_history": [
+                {"timestamp": row["timestamp"], "interaction": row["interaction"]} for row in relevant
+            ],
+            "chunk_summaries": [chunk["summary"] for chunk in memory["chunks"] if chunk["summary"]],
+            "session_summary": memory["summary"],
+        }
+
+    def _get_relevant(self, session_id: str, query: str, before_id: int) -> list[dict]:
+        # the context can do without them, so a failure only leaves them out
+        try:
+            response = self.http.post(
+                f"{self.dana_url}/interaction_history/session/{session_id}/relevant",
+                auth_token=self.auth_token,
+                json={"query": query, "k": self.memory_relevant_k, "before_id": before_id},
+            )
+            response.raise_for_status()
+            return response.json()["interactions"]
+        except Exception as e:
+            logger.error(f"Error retrieving the interactions of session {session_id} relevant to the input: {e}")
+            return []
+
+    def _get_rows(self, session_id: str, n: int) -> list[dict]:
+        # the history includes the interactions still buffered
+        self.flush(session_id)
+
+        if self.session_cache and n <= self.session_cache.history_limit:
+            limit = self.session_cache.history_limit
+            cached = self.session_cache.get(session_id)
+            if cached:
+                # only the interactions saved since, by this agent or anything else, are fetched
+                page = self._fetch_history(session_id, limit=limit, since_id=cached.last_id)
+                self.session_cache.count("syncs" if page["interactions"] else "hits")
+                rows = (page["interactions"] + cached.rows)[:limit]
+            else:
+                self.session_cache.count("misses")
+                rows = self._fetch_history(session_id, limit=limit)["interactions"]
+            self.session_cache.put(
+                session_id, rows, last_id=max((row["id"] for row in rows), default=None)
+            )
+        else:
+            rows = self._fetch_history(session_id, limit=n)["interactions"]
+        return rows[:n]
+
+    def _fetch_history(self, session_id: str, limit: int, **cursor) -> dict:
+        """
+        Fetch a page of the history, see GET /interaction_history/session/<id>.
+
+        :param cursor: One of since_id, after_id or before_id.
+        """
+        params = {"limit": limit, "fields": "id,timestamp,interaction"}
+        params.update({name: value for name, value in cursor.items() if value is not None})
+        response = self.http.get(
+            f"{self.dana_url}/interaction_history/session/{session_id}",
+            auth_token=self.auth_token,
+            params=params,
+        )
+        response.raise_for_status()
+        return response.json()
 
     def get_summary(self, account_id: str, agent_id: str, session_id: str) -> str:
         """
@@ -103,33 +271,117 @@ class InteractionManager:
         :param session_id: The session ID to filter by.
         :return: The latest summary as a string.
         """
+        return self.get_memory(account_id, agent_id, session_id)["summary"]
+
+    def get_memory(self, account_id: str, agent_id: str, session_id: str) -> dict:
+        """
+        Retrieve the summarized levels of the memory of a session.
+
+        :param account_id: The ID of the account.
+        :param agent_id: The id of the agent.
+        :param session_id: The session ID.
+        :return: {"summary": the session summary, "chunks": the chunk summaries not folded into it yet,
+            [{"from_id", "to_id", "summary"}] oldest first, "covered_id": the ID of the last interaction covered by a
+            chunk summary}
+        """
+        # only the summarizer of this agent updates the memory, and it writes through the cache
+        cached = self.session_cache.get(session_id) if self.session_cache else None
+        if cached and cached.memory is not None:
+            return cached.memory
 
-        response = requests.get(
-            f"{self.dana_url}/interaction_history/session/{session_id}/summary",
-            headers={"Authorization": f"Bearer {self.auth_token}"},
+        response = self.http.get(
+            f"{self.dana_url}/interaction_history/session/{session_id}/memory",
+            auth_token=self.auth_token,
         )
         response.raise_for_status()
-        return response.json()["summary"]
+        memory = response.json()
+        if self.session_cache:
+            self.session_cache.set_memory(session_id, memory)
+        return memory
 
-        # return result[0] if result else "No summary available."
+    def _update_memory(
+        self, account_id: str, agent_id: str, session_id: str, interactions: list[dict]
+    ):
+        """
+        Bring the summarized memory of a session up to date. Runs on the summarizer thread, once enough
+        interactions were saved since the last update (the interactions themselves are read back by ID).
+        The interactions that left the verbatim window are summarized a chunk of `memory_chunk_size` at a time,
+        then the chunk summaries beyond `memory_max_chunks` are folded into the session summary.
+        """
+        memory = copy.deepcopy(self.get_memory(account_id, agent_id, session_id))
+        chunk_size = self.memory_chunk_size
+
+        while True:
+            # a chunk is complete once `memory_verbatim` interactions follow it
+            page = self._fetch_history(
+                session_id, limit=chunk_size + self.memory_verbatim, after_id=memory["covered_id"] or 0
+            )
+            rows = page["interactions"][::-1]
+            if len(rows) < chunk_size + self.memory_verbatim:
+                break
+            chunk = rows[:chunk_size]
+            relevant = [row["interaction"] for row in chunk if not is_trivial(row["interaction"])]
+            summary = self._update_summary("", relevant) if relevant else ""
+            if relevant and not summary:
+                return
+            response = self.http.post(
+                f"{self.dana_url}/interaction_history/session/{session_id}/chunks",
+                auth_token=self.auth_token,
+                json={"from_id": chunk[0]["id"], "to_id": chunk[-1]["id"], "summary": summary},
+            )
+            if response.status_code == 409:
+                # summarized elsewhere in the meantime: start over from the stored memory next time
+                logger.warning(f"Memory of session {session_id} changed concurrently: {response.json()}")
+                if self.session_cache:
+                    self.session_cache.invalidate(session_id)
+                return
+            response.raise_for_status()
+            memory["chunks"].append(response.json())
+            memory["covered_id"] = chunk[-1]["id"]
+
+        if len(memory["chunks"]) > self.memory_max_chunks:
+            folded = memory["chunks"][: len(memory["chunks"]) - self.memory_max_chunks]
+            updated_summary = self._update_summary(
+                memory["summary"], [chunk["summary"] for chunk in folded if chunk["summary"]]
+            )
+            if updated_summary:
+                response = self.http.put(
+                    f"{self.dana_url}/interaction_history/session/{session_id}/summary",
+                    auth_token=self.auth_token,
+                    json={"summary": updated_summary, "folded_through": folded[-1]["to_id"]},
+                )
+                response.raise_for_status()
+                memory["summary"] = updated_summary
+                memory["chunks"] = memory["chunks"][len(folded) :]
+
+        if self.session_cache:
+            self.session_cache.set_memory(session_id, memory)
+        logger.info(
+            f"Updated the memory of session {session_id}: {len(memory['chunks'])} chunk summaries up to interaction "
+            f"{memory['covered_id']}, summarizer metrics: {self.summarizer.metrics()}"
+        )
 
-    def _update_summary(self, current_summary: str, new_interaction: dict) -> str:
+    def _update_summary(self, current_summary: str, new_interactions: list) -> str:
         """
-        Incrementally update the summary for the session by including a new interaction.
+        Incrementally update a summary by including new interactions, or the summaries of new interactions.
 
-        :param current_summary: The current summary string.
-        :param new_interaction: The new interaction text to incorporate into the summary.
+        :param current_summary: The current summary string, empty to summarize the new interactions alone.
+        :param new_interactions: The new interactions (or their summaries) to incorporate into the summary,
+            oldest first.
         :return: The updated summary string.
         """
         try:
             prompt = [
                 {
                     "role": "system",
-                    "content": "You are a summarizer that creates very concise summaries of an agent's interactions.",
+                    "content": "You are a summarizer that creates very concise summaries of an agent's interactions. "
+                    f"Keep the facts, decisions, results and open requests. Use at most {SUMMARY_MAX_WORDS} words.",
                 },
                 {
                     "role": "user",
-                    "content": f"Current Summary: {current_summary}\nNew Interaction: {new_interaction}\nUpdate the summary to include the new interaction.",
+                    "content": f"Current Summary: {current_summary}\n"
+                    f"New Interactions (oldest first): {new_interactions}\n"
+                    "Update the summary to include the new interactions.",
                 },
             ]
             response = self.llm_client.answer(prompt=prompt)
@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+import traceback
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionWriter:
+    """
+    Buffers the interactions the agent saves and writes them to the API in ordered batches, one request per batch.
+    The interactions of a session are written once `max_batch` of them are pending, once the oldest has waited
+    `max_delay` seconds, or when the session is flushed (e.g. at the end of a turn), in the order they were added.
+    A batch that fails to be written in the background is kept and retried with an exponential backoff; only when
+    more than `max_pending` interactions are buffered are the oldest ones of the most failing session dropped.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str, str, str, list[dict]], None],
+        max_batch: int = 20,
+        max_delay: float = 0.5,
+        max_pending: int = 10000,
+        max_backoff: float = 30.0,
+    ):
+        """
+        :param write: Called with the account ID, agent ID, session ID and the pending interactions of a session,
+            oldest first, to save them.
+        :param max_batch: Number of pending interactions of a session that triggers a write.
+        :param max_delay: Maximum number of seconds an interaction waits before it is written.
+        :param max_pending: Maximum number of interactions buffered across the sessions, bounding the memory used
+            while the API is unavailable.
+        :param max_backoff: Maximum number of seconds between two attempts to write a failed batch.
+        """
+        self.write = write
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self._condition = threading.Condition()
+        # held while a batch is taken from the buffer and written, so the batches of a session stay in order
+        self._write_lock = threading.Lock()
+        # pending interactions by session ID:
+        # {"owner": (account_id, agent_id), "interactions", "since", "attempts", "retry_at"}
+        self._pending = {}
+        self._pending_count = 0
+        self._metrics = {"buffered": 0, "batches": 0, "written": 0, "failures": 0, "dropped": 0}
+        self._worker = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+        self._worker.start()
+
+    def add(self, account_id: str, agent_id: str, session_id: str, interaction: dict):
+        """
+        Buffer an interaction for writing.
+        """
+        with self._condition:
+            if self._pending_count >= self.max_pending:
+                self._drop_oldest()
+            entry = self._pending.setdefault(
+                session_id,
+                {
+                    "owner": (account_id, agent_id),
+                    "interactions": [],
+                    "since": time.monotonic(),
+                    "attempts": 0,
+                    "retry_at": 0.0,
+                },
+            )
+            entry["interactions"].append(interaction)
+            self._pending_count += 1
+            self._metrics["buffered"] += 1
+            # a new session has its own deadline, which the writer has to wait for
+            if len(entry["interactions"]) == 1 or len(entry["interactions"]) >= self.max_batch:
+                self._condition.notify()
+
+    def flush(self, session_id: str = None):
+        """
+        Write the pending interactions of a session (or of all sessions) now, and wait until they are saved.
+
+        The backoff of failed batches doesn't apply.
+
+        :raises Exception: The error of the write if it fails. The interactions are kept for the next attempt.
+        """
+        with self._write_lock:
+            with self._condition:
+                session_ids = [
+                    pending_session_id
+                    for pending_session_id in self._pending
+                    if session_id is None or pending_session_id == session_id
+                ]
+                batches = [(pending_session_id, self._take(pending_session_id)) for pending_session_id in session_ids]
+            error = None
+            for pending_session_id, entry in batches:
+                try:
+                    self._write(pending_session_id, entry, retry=False)
+                except Exception as e:
+                    error = error or e
+            if error:
+                raise error
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {**self._metrics, "pending": self._pending_count, "pending_sessions": len(self._pending)}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._due_sessions():
+                    self._condition.wait(self._seconds_until_due())
+
+            with self._write_lock:
+                with self._condition:
+                    # a flush may have written them in the meantime
+                    batches = [(session_id, self._take(session_id)) for session_id in self._due_sessions()]
+                for session_id, entry in batches:
+                    self._write(session_id, entry, retry=True)
+
+    def _write(self, session_id: str, entry: dict, retry: bool):
+        """
+        Write a batch taken from the buffer. A failed batch is put back in front of the newer interactions of its
+        session; in the background (retry) it is retried after a backoff, otherwise the error is raised.
+        """
+        account_id, agent_id = entry["owner"]
+        try:
+            self.write(account_id, agent_id, session_id, entry["interactions"])
+        except Exception:
+            logger.error(
+                f"Failed to write {len(entry['interactions'])} interactions of session {session_id}: "
+                f"{traceback.format_exc()}"
+            )
+            entry["attempts"] += 1
+            entry["retry_at"] = time.monotonic() + min(self.max_backoff, self.max_delay * 2 ** entry["attempts"])
+            with self._condition:
+                self._metrics["failures"] += 1
+                self._requeue(session_id, entry)
+            if not retry:
+                raise
+            return
+        with self._condition:
+            self._metrics["batches"] += 1
+            self._metrics["written"] += len(entry["interactions"])
+
+    def _take(self, session_id: str) -> dict:
+        entry = self._pending.pop(session_id)
+        self._pending_count -= len(entry["interactions"])
+        return entry
+
+    def _requeue(self, session_id: str, entry: dict):
+        # interactions added while the batch was being written go after it
+        newer = self._pending.pop(session_id, None)
+        if newer:
+            entry["interactions"].extend(newer["interactions"])
+            self._pending_count -= len(newer["interactions"])
+        entry["since"] = time.monotonic()
+        self._pending[session_id] = entry
+        self._pending_count += len(entry["interactions"])
+        excess = self._pending_count - self.max_pending
+        for _ in range(max(0, excess)):
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        # the session whose writes failed the most times loses its oldest interaction
+        session_id, entry = max(self._pending.items(), key=lambda item: item[1]["attempts"])
+        entry["interactions"].pop(0)
+        self._pending_count -= 1
+        self._metrics["dropped"] += 1
+        if not entry["interactions"]:
+            del self._pending[session_id]
+        if self._metrics["dropped"] % 100 == 1:
+            logger.error(
+                f"The interaction buffer is full ({self.max_pending}): dropped the oldest interaction of session "
+                f"{session_id}, {self._metrics['dropped']} dropped so far"
+            )
+
+    def _is_due(self, entry: dict, now: float) -> bool:
+        if entry["attempts"]:
+            return now >= entry["retry_at"]
+        return len(entry["interactions"]) >= self.max_batch or now - entry["since"] >= self.max_delay
+
+    def _due_sessions(self) -> list[str]:
+        now = time.monotonic()
+        return [session_id for session_id, entry in self._pending.items() if self._is_due(entry, now)]
+
+    def _seconds_until_due(self):
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        due = min(
+            entry["retry_at"] if entry["attempts"] else entry["since"] + self.max_delay
+            for entry in self._pending.values()
+        )
+        return max(0.0, due - now)
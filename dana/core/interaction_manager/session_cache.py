@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class CachedSession:
+    # the latest interactions, newest first, as returned by the API: {"id", "timestamp", "interaction"}
+    rows: list = field(default_factory=list)
+    # ID of the latest interaction of the session the cache knows of
+    last_id: Optional[int] = None
+    # the summarized levels of the memory of the session, see InteractionManager.get_memory
+    memory: Optional[dict] = None
+    touched: float = field(default_factory=time.monotonic)
+
+
+class SessionCache:
+    """
+    In-memory copy of the latest interactions and the summarized memory of the active sessions, kept up to date by the
+    writes of the agent itself (write-through). The caller brings a copy up to date by fetching the interactions
+    saved after `last_id` by other processes.
+    Sessions idle for longer than the TTL are dropped, and the least recently used ones beyond `max_sessions`.
+    """
+
+    def __init__(self, max_sessions: int = 100, ttl_seconds: float = 900, history_limit: int = 10):
+        """
+        :param max_sessions: Maximum number of cached sessions.
+        :param ttl_seconds: Seconds after which an idle session is dropped.
+        :param history_limit: Number of latest interactions kept per session.
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_limit = history_limit
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "syncs": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, session_id: str) -> Optional[CachedSession]:
+        """
+        Return a copy of the cached session, or None if it isn't cached (or has expired).
+        """
+        with self._lock:
+            session = self._touch(session_id)
+            if not session:
+                return None
+            return CachedSession(list(session.rows), session.last_id, session.memory, session.touched)
+
+    def put(self, session_id: str, rows: list, last_id: Optional[int], memory: Optional[dict] = None):
+        """
+        Cache the history of a session as fetched from the API.
+
+        :param rows: The latest interactions, newest first.
+        :param last_id: The ID of the latest interaction of the session.
+        :param memory: The summarized memory, if it was fetched too.
+        """
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            self._sessions[session_id] = CachedSession(
+                rows=rows[: self.history_limit],
+                last_id=last_id,
+                memory=memory if memory is not None else (previous.memory if previous else None),
+            )
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def append(self, session_id: str, row: dict):
+        """
+        Add an interaction the agent just saved to its cached session, if the session is cached.
+
+        :param row: The saved interaction as returned by the API: {"id", "timestamp", "interaction"}.
+        """
+        with self._lock:
+            session = self._touch(session_id)
+            if not session:
+                return
+            # interactions saved concurrently (e.g. by a job) may be confirmed out of order
+            position = 0
+            while position < len(session.rows) and session.rows[position]["id"] > row["id"]:
+                position += 1
+            session.rows.insert(position, row)
+            del session.rows[self.history_limit :]
+            session.last_id = max(session.last_id or 0, row["id"])
+
+    def set_memory(self, session_id: str, memory: dict):
+        with self._lock:
+            session = self._touch(session_id)
+            if session:
+                session.memory = memory
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            if self._sessions.pop(session_id, None):
+                self._metrics["invalidations"] += 1
+
+    def count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "sessions": len(self._sessions)}
+
+    def _touch(self, session_id: str) -> Optional[CachedSession]:
+        session = self._sessions.get(session_id)
+        if not session:
+            return None
+        now = time.monotonic()
+        if now - session.touched > self.ttl_seconds:
+            del self._sessions[session_id]
+            self._metrics["evictions"] += 1
+            return None
+        session.touched = now
+        self._sessions.move_to_end(session_id)
+        return session
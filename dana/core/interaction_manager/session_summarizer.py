@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+import traceback
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Job updates that carry no information for the summary: the job itself and its outcome are summarized
+TRIVIAL_JOB_STATUSES = {"created", "in_progress"}
+
+
+def is_trivial(interaction: dict) -> bool:
+    """
+    Whether an interaction is left out of the summary, e.g. a job status tick.
+    """
+    if not isinstance(interaction, dict) or not interaction.get("type"):
+        return True
+    content = interaction.get("content")
+    return (
+        interaction["type"] == "job"
+        and isinstance(content, dict)
+        and content.get("status") in TRIVIAL_JOB_STATUSES
+    )
+
+
+class SessionSummarizer:
+    """
+    Updates the moving summaries of the sessions in the background, off the path that saves the interactions.
+    The interactions of a session are coalesced, so the summary is updated once per `every_n` interactions, or
+    once `max_delay` seconds after the first interaction it doesn't cover yet, with a single LLM call.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, str, str, list[dict]], None],
+        every_n: int = 5,
+        max_delay: float = 10.0,
+    ):
+        """
+        :param summarize: Called with the account ID, agent ID, session ID and the pending interactions of a session
+            to fold them into its summary.
+        :param every_n: Number of pending interactions that triggers an update of the summary.
+        :param max_delay: Maximum number of seconds an interaction waits before the summary covers it.
+        """
+        self.summarize = summarize
+        self.every_n = every_n
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        # pending interactions by session ID: {"owner": (account_id, agent_id), "interactions", "since"}
+        self._pending = {}
+        self._metrics = {"queued": 0, "skipped": 0, "summaries": 0, "failures": 0}
+        self._worker = threading.Thread(target=self._run, name="session-summarizer", daemon=True)
+        self._worker.start()
+
+    def add(self, account_id: str, agent_id: str, session_id: str, interaction: dict):
+        """
+        Queue a saved interaction for the summary of its session. Trivial interactions are skipped.
+        """
+        with self._condition:
+            if is_trivial(interaction):
+                self._metrics["skipped"] += 1
+                return
+            entry = self._pending.setdefault(
+                session_id,
+                {"owner": (account_id, agent_id), "interactions": [], "since": time.monotonic()},
+            )
+            entry["interactions"].append(interaction)
+            self._metrics["queued"] += 1
+            # a new session has its own deadline, which the worker has to wait for
+            if len(entry["interactions"]) == 1 or len(entry["interactions"]) >= self.every_n:
+                self._condition.notify()
+
+    def flush(self, session_id: str = None):
+        """
+        Summarize the pending interactions of a session (or of all sessions) now rather than when they are due.
+        The update still happens in the background.
+        """
+        with self._condition:
+            for pending_session_id, entry in self._pending.items():
+                if session_id is None or pending_session_id == session_id:
+                    entry["since"] = float("-inf")
+            self._condition.notify()
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {**self._metrics, "pending_sessions": len(self._pending)}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = self._due_sessions()
+                while not due:
+                    self._condition.wait(self._seconds_until_due())
+                    due = self._due_sessions()
+                batches = [(session_id, self._pending.pop(session_id)) for session_id in due]
+
+            for session_id, entry in batches:
+                account_id, agent_id = entry["owner"]
+                try:
+                    self.summarize(account_id, agent_id, session_id, entry["interactions"])
+                    metric = "summaries"
+                except Exception:
+                    logger.error(f"Failed to update the summary of session {session_id}: {traceback.format_exc()}")
+                    metric = "failures"
+                with self._condition:
+                    self._metrics[metric] += 1
+
+    def _due_sessions(self) -> list[str]:
+        now = time.monotonic()
+        return [
+            session_id
+            for session_id, entry in self._pending.items()
+            if len(entry["interactions"]) >= self.every_n or now - entry["since"] >= self.max_delay
+        ]
+
+    def _seconds_until_due(self):
+        if not self._pending:
+            return None
+        oldest = min(entry["since"] for entry in self._pending.values())
+        return max(0.0, self.max_delay - (time.monotonic() - oldest))
@@ -84,7 +84,7 @@ class InteractiveAgent(BaseAgent):
 
         self._save_user_input(session_id, user_input)
 
-        context = self._get_context(session_id)
+        context = self._get_context(session_id, user_input)
         logger.info(f"Context: {context}")
 
         next_step_type = self.navigator.get_next_step_type(user_input, context)
@@ -102,21 +102,29 @@ class InteractiveAgent(BaseAgent):
         logger.info(f"Response from step handler: {response}")
 
         self._save_response(session_id, response)
+        # end of the turn: save what the turn buffered in one request
+        self.interaction_manager.flush(session_id)
 
         return response
 
-    def _get_context(self, session_id: str) -> AgentContext:
+    def _get_context(self, session_id: str, user_input: str = None) -> AgentContext:
         """
         Get the current context of the agent, including history and configurations.
 
         :param session_id: The session ID for this interaction.
+        :param user_input: The input the context is for, to retrieve the relevant older interactions.
         :return: A dictionary representing the current context.
         """
-        history = self.interaction_manager.get_history(
-            account_id=self.account_id, agent_id=self.id, session_id=session_id
+        memory = self.interaction_manager.get_context(
+            account_id=self.account_id, agent_id=self.id, session_id=session_id, query=user_input
         )
         return {
-            "history": history,
+            "history": memory["history"],
+            "earlier_history": {
+                "session_summary": memory["session_summary"],
+                "chunk_summaries": memory["chunk_summaries"],
+                "relevant_interactions": memory["relevant_history"],
+            },
             "intents": self.intents,
             "facts": self.facts,
             "policies": self.policies,
@@ -153,6 +161,15 @@ class InteractiveAgent(BaseAgent):
             interaction=interaction,
         )
 
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job of the agent.
+
+        :param job_id: The ID of the job.
+        :return: True if the job is being cancelled, False if the agent doesn't know the job.
+        """
+        return self.step_handler.code_executor.cancel_job(job_id)
+
     def get_history(self, session_id: str):
         """
         Retrieve the interaction history for a given session.
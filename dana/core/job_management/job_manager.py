@@ -1,6 +1,6 @@
 from abc import ABC
 from collections import namedtuple
-import requests
+from core.http_client import HTTPClient, get_http_client
 from logging import getLogger
 
 logger = getLogger(__name__)
@@ -10,24 +10,24 @@ CreateJobResult = namedtuple("CreateJobResult", ["job_id", "secret_token"])
 
 
 class JobManager(ABC):
-    def __init__(self, auth_token: str, dana_url: str):
+    def __init__(self, auth_token: str, dana_url: str, http_client: HTTPClient = None):
         self.auth_token = auth_token
         self.dana_url = dana_url
+        self.http = http_client or get_http_client()
 
-    def create_job(self, session_id: str, name: str, description: str) -> str:
+    def create_job(
+        self, session_id: str, name: str, description: str, parent_job_id: str = None
+    ) -> str:
         
         payload = {
             "session_id": session_id,
             "name": name,
             "description": description,
         }
+        if parent_job_id:
+            payload["parent_job_id"] = parent_job_id
         logger.info(f"Creating job with payload: {payload}")
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json",
-        }
-        logger.info(f"auth_token: {self.auth_token}")
-        response = requests.post(f"{self.dana_url}/job", json=payload, headers=headers)
+        response = self.http.post(f"{self.dana_url}/job", json=payload, auth_token=self.auth_token)
         response.raise_for_status()
         job_id = response.json()["job_id"]
         return job_id
@@ -45,11 +45,21 @@ class JobManager(ABC):
             "payload": payload,
             "session_id": session_id,
         }
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Content-Type": "application/json",
-        }
-        response = requests.post(
-            f"{self.dana_url}/job/update_status", json=payload, headers=headers
+        response = self.http.post(
+            f"{self.dana_url}/job/update_status", json=payload, auth_token=self.auth_token
+        )
+        response.raise_for_status()
+
+    def append_job_logs(self, job_id: str, chunks: list[dict]):
+        """
+        Send chunks of the stdout/stderr of a running job.
+
+        :param job_id: The ID of the job.
+        :param chunks: List of {"sequence", "stream", "content"}.
+        """
+        response = self.http.post(
+            f"{self.dana_url}/job/{job_id}/logs",
+            json={"chunks": chunks},
+            auth_token=self.auth_token,
         )
         response.raise_for_status()
@@ -25,3 +25,20 @@ class BaseLLM(ABC):
             Parsed response as the formatter instance or plain string.
         """
         pass
+
+    def embed(self, texts: list[str], model: str, dimensions: Optional[int] = None) -> list[list[float]]:
+        """
+        Compute the embeddings of texts, for providers that offer an embedding model.
+
+        Args:
+            texts: The texts to embed.
+            model: The embedding model.
+            dimensions: Optional number of dimensions of the embeddings, if the model can shorten them.
+
+        Returns:
+            One embedding per text, in the same order.
+
+        Raises:
+            NotImplementedError: If the provider has no embedding model.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't provide embeddings")
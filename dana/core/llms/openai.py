@@ -40,3 +40,15 @@ class OpenAIClient(BaseLLM):
                 messages=prompt,
             )
             return completion.choices[0].message.content
+
+    def embed(self, texts: list[str], model: str, dimensions: Optional[int] = None) -> list[list[float]]:
+        """
+        Calls the OpenAI embeddings API with the provided texts.
+        :param texts: The texts to embed, in one request.
+        :param model: The embedding model, e.g. text-embedding-3-small.
+        :param dimensions: Optional number of dimensions to shorten the embeddings to.
+        :return: One embedding per text, in the same order.
+        """
+        kwargs = {"dimensions": dimensions} if dimensions else {}
+        response = self.client.embeddings.create(model=model, input=texts, **kwargs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
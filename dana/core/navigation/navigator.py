@@ -121,6 +121,7 @@ class Navigator:
         Facts: {context.get('facts', 'No facts available')}
         Agent's allowed intents: {context.get('intents', 'No intents available')}. You try to stick to these intents as much as possible.
         Agent's policies: {context.get('policies', 'No policies available')}. You MUST follow these policies. You cannot violate them.
+        Summary of the earlier interactions with the user: {context.get('earlier_history', 'No earlier history')}.
         History of interactions with the user: {context.get('history', 'No history available')}."""
 
         RESPONSE_FORMAT = """
@@ -196,6 +196,38 @@ class StepHandler:
             if integration["name"] in executionContext.generated_code.integrations
         }
 
+        if executionContext.batch_inputs:
+            # one run per input set, each starting from the inputs shared by all the runs
+            shared_inputs = {
+                input_item.name: input_item for input_item in executionContext.inputs
+            }
+            input_sets = [
+                list(
+                    {
+                        **shared_inputs,
+                        **{input_item.name: input_item for input_item in input_set},
+                    }.values()
+                )
+                for input_set in executionContext.batch_inputs
+            ]
+            job_id = self.code_executor.execute_batch(
+                account_id=account_id,
+                agent_id=agent_id,
+                session_id=session_id,
+                code=executionContext.generated_code.code,
+                requirements=executionContext.generated_code.requirements,
+                input_sets=input_sets,
+                secrets=secrets,
+                integrations=integrations,
+                name=executionContext.generated_code.name,
+                description=executionContext.generated_code.description,
+                timeout=executionContext.timeout_seconds,
+                idempotent=executionContext.generated_code.idempotent,
+                action=executionContext.generated_code.action or None,
+            )
+            logger.info(f"Scheduled batch job: {job_id} with {len(input_sets)} input sets")
+            return None
+
         job_id = self.code_executor.execute_code(
             account_id=account_id,
             agent_id=agent_id,
@@ -207,6 +239,9 @@ class StepHandler:
             integrations=integrations,
             name=executionContext.generated_code.name,
             description=executionContext.generated_code.description,
+            timeout=executionContext.timeout_seconds,
+            idempotent=executionContext.generated_code.idempotent,
+            action=executionContext.generated_code.action or None,
         )
         logger.info(f"Scheduled job: {job_id}")
         # We return None here because we already inform the user that the job is scheduled. Once we switch to
@@ -97,6 +97,7 @@ class PerceptionHandler:
             - 'version': The version of the generated code to be confirmed. Set this to 'latest' to confirm the latest version.
             The purpose of the confirmation is to ensure that the user agrees with the generated plan.
             Context:
+            Summary of the earlier interactions: {context.get('earlier_history', 'No earlier history')}
             History of interactions with the user: {context.get('history', 'No history available')}
             Facts: {context.get('facts', 'No facts available')}
             """
@@ -142,6 +143,7 @@ class PerceptionHandler:
             If you're asking for more information, try to gather as much information as possible with a single question, especially if 
             you are doing this to prepare for executing a plan.
             Context:
+            Summary of the earlier interactions: {context.get('earlier_history', 'No earlier history')}
             History of interactions with the user: {context.get('history', 'No history available')}
             Allowed intents: {context.get('intents', 'No intents available')}
             Facts: {context.get('facts', 'No facts available')}
@@ -187,6 +189,7 @@ class PerceptionHandler:
             Your answer must be in the format: {{'label': 'Your explanation based on the user input', 'options': ['Option 1', ...]}}.
             If you choose 'options', you can provide up to {max_options} options based on the allowed intents or an arbitrary combination of them.
             Context:
+            Summary of the earlier interactions: {context.get('earlier_history', 'No earlier history')}
             History of interactions with the user: {context.get('history', 'No history available')}
             Allowed intents: {context.get('intents', 'No intents available')}
             Facts: {context.get('facts', 'No facts available')}
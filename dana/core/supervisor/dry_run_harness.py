@@ -0,0 +1,301 @@
+"""
+Standalone harness used by LocalCodeSandboxValidator to dry-run generated code.
+
+This file is executed as a script by a separate interpreter and must only depend on the standard library.
+It reads a JSON request from stdin, imports `task.py` from the current working directory, checks the `main`
+signature and optionally calls `main` with the given arguments. The call runs under the resource limits of the jobs,
+with the network, processes and changes to files outside the sandbox directory blocked.
+The report is written to stdout as a single JSON document.
+"""
+
+import ast
+import contextlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import inspect
+import io
+import json
+import os
+import resource
+import socket
+import sys
+import traceback
+import types
+from unittest import mock
+
+# Exceptions that point at a defect in the code itself rather than at the sandbox environment.
+PROGRAMMING_ERRORS = (NameError, AttributeError, TypeError, ImportError, SyntaxError)
+
+
+class SandboxNetworkBlocked(ConnectionError):
+    """Raised whenever the code under test tries to reach the network."""
+
+
+class SandboxSideEffectBlocked(PermissionError):
+    """Raised whenever the code under test tries to start a process or change a file outside the sandbox."""
+
+
+def _blocked(*args, **kwargs):
+    raise SandboxNetworkBlocked("[dry-run] network access is disabled in the sandbox")
+
+
+# Audit events of processes and signals, always blocked during the call
+BLOCKED_EVENTS = {
+    "subprocess.Popen",
+    "os.system",
+    "os.exec",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.fork",
+    "os.forkpty",
+    "os.kill",
+    "os.killpg",
+}
+# Audit events of file changes, blocked outside the sandbox directory; the paths are their first arguments
+FILE_EVENTS = {
+    "os.remove": 1,
+    "os.rmdir": 1,
+    "os.mkdir": 1,
+    "os.rename": 2,
+    "os.link": 2,
+    "os.symlink": 2,
+    "os.truncate": 1,
+    "os.chmod": 1,
+    "os.chown": 1,
+    "os.utime": 1,
+    "shutil.rmtree": 1,
+}
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+
+
+class _MockModuleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """
+    Resolves third-party modules that are not installed in the sandbox interpreter to mocks, so that
+    the generated code can be imported without creating a virtual environment for it.
+    """
+
+    def __init__(self):
+        self.mocked = set()
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in sys.stdlib_module_names:
+            return None
+        self.mocked.add(fullname.split(".")[0])
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec):
+        module = mock.MagicMock(name=spec.name)
+        module.__path__ = []
+        module.__spec__ = spec
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+def _is_catch_all(handler_type) -> bool:
+    if handler_type is None:
+        return True
+    if isinstance(handler_type, ast.Tuple):
+        return any(_is_catch_all(element) for element in handler_type.elts)
+    name = handler_type.id if isinstance(handler_type, ast.Name) else getattr(handler_type, "attr", None)
+    return name in ("Exception", "BaseException")
+
+
+def _raised_in(tb, filename: str) -> bool:
+    while tb.tb_next:
+        tb = tb.tb_next
+    return tb.tb_frame.f_code.co_filename == filename
+
+
+class _ExceptionRecorder:
+    """
+    Records the last programming error raised by the generated module's own code that the code doesn't really
+    handle: one that a catch-all handler (`except:`, `except Exception`) turns into a failure. Errors raised in
+    other modules and errors the code handles by their type (e.g. `except ImportError`) are ignored.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.last = None
+        with open(filename, "r") as f:
+            tree = ast.parse(f.read())
+        # whether the except clause a line belongs to catches everything; nested clauses come later in the walk
+        self._handlers = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ExceptHandler):
+                for line in range(node.body[0].lineno, node.end_lineno + 1):
+                    self._handlers[line] = _is_catch_all(node.type)
+        # the exception each frame of the module is unwinding or about to handle
+        self._pending = {}
+
+    def global_trace(self, frame, event, arg):
+        if frame.f_code.co_filename == self.filename:
+            return self.local_trace
+        return None
+
+    def local_trace(self, frame, event, arg):
+        if event == "exception":
+            exc_type, _, exc_tb = arg
+            if issubclass(exc_type, PROGRAMMING_ERRORS) and _raised_in(exc_tb, self.filename):
+                self._pending[frame] = arg
+            else:
+                self._pending.pop(frame, None)
+        elif event == "line" and frame in self._pending:
+            # the first line run in an except clause tells which clause handles the exception
+            catch_all = self._handlers.get(frame.f_lineno)
+            if catch_all is not None:
+                exception = self._pending.pop(frame)
+                if catch_all:
+                    self.last = exception
+        elif event == "return":
+            self._pending.pop(frame, None)
+        return self.local_trace
+
+
+def _apply_rlimits(rlimits: dict):
+    # the limits produced by ResourceLimits.rlimits, as for the jobs
+    for name, (soft, hard) in rlimits.items():
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+
+
+def _block_side_effects(sandbox_dir: str):
+    """
+    Block, through an audit hook, the processes the code would start and the files it would change outside the
+    sandbox directory. Audit hooks can't be removed, so this is only done for the call of 'main'.
+    """
+    sandbox_dir = os.path.realpath(sandbox_dir)
+
+    def outside(path) -> bool:
+        if isinstance(path, int) or path is None:
+            return False
+        path = os.path.realpath(os.fsdecode(path))
+        return path != sandbox_dir and not path.startswith(sandbox_dir + os.sep)
+
+    def hook(event, args):
+        if event in BLOCKED_EVENTS:
+            raise SandboxSideEffectBlocked(f"[dry-run] {event} is disabled in the sandbox")
+        if event == "open":
+            path, mode, flags = args
+            writes = any(c in (mode or "") for c in "wax+") or bool((flags or 0) & WRITE_FLAGS)
+            if writes and outside(path):
+                raise SandboxSideEffectBlocked(f"[dry-run] writing {path} is disabled in the sandbox")
+        elif event in FILE_EVENTS:
+            for path in args[: FILE_EVENTS[event]]:
+                if outside(path):
+                    raise SandboxSideEffectBlocked(f"[dry-run] {event} on {path} is disabled in the sandbox")
+
+    sys.addaudithook(hook)
+
+
+def _block_network():
+    socket.socket.connect = _blocked
+    socket.socket.connect_ex = _blocked
+    socket.socket.sendto = _blocked
+    socket.create_connection = _blocked
+    socket.getaddrinfo = _blocked
+
+
+def _check_signature(main, request: dict) -> list:
+    issues = []
+    parameters = inspect.signature(main).parameters
+    accepts_kwargs = any(p.kind == p.VAR_KEYWORD for p in parameters.values())
+    for name in ("secrets", "integrations"):
+        if request.get(f"uses_{name}") and name not in parameters and not accepts_kwargs:
+            issues.append(f"The code uses {name} but 'main' has no '{name}' argument.")
+    if request.get("call_main"):
+        provided = set(request.get("kwargs", {}))
+        for name, parameter in parameters.items():
+            if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+            if parameter.default is parameter.empty and name not in provided:
+                issues.append(f"'main' requires the argument '{name}' which is not provided.")
+        unknown = [name for name in provided if name not in parameters]
+        if unknown and not accepts_kwargs:
+            issues.append(f"'main' does not accept the argument(s): {', '.join(unknown)}.")
+    return issues
+
+
+def run(request: dict) -> dict:
+    report = {"stage": "import", "ok": False, "mocked_modules": [], "issues": []}
+    _apply_rlimits(request.get("rlimits") or {})
+    task_path = os.path.join(os.getcwd(), "task.py")
+    sys.path.insert(0, os.getcwd())
+    finder = _MockModuleFinder()
+    sys.meta_path.append(finder)
+    _block_network()
+
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+        try:
+            spec = importlib.util.spec_from_file_location("task", task_path)
+            task = importlib.util.module_from_spec(spec)
+            sys.modules["task"] = task
+            spec.loader.exec_module(task)
+        except BaseException:
+            report["traceback"] = traceback.format_exc()
+            report["mocked_modules"] = sorted(finder.mocked)
+            return report
+
+        report["mocked_modules"] = sorted(finder.mocked)
+        report["stage"] = "signature"
+        main = getattr(task, "main", None)
+        if not isinstance(main, types.FunctionType):
+            report["issues"].append("The code does not define a function named 'main'.")
+            return report
+        report["issues"] = _check_signature(main, request)
+        if report["issues"] or not request.get("call_main"):
+            report["ok"] = not report["issues"]
+            return report
+
+        if finder.mocked:
+            # calling main against mocked third-party modules says nothing about the real behavior
+            report["ok"] = True
+            report["skipped_call"] = True
+            return report
+
+        report["stage"] = "call"
+        recorder = _ExceptionRecorder(task_path)
+        _block_side_effects(os.getcwd())
+        sys.settrace(recorder.global_trace)
+        try:
+            result = main(**request.get("kwargs", {}))
+        except SandboxSideEffectBlocked as e:
+            # the code does what it's meant to, the sandbox stopped it: nothing more to learn from the call
+            sys.settrace(None)
+            report["ok"] = True
+            report["blocked"] = str(e)
+            return report
+        except BaseException:
+            sys.settrace(None)
+            report["traceback"] = traceback.format_exc()
+            report["issues"].append("'main' raised an exception instead of returning a failure result.")
+            return report
+        sys.settrace(None)
+
+    if not isinstance(result, dict) or result.get("status") not in ("success", "failure"):
+        report["issues"].append(f"'main' must return a dict with status 'success' or 'failure', got: {result!r:.200}")
+    else:
+        try:
+            json.dumps(result)
+        except (TypeError, ValueError) as e:
+            report["issues"].append(f"The result of 'main' is not JSON serializable: {e}")
+
+    if recorder.last and result_is_failure(result):
+        exc_type, exc_value, exc_tb = recorder.last
+        if issubclass(exc_type, PROGRAMMING_ERRORS) and not issubclass(exc_type, SandboxNetworkBlocked):
+            report["traceback"] = "".join(traceback.format_exception(exc_type, exc_value, exc_tb))
+            report["issues"].append(f"'main' hit a {exc_type.__name__} that it reported as a failure.")
+
+    report["ok"] = not report["issues"]
+    return report
+
+
+def result_is_failure(result) -> bool:
+    return isinstance(result, dict) and result.get("status") != "success"
+
+
+if __name__ == "__main__":
+    request = json.loads(sys.stdin.read() or "{}")
+    print(json.dumps(run(request)))
@@ -2,6 +2,7 @@ import logging
 from pydantic import BaseModel
 from core.agent_context import AgentContext
 from core.code_generation.base_code_generator import GeneratedCodeFormat
+from core.perception.perception_handler import InputItemFormat
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,10 @@ class LocalCodeReviewFormat(BaseModel):
     suggested_fix: str
 
 
+class SynthesizedInputsFormat(BaseModel):
+    inputs: list[InputItemFormat]
+
+
 class LocalCodeGeneratorReviewer:
     """
     A reviewer that verifies the correctness, quality, and security of the generated code.
@@ -60,6 +65,44 @@ class LocalCodeGeneratorReviewer:
             ),
         }
 
+    def synthesize_inputs(
+        self,
+        generated_code: GeneratedCodeFormat,
+        user_input: str,
+        context: AgentContext,
+    ) -> list[InputItemFormat]:
+        """
+        Synthesize realistic inputs to dry-run the generated code with.
+
+        :param generated_code: The code generated by the LocalCodeGenerator.
+        :param user_input: The original user request.
+        :param context: The contextual state of the agent.
+        :return: A list of input items for the arguments of the 'main' function.
+        """
+        prompt = [
+            {
+                "role": "system",
+                "content": """You are a code reviewer preparing a dry run of a Python function named 'main'.
+                Provide one value for every argument of 'main' except 'secrets' and 'integrations', which are passed separately.
+                Prefer the values that are available in the user input and the history of interactions. Otherwise use realistic sample values.
+                Each item should have a 'name', 'value' and 'type' field. 'value' is always a string; for the types 'dict' and 'list'
+                it must be valid JSON.
+                """,
+            },
+            {
+                "role": "user",
+                "content": f"""User Input: {user_input}
+                Summary of the earlier interactions: {context.get('earlier_history', 'No earlier history')}
+                History of interactions with the user: {context.get('history', 'No history available')}
+                Code:\n{generated_code.code}""",
+            },
+        ]
+        response = self.llm_client.answer(prompt=prompt, formatter=SynthesizedInputsFormat)
+
+        logger.info(f"Synthesized dry run inputs: {response}")
+
+        return response.inputs
+
     def _generate_review_prompt(
         self,
         generated_code: GeneratedCodeFormat,
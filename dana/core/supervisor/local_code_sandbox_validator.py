@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import uuid
+from core.code_generation.base_code_generator import GeneratedCodeFormat
+from core.execution.resource_limits import JobCgroup, ResourceLimits
+from core.perception.perception_handler import InputItemFormat
+
+logger = logging.getLogger(__name__)
+
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dry_run_harness.py")
+
+
+class DryRunMode:
+    NONE = "none"  # Don't dry-run the generated code
+    IMPORT = "import"  # Import the module and check the signature of 'main'
+    CALL = "call"  # Also call 'main' with synthesized inputs
+
+
+class LocalCodeSandboxValidator:
+    """
+    Dry-runs the generated code in a sandbox to catch runtime failures before the user confirms the execution.
+    The sandbox is the agent's own interpreter started in isolated mode, so no virtual environment is created
+    and third-party modules that are not installed are replaced by mocks. Network access is blocked and secrets
+    and integrations are replaced by placeholder values. When 'main' is called, it runs under the resource limits
+    of the jobs and can't start processes or change files outside its sandbox directory.
+    """
+
+    def __init__(
+        self,
+        mode: str = DryRunMode.IMPORT,
+        timeout: int = 10,
+        resource_limits: ResourceLimits = None,
+        cgroup_root: str = None,
+    ):
+        """
+        Initialize the validator.
+
+        :param mode: One of the DryRunMode values.
+        :param timeout: Maximum number of seconds a dry run can take.
+        :param resource_limits: The limits of the jobs, also enforced on the dry runs.
+        :param cgroup_root: Optional delegated cgroup v2 directory, to limit the memory of the dry runs like the
+            memory of the jobs.
+        """
+        self.mode = mode
+        self.timeout = timeout
+        self.resource_limits = resource_limits or ResourceLimits()
+        self.cgroup_root = cgroup_root
+
+    @property
+    def call_main(self) -> bool:
+        return self.mode == DryRunMode.CALL
+
+    def validate(
+        self,
+        generated_code: GeneratedCodeFormat,
+        inputs: list[InputItemFormat] = None,
+        integrations: list[dict] = None,
+    ) -> dict:
+        """
+        Dry-run the generated code.
+
+        :param generated_code: The code generated by the LocalCodeGenerator.
+        :param inputs: Synthesized inputs to call 'main' with. Only used in the 'call' mode.
+        :param integrations: The integrations of the agent, used to build placeholder credentials with the right shape.
+        :return: A dictionary in the same format as the result of the code reviewer.
+        """
+        request = {
+            "call_main": self.call_main,
+            "uses_secrets": bool(generated_code.secrets),
+            "uses_integrations": bool(generated_code.integrations),
+            "rlimits": self.resource_limits.rlimits(),
+        }
+        if self.call_main:
+            try:
+                request["kwargs"] = self._build_kwargs(generated_code, inputs or [], integrations or [])
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping the call to 'main', the synthesized inputs are invalid: {e}")
+                request["call_main"] = False
+
+        sandbox_dir = tempfile.mkdtemp(prefix="dry-run-")
+        cgroup = (
+            JobCgroup(self.cgroup_root, f"dry-run-{uuid.uuid4()}", self.resource_limits) if self.cgroup_root else None
+        )
+        stderr = ""
+        try:
+            with open(os.path.join(sandbox_dir, "task.py"), "w") as task_file:
+                task_file.write(generated_code.code)
+
+            process = subprocess.Popen(
+                [sys.executable, "-I", HARNESS_PATH],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                cwd=sandbox_dir,
+                env={"PATH": os.getenv("PATH", "")},
+                start_new_session=True,
+            )
+            if cgroup:
+                cgroup.add(process.pid)
+            try:
+                stdout, stderr = process.communicate(json.dumps(request), timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            report = json.loads(stdout.strip().splitlines()[-1])
+        except subprocess.TimeoutExpired:
+            return self._result(False, f"The dry run did not finish within {self.timeout} seconds.")
+        except (json.JSONDecodeError, IndexError):
+            logger.warning(f"The dry run produced no report: {stderr}")
+            return self._result(True, "")
+        finally:
+            shutil.rmtree(sandbox_dir, ignore_errors=True)
+            if cgroup:
+                cgroup.remove()
+
+        logger.info(f"Dry run report: {report}")
+
+        if report["ok"]:
+            return self._result(True, "")
+
+        feedback = " ".join(report["issues"]) or f"The code failed during the {report['stage']} stage of the dry run."
+        if report.get("traceback"):
+            feedback += f"\nTraceback:\n{report['traceback']}"
+        return self._result(False, feedback)
+
+    def _build_kwargs(
+        self, generated_code: GeneratedCodeFormat, inputs: list[InputItemFormat], integrations: list[dict]
+    ) -> dict:
+        kwargs = {input_item.name: input_item.get_typed_value() for input_item in inputs}
+        if generated_code.secrets:
+            kwargs["secrets"] = {name: f"dry-run-{name}" for name in generated_code.secrets}
+        if generated_code.integrations:
+            kwargs["integrations"] = {
+                integration["name"]: {"credentials": self._mask(integration["credentials"])}
+                for integration in integrations
+                if integration["name"] in generated_code.integrations
+            }
+        # make sure the arguments survive the trip to the sandbox
+        json.dumps(kwargs)
+        return kwargs
+
+    def _mask(self, value):
+        if isinstance(value, dict):
+            return {k: (v if k == "type" else self._mask(v)) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._mask(v) for v in value]
+        if isinstance(value, str):
+            return "dry-run-value"
+        return value
+
+    @staticmethod
+    def _result(is_valid: bool, feedback: str) -> dict:
+        return {
+            "is_valid": is_valid,
+            "feedback": feedback,
+            "suggested_fix": "" if is_valid else "Fix the error reported by the dry run of the code.",
+        }
@@ -101,6 +101,7 @@ class NavigationReviewer:
         Agent's policies: {context.get('policies', 'No policies available')}
         Secrets shared with the agent: {secrets if secrets else 'No secrets available'}
         Integrations shared with the agent: {integrations if integrations else 'No integrations available'}
+        Summary of the earlier interactions: {context.get('earlier_history', 'No earlier history')}
         History of interactions: {context.get('history', 'No history available')}.
         User's latest input: {user_input}."""
 
@@ -1,4 +1,6 @@
-from requests import post, get, exceptions
+from requests import exceptions
+
+from core.http_client import get_http_client
 
 from .base_interactor import BaseInteractor
 
@@ -22,12 +24,34 @@ class APIInteractor(BaseInteractor):
         payload = {"input": user_input, "session_id": session_id}
 
         try:
-            response = post(
+            http = get_http_client()
+            # a turn can take minutes (several LLM calls, code generation, review and dry run, waiting for a job):
+            # only the connection is timed out, not the wait for the response
+            response = http.post(
                 url,
                 json=payload,
                 headers=headers,
+                timeout=(http.timeout[0], None),
             )
             return response.json()
         except exceptions.RequestException as e:
             print(f"Error interacting with agent: {str(e)}")
             return {"error": f"Error interacting with agent: {str(e)}"}
+
+    def cancel_job(self, job_id: str, agent_deployment_metadata: dict) -> bool:
+        """
+        Ask the agent API to cancel one of its jobs.
+
+        :param job_id: The ID of the job.
+        :param agent_deployment_metadata: Metadata containing information about the deployed agent, such as its URL.
+        :return: True if the agent is cancelling the job, False if the agent doesn't know the job or can't be reached.
+        """
+        agent_url = agent_deployment_metadata["url"]
+        url = f"{agent_url}/job/{job_id}/cancel"
+
+        try:
+            response = get_http_client().post(url, timeout=10)
+            return response.status_code == 202
+        except exceptions.RequestException as e:
+            print(f"Error cancelling job: {str(e)}")
+            return False
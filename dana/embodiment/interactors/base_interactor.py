@@ -16,3 +16,14 @@ class BaseInteractor(ABC):
         :return: A dictionary representing the agent's response or next step.
         """
         pass
+
+    @abstractmethod
+    def cancel_job(self, job_id: str, agent_deployment_metadata) -> bool:
+        """
+        Ask the agent to cancel one of its jobs.
+
+        :param job_id: The ID of the job.
+        :param agent_deployment_metadata: Metadata containing information about the deployed agent, such as its URL.
+        :return: True if the agent is cancelling the job, False if the agent doesn't know the job.
+        """
+        pass
@@ -2,6 +2,8 @@ import logging
 from flask import Flask, request, jsonify
 import threading
 
+from core.http_client import get_http_client
+
 
 class APIRunner:
     """
@@ -66,6 +68,13 @@ class APIRunner:
             history = self.agent.get_history(session_id)
             return jsonify(history)
 
+        @self.app.route("/job/<job_id>/cancel", methods=["POST"])
+        def cancel_job(job_id):
+            self.logger.info(f"Cancelling job: {job_id}")
+            if not self.agent.cancel_job(job_id):
+                return jsonify({"error": "Job not found."}), 404
+            return jsonify({"message": "Job is being cancelled."}), 202
+
         @self.app.route("/status", methods=["GET"])
         def status():
             return jsonify(
@@ -76,6 +85,10 @@ class APIRunner:
                 }
             )
 
+        @self.app.route("/metrics", methods=["GET"])
+        def metrics():
+            return jsonify({"http_client": get_http_client().metrics()})
+
     def run(self, host="0.0.0.0", port=4002):
         """
         Start the API server.
@@ -1,19 +1,35 @@
 import os
 import json
 import logging
+import tempfile
 from dotenv import load_dotenv
 from core.info.answer_handler import AnswerHandler
 from core.interactive_agent import InteractiveAgent
 from core.code_generation.local_code_generator import LocalCodeGenerator
+from core.execution.action_registry import DEFAULT_REGISTRY_DIR, load_actions
+from core.execution.artifact_store import ArtifactStore
 from core.execution.local_code_executor import LocalCodeExecutor
+from core.execution.job_queue import JobQueue
+from core.execution.resource_limits import ResourceLimits
+from core.execution.result_cache import ResultCache
+from core.execution.trusted_action_executor import TrustedActionExecutor
+from core.execution.venv_pool import VenvPool
+from core.execution.workspace_manager import WorkspaceManager
+from core.execution.wheelhouse import Wheelhouse
+from core.execution.zygote import DEFAULT_PRELOAD, ZygotePool
 from core.job_management.job_manager import JobManager
 from core.navigation.navigator import Navigator
 from core.perception.perception_handler import PerceptionHandler
 from core.interaction_manager.interaction_manager import InteractionManager
+from core.interaction_manager.session_cache import SessionCache
 from core.navigation.step_handler import StepHandler
 from embodiment.runners.api_runner.api_runner import APIRunner
 from core.llms.openai import OpenAIClient
 from core.llms.llm_factory import LLMFactory
+from core.supervisor.local_code_sandbox_validator import (
+    DryRunMode,
+    LocalCodeSandboxValidator,
+)
 
 load_dotenv()
 
@@ -95,17 +111,159 @@ if __name__ == "__main__":
     # Initialize dependencies
 
     navigator = Navigator(reasoning_llm_client)
+    memory_verbatim = int(os.getenv("MEMORY_VERBATIM_INTERACTIONS", 10))
+    memory_chunk_size = int(os.getenv("MEMORY_CHUNK_INTERACTIONS", 10))
     interaction_manager = InteractionManager(
         llm_client=basic_llm_client,
         auth_token=agent_config["auth_token"],
         dana_url=os.getenv("DANA_URL"),
+        summary_every_n=int(os.getenv("SUMMARY_EVERY_N_INTERACTIONS", 5)),
+        summary_max_delay=float(os.getenv("SUMMARY_MAX_DELAY_SECONDS", 10)),
+        session_cache=SessionCache(
+            max_sessions=int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", 100)),
+            ttl_seconds=float(os.getenv("HISTORY_CACHE_TTL_SECONDS", 900)),
+            history_limit=memory_verbatim + memory_chunk_size,
+        )
+        if os.getenv("HISTORY_CACHE_ENABLED", "true").lower() == "true"
+        else None,
+        write_batch_size=int(os.getenv("INTERACTION_WRITE_BATCH_SIZE", 20)),
+        write_max_delay=float(os.getenv("INTERACTION_WRITE_MAX_DELAY_SECONDS", 0.5)),
+        write_max_pending=int(os.getenv("INTERACTION_WRITE_MAX_PENDING", 10000)),
+        memory_verbatim=memory_verbatim,
+        memory_chunk_size=memory_chunk_size,
+        memory_max_chunks=int(os.getenv("MEMORY_MAX_CHUNK_SUMMARIES", 5)),
+        memory_relevant_k=int(os.getenv("MEMORY_RELEVANT_INTERACTIONS", 5))
+        if os.getenv("EMBEDDINGS_ENABLED", "false").lower() == "true"
+        else 0,
+    )
+    # Per-agent limits take precedence over the defaults of the deployment
+    resource_limits = ResourceLimits.from_dict(
+        {
+            "cpu_seconds": os.getenv("JOB_CPU_SECONDS") or None,
+            "memory_mb": os.getenv("JOB_MEMORY_MB") or None,
+            "open_files": os.getenv("JOB_OPEN_FILES") or None,
+            "output_mb": os.getenv("JOB_OUTPUT_MB") or None,
+        }
+    ).merged_with(ResourceLimits.from_dict(agent_config.pop("resource_limits", {})))
+    dry_run_mode = os.getenv("CODE_DRY_RUN_MODE", DryRunMode.NONE)
+    # Vetted registry actions run in a long-lived worker instead of a job process per invocation
+    trusted_actions = (
+        load_actions(os.getenv("REGISTRY_ACTIONS_DIR") or DEFAULT_REGISTRY_DIR)
+        if os.getenv("TRUSTED_ACTIONS_ENABLED", "true").lower() == "true"
+        else {}
+    )
+    code_generator = LocalCodeGenerator(
+        code_gen_llm_client,
+        validator=(
+            LocalCodeSandboxValidator(
+                mode=dry_run_mode,
+                timeout=int(os.getenv("CODE_DRY_RUN_TIMEOUT", 10)),
+                resource_limits=resource_limits,
+                cgroup_root=os.getenv("JOB_CGROUP_ROOT") or None,
+            )
+            if dry_run_mode != DryRunMode.NONE
+            else None
+        ),
+        actions=list(trusted_actions.values()),
     )
-    code_generator = LocalCodeGenerator(code_gen_llm_client)
     job_manager = JobManager(
         auth_token=agent_config["auth_token"], dana_url=os.getenv("DANA_URL")
     )
+    venv_pool = VenvPool(
+        root=os.getenv(
+            "VENV_POOL_ROOT", os.path.join(tempfile.gettempdir(), "0dev", "venvs")
+        ),
+        max_entries=int(os.getenv("VENV_POOL_MAX_ENTRIES", 20)),
+        max_disk_bytes=int(os.getenv("VENV_POOL_MAX_DISK_MB", 5120)) * 1024 * 1024,
+        wheelhouse=Wheelhouse(
+            root=os.getenv(
+                "WHEELHOUSE_ROOT",
+                os.path.join(tempfile.gettempdir(), "0dev", "wheelhouse"),
+            ),
+            offline=os.getenv("WHEELHOUSE_OFFLINE", "false").lower() == "true",
+        ),
+    )
     code_executor = LocalCodeExecutor(
-        job_manager=job_manager, interaction_manager=interaction_manager
+        job_manager=job_manager,
+        interaction_manager=interaction_manager,
+        venv_pool=venv_pool,
+        workspace_manager=WorkspaceManager(
+            root=os.getenv(
+                "WORKSPACE_ROOT",
+                os.path.join(tempfile.gettempdir(), "0dev", "workspaces"),
+            ),
+            failed_retention_seconds=float(
+                os.getenv("WORKSPACE_FAILED_RETENTION_HOURS", 24)
+            )
+            * 3600,
+            max_disk_bytes=int(os.getenv("WORKSPACE_MAX_DISK_MB", 1024)) * 1024 * 1024,
+            gc_interval=float(os.getenv("WORKSPACE_GC_INTERVAL", 60)),
+        ),
+        job_queue=JobQueue(
+            workers=int(os.getenv("JOB_WORKERS", 4)),
+            max_per_agent=(
+                int(os.getenv("JOB_MAX_PER_AGENT"))
+                if os.getenv("JOB_MAX_PER_AGENT")
+                else None
+            ),
+            max_per_account=(
+                int(os.getenv("JOB_MAX_PER_ACCOUNT"))
+                if os.getenv("JOB_MAX_PER_ACCOUNT")
+                else None
+            ),
+        ),
+        zygote_pool=(
+            ZygotePool(
+                preload=(
+                    os.getenv("ZYGOTE_PRELOAD").split(",")
+                    if os.getenv("ZYGOTE_PRELOAD")
+                    else DEFAULT_PRELOAD
+                ),
+                idle_timeout=float(os.getenv("ZYGOTE_IDLE_TIMEOUT", 300)),
+            )
+            if os.getenv("ZYGOTE_ENABLED", "true").lower() == "true"
+            else None
+        ),
+        resource_limits=resource_limits,
+        cgroup_root=os.getenv("JOB_CGROUP_ROOT") or None,
+        log_chunk_bytes=int(os.getenv("JOB_LOG_CHUNK_BYTES", 16 * 1024)),
+        log_flush_interval=float(os.getenv("JOB_LOG_FLUSH_SECONDS", 1.0)),
+        log_max_bytes=(
+            int(os.getenv("JOB_LOG_MAX_MB", 10)) * 1024 * 1024
+            if os.getenv("JOB_LOG_MAX_MB", "10")
+            else None
+        ),
+        result_spill_bytes=int(os.getenv("JOB_RESULT_SPILL_BYTES", 1024 * 1024)),
+        default_timeout=float(os.getenv("JOB_TIMEOUT_SECONDS", 240)),
+        stdlib_fast_path=os.getenv("STDLIB_FAST_PATH_ENABLED", "true").lower() == "true",
+        result_cache=(
+            ResultCache(
+                ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", 600)),
+                max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1000)),
+            )
+            if os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+            else None
+        ),
+        batch_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", 4)),
+        artifact_store=ArtifactStore(
+            auth_token=agent_config["auth_token"],
+            dana_url=os.getenv("DANA_URL"),
+            cache_dir=os.getenv(
+                "ARTIFACT_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "0dev", "artifact-cache"),
+            ),
+            max_disk_bytes=int(os.getenv("ARTIFACT_CACHE_MAX_MB", 5120)) * 1024 * 1024,
+        ),
+        action_executor=(
+            TrustedActionExecutor(
+                trusted_actions,
+                venv_pool=venv_pool,
+                threads=int(os.getenv("TRUSTED_ACTION_THREADS", 4)),
+                startup_timeout=float(os.getenv("TRUSTED_ACTION_STARTUP_TIMEOUT_SECONDS", 60)),
+            )
+            if trusted_actions
+            else None
+        ),
     )
     perception_handler = PerceptionHandler(basic_llm_client)
     answer_handler = AnswerHandler(basic_llm_client)
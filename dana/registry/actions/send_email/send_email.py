@@ -3,20 +3,30 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 
-def send_email(recipient: str, subject: str, body: str,  smtp_server: str, smtp_port: int, smtp_username: str, smtp_password: str) -> dict:
+def send_email(
+    recipient: str,
+    subject: str,
+    body: str,
+    smtp_server: str,
+    smtp_port: int,
+    smtp_username: str,
+    smtp_password: str,
+    sender: str = None,
+) -> dict:
     """
     Send an email using the provided SMTP server details.
 
     :param recipient: Email address of the recipient.
     :param subject: Subject of the email.
     :param body: Body of the email.
-    :param sender: Email address of the sender.
     :param smtp_server: SMTP server address.
     :param smtp_port: SMTP server port.
     :param smtp_username: SMTP username for authentication.
     :param smtp_password: SMTP password for authentication.
+    :param sender: Email address of the sender, the SMTP username by default.
     :return: A dictionary with the status of the email.
     """
+    sender = sender or smtp_username
     try:
         # Create the email message
         message = MIMEMultipart()
@@ -0,0 +1,19 @@
+import threading
+
+from core.interaction_manager.interaction_writer import InteractionWriter
+
+
+def test_single_interaction_is_written_after_max_delay():
+    written = []
+    done = threading.Event()
+
+    def write(account_id, agent_id, session_id, interactions):
+        written.append((account_id, agent_id, session_id, interactions))
+        done.set()
+
+    writer = InteractionWriter(write, max_batch=20, max_delay=0.2)
+    writer.add("account", "agent", "session", {"type": "job", "content": "done"})
+
+    assert done.wait(2)
+    assert written == [("account", "agent", "session", [{"type": "job", "content": "done"}])]
+    assert writer.metrics()["pending"] == 0
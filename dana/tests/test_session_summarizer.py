@@ -0,0 +1,19 @@
+import threading
+
+from core.interaction_manager.session_summarizer import SessionSummarizer
+
+
+def test_single_interaction_is_summarized_after_max_delay():
+    summarized = []
+    done = threading.Event()
+
+    def summarize(account_id, agent_id, session_id, interactions):
+        summarized.append((session_id, interactions))
+        done.set()
+
+    summarizer = SessionSummarizer(summarize, every_n=5, max_delay=0.2)
+    summarizer.add("account", "agent", "session", {"type": "user_input", "content": "hello"})
+
+    assert done.wait(2)
+    assert summarized == [("session", [{"type": "user_input", "content": "hello"}])]
+    assert summarizer.metrics()["pending_sessions"] == 0
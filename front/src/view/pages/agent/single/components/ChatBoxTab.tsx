@@ -144,6 +144,21 @@ export function ChatBoxTab({
         console.log("Job failed", data);
       });
 
+      socket?.on("job_cancelled", (data) => {
+        const msg: JobMessage = {
+          type: "job",
+          content: {
+            name: data.name,
+            description: data.description,
+            job_id: data.job_id,
+            status: data.status,
+            payload: data.result,
+          },
+        };
+        setMessages((prevMessages) => [...prevMessages, msg]);
+        console.log("Job cancelled", data);
+      });
+
       socket?.on("job_scheduled", (data) => {
         const msg: JobMessage = {
           type: "job",